@@ -7,6 +7,9 @@ from websockets import route
 from routes import users
 from routes import predict
 from routes import chat
+from routes import ingest
+from routes import trends
+from routes import recommend
 from db.init_db import init_db
 
 
@@ -14,8 +17,13 @@ from db.init_db import init_db
 async def lifespan(app: FastAPI):
     print("Starting up...")
     init_db()
+    recommend.start()
+    chat.start()
     yield
     print("Shutting down...")
+    recommend.stop()
+    ingest.writer.stop()
+    chat.stop()
 
 
 app = FastAPI(
@@ -33,8 +41,11 @@ app.add_middleware(
 
 @app.get("/health")
 def health():
-    return {"status": "ok"}
+    return {"status": "ok", "chat": chat.llm_state}
 
 app.include_router(users.router, prefix="/v1")
 app.include_router(predict.router, prefix="/v1") 
-app.include_router(chat.router,    prefix="/v1") 
\ No newline at end of file
+app.include_router(chat.router,    prefix="/v1") 
+app.include_router(ingest.router,  prefix="/v1")
+app.include_router(trends.router,  prefix="/v1")
+app.include_router(recommend.router, prefix="/v1")
\ No newline at end of file
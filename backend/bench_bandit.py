@@ -0,0 +1,70 @@
+"""Decisions/sec of the in-memory bandit at many users.
+
+Seeds --users users with --history random outcomes each, then times choose()
+over random users with 3 candidate activities (the LSTM's top-3), one user per
+call and in batches, for Thompson sampling and UCB. Also times updates and a
+bulk flush of every touched cell to BanditStat in a temporary SQLite file.
+
+Usage (from backend/):
+  python bench_bandit.py [--users 100000] [--history 20] [--decisions 20000]
+"""
+import argparse
+import os
+import shutil
+import tempfile
+import time
+
+import numpy as np
+from sqlmodel import SQLModel
+
+from db.session import make_engine
+from services.bandit import DEFAULT_ARMS, BanditEngine
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the bandit engine.")
+    parser.add_argument("--users",     type=int, default=100000, help="Simulated users (default: 100000)")
+    parser.add_argument("--history",   type=int, default=20,     help="Logged outcomes per user (default: 20)")
+    parser.add_argument("--decisions", type=int, default=20000,  help="Decisions per measurement (default: 20000)")
+    args = parser.parse_args()
+
+    rng = np.random.default_rng(0)
+    arms = np.array(DEFAULT_ARMS)
+    bandit = BanditEngine(capacity=args.users, seed=0)
+
+    n_updates = args.users * args.history
+    users = rng.integers(0, args.users, size=n_updates).tolist()
+    acts = arms[rng.integers(0, len(arms), size=n_updates)].tolist()
+    helped = (rng.random(n_updates) < 0.4).tolist()
+    start = time.perf_counter()
+    for i in range(0, n_updates, 10000):
+        bandit.update_many(users[i:i + 10000], acts[i:i + 10000], helped[i:i + 10000])
+    elapsed = time.perf_counter() - start
+    print(f"{len(bandit):,} users, {n_updates:,} outcomes loaded in {elapsed:.2f} s "
+          f"({n_updates / elapsed:,.0f} updates/s, arrays {(bandit.n.nbytes + bandit.s.nbytes) / 1e6:.1f} MB)\n")
+
+    picks = rng.integers(0, args.users, size=args.decisions).tolist()
+    cands = [list(rng.choice(arms, size=3, replace=False)) for _ in range(args.decisions)]
+
+    print(f"{'method':<9} {'batch':>6} {'decisions/s':>13}")
+    for method in ("thompson", "ucb"):
+        for batch in (1, 64, 1024):
+            start = time.perf_counter()
+            for i in range(0, args.decisions, batch):
+                bandit.choose(picks[i:i + batch], cands[i:i + batch], method)
+            print(f"{method:<9} {batch:>6} {args.decisions / (time.perf_counter() - start):>13,.0f}")
+
+    tmpdir = tempfile.mkdtemp()
+    try:
+        engine = make_engine(f"sqlite:///{os.path.join(tmpdir, 'bandit.db')}", echo=False)
+        SQLModel.metadata.create_all(engine)
+        start = time.perf_counter()
+        cells = bandit.flush(engine)
+        print(f"\nflush: {cells:,} cells → BanditStat in {time.perf_counter() - start:.2f} s")
+        engine.dispose()
+    finally:
+        shutil.rmtree(tmpdir)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,127 @@
+"""Ingest throughput: per-row commits vs the batched writer.
+
+Simulates --users wearables each sending MetricsEvent and PredictionLog rows
+from --threads producer threads into a fresh SQLite file per mode:
+
+  row        one Session.add + commit per row, default SQLite settings
+             (how routes/users.py writes)
+  row-wal    the same, with the WAL pragmas from db/session.py
+  batch      services.batch_writer.BatchWriter with WAL pragmas
+
+Usage (from backend/):
+  python bench_ingest.py [--users 1000] [--rows 20000] [--threads 4] [--modes row,row-wal,batch]
+"""
+import argparse
+import os
+import shutil
+import tempfile
+import threading
+import time
+from datetime import datetime, timedelta, timezone
+
+import numpy as np
+from sqlmodel import Session, SQLModel, create_engine, select, func
+
+from db.models import MetricsEvent, PredictionLog
+from db.session import make_engine
+from services.batch_writer import BatchWriter
+
+LABELS = ["Rest", "Seated Exercise", "Gait Training", "Balance Practice", "Stretching", "Medication Check"]
+ACTIVITY_IDS = [0, 1, 2, 3, 4, 6]
+
+
+def make_rows(n: int, users: int, seed: int = 0) -> list:
+    """(model, row dict) pairs, alternating metrics and predictions."""
+    rng = np.random.default_rng(seed)
+    start = datetime(2026, 1, 1, tzinfo=timezone.utc)
+    rows = []
+    for i in range(n):
+        user = int(rng.integers(users))
+        ts = start + timedelta(seconds=i)
+        if i % 2:
+            rows.append((MetricsEvent, {
+                "user_id": user, "ts": ts, "hr_bpm": float(rng.normal(75, 8)),
+                "hrv_rmssd_ms": float(rng.normal(40, 10)), "steps_last_5m": int(rng.integers(0, 600)),
+                "sleep_last_night_min": int(rng.integers(240, 540)), "tremor_index": float(rng.random()),
+            }))
+        else:
+            k = int(rng.integers(6))
+            rows.append((PredictionLog, {
+                "user_id": user, "session_id": f"s-{user}", "predicted_activity": LABELS[k],
+                "activity_id": ACTIVITY_IDS[k], "confidence": float(rng.random()),
+                "fog_severity": float(rng.random()), "movement_mag": float(rng.random()),
+                "time_of_day": float(rng.random() * 24), "caregiver_alerted": False, "created_at": ts,
+            }))
+    return rows
+
+
+def per_row(engine, rows):
+    with Session(engine) as session:
+        for model, row in rows:
+            session.add(model(**row))
+            session.commit()
+
+
+def run_mode(mode: str, rows: list, threads: int, db_path: str) -> float:
+    url = f"sqlite:///{db_path}"
+    if mode == "row":
+        engine = create_engine(url, connect_args={"check_same_thread": False})
+    else:
+        engine = make_engine(url, echo=False)
+    SQLModel.metadata.create_all(engine)
+
+    parts = [rows[i::threads] for i in range(threads)]
+    writer = BatchWriter(engine) if mode == "batch" else None
+
+    def produce(part):
+        if writer is None:
+            per_row(engine, part)
+            return
+        # Requests carry small bulk payloads, as from /v1/metrics/bulk
+        for i in range(0, len(part), 50):
+            by_model = {}
+            for model, row in part[i:i + 50]:
+                by_model.setdefault(model, []).append(row)
+            for model, batch in by_model.items():
+                writer.add(model, batch)
+
+    start = time.perf_counter()
+    workers = [threading.Thread(target=produce, args=(p,)) for p in parts]
+    for w in workers:
+        w.start()
+    for w in workers:
+        w.join()
+    if writer is not None:
+        writer.stop()
+    elapsed = time.perf_counter() - start
+
+    with Session(engine) as session:
+        n = session.exec(select(func.count()).select_from(MetricsEvent)).one() + \
+            session.exec(select(func.count()).select_from(PredictionLog)).one()
+    assert n == len(rows), f"{mode}: wrote {n} of {len(rows)} rows"
+    engine.dispose()
+    return elapsed
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark backend ingest paths.")
+    parser.add_argument("--users",   type=int, default=1000,  help="Simulated users (default: 1000)")
+    parser.add_argument("--rows",    type=int, default=20000, help="Rows per mode (default: 20000)")
+    parser.add_argument("--threads", type=int, default=4,     help="Producer threads (default: 4)")
+    parser.add_argument("--modes",   default="row,row-wal,batch")
+    args = parser.parse_args()
+
+    rows = make_rows(args.rows, args.users)
+    tmpdir = tempfile.mkdtemp()
+    print(f"{args.rows:,} rows from {args.users:,} users, {args.threads} producer threads\n")
+    print(f"{'mode':<9} {'seconds':>9} {'rows/s':>10}")
+    try:
+        for mode in args.modes.split(","):
+            elapsed = run_mode(mode, rows, args.threads, os.path.join(tmpdir, f"{mode}.db"))
+            print(f"{mode:<9} {elapsed:>9.2f} {args.rows / elapsed:>10,.0f}")
+    finally:
+        shutil.rmtree(tmpdir)
+
+
+if __name__ == "__main__":
+    main()
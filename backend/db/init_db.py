@@ -1,5 +1,35 @@
+from sqlalchemy import inspect, text
 from sqlmodel import SQLModel
 from db.session import engine
+import db.models  # noqa: F401  (registers the tables on SQLModel.metadata)
+
+# Unique indexes added to existing tables, and the statement that removes rows
+# violating them first. BanditStat counters only grow, so the duplicate with the
+# most trials is the latest snapshot of that (user, activity) cell.
+DEDUPE_BEFORE_UNIQUE = {
+    "ux_banditstat_user_activity": """
+        DELETE FROM banditstat WHERE id NOT IN (
+            SELECT id FROM (
+                SELECT id, ROW_NUMBER() OVER (
+                    PARTITION BY user_id, activity_id ORDER BY n DESC, success_n DESC, id DESC
+                ) AS rn FROM banditstat
+            ) AS ranked WHERE rn = 1
+        )
+    """,
+}
 
 def init_db():
-    SQLModel.metadata.create_all(engine)
\ No newline at end of file
+    SQLModel.metadata.create_all(engine)
+    # create_all skips tables that already exist, so add indexes introduced later
+    inspector = inspect(engine)
+    for table in SQLModel.metadata.sorted_tables:
+        existing = {ix["name"] for ix in inspector.get_indexes(table.name)}
+        for index in table.indexes:
+            if index.name in existing:
+                continue
+            with engine.begin() as conn:
+                if index.unique and index.name in DEDUPE_BEFORE_UNIQUE:
+                    removed = conn.execute(text(DEDUPE_BEFORE_UNIQUE[index.name])).rowcount
+                    if removed:
+                        print(f"[init_db] Removed {removed} duplicate {table.name} rows before creating {index.name}")
+                index.create(conn)
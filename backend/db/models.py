@@ -1,3 +1,4 @@
+from sqlalchemy import Index, UniqueConstraint
 from sqlmodel import SQLModel, Field
 from typing import Optional
 from datetime import datetime
@@ -17,6 +18,8 @@ class Baseline(SQLModel, table=True):
     med_last_taken_minutes_ago: int
 
 class MetricsEvent(SQLModel, table=True):
+    __table_args__ = (Index("ix_metricsevent_user_ts", "user_id", "ts"),)
+
     id: Optional[int] = Field(default=None, primary_key=True)
     user_id: int
     ts: datetime
@@ -37,6 +40,8 @@ class ActivityLog(SQLModel, table=True):
     created_at: datetime = Field(default_factory=datetime.utcnow)
 
 class BanditStat(SQLModel, table=True):
+    __table_args__ = (Index("ux_banditstat_user_activity", "user_id", "activity_id", unique=True),)
+
     id: Optional[int] = Field(default=None, primary_key=True)
     user_id: int
     activity_id: str
@@ -45,6 +50,11 @@ class BanditStat(SQLModel, table=True):
 
 class PredictionLog(SQLModel, table=True):
     """Stores every LSTM prediction made for a user."""
+    __table_args__ = (
+        Index("ix_predictionlog_user_created", "user_id", "created_at"),
+        Index("ix_predictionlog_session_created", "session_id", "created_at"),   # chat context lookups
+    )
+
     id:                 Optional[int] = Field(default=None, primary_key=True)
     user_id:            int
     session_id:         str                          # ties prediction to chat history
@@ -68,3 +78,23 @@ class ConversationMessage(SQLModel, table=True):
     source:     str = "text"  # "text" | "voice"
     created_at: datetime = Field(default_factory=datetime.utcnow)
 
+
+
+class MetricRollup(SQLModel, table=True):
+    """Per-user aggregate of one metric over one minute / hour / day bucket, kept
+    up to date by the ingest writer (services/rollups.py)."""
+    __table_args__ = (
+        UniqueConstraint("user_id", "metric", "resolution", "bucket_start", name="uq_metricrollup_bucket"),
+    )
+
+    id:           Optional[int] = Field(default=None, primary_key=True)
+    user_id:      int
+    metric:       str           # "tremor_index", "hr_bpm", ... or "activity_<id>" for the prediction mix
+    resolution:   str           # "minute" | "hour" | "day"
+    bucket_start: datetime      # UTC
+    count:        int
+    sum:          float
+    min:          float
+    max:          float
+    last:         float
+    last_ts:      datetime
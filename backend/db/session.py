@@ -1,9 +1,49 @@
+import os
+
+from sqlalchemy import event
+from sqlalchemy.dialects import postgresql, sqlite
 from sqlmodel import create_engine, Session
 
-DATABASE_URL = "sqlite:///./database.db"
+DATABASE_URL = os.getenv("DATABASE_URL", "sqlite:///./database.db")
+
+# SQL echo is noisy and slow under ingest load; DB_ECHO=1 turns it back on
+DB_ECHO = os.getenv("DB_ECHO", "0") == "1"
+
+SQLITE_PRAGMAS = {
+    "journal_mode": "WAL",        # readers don't block the ingest writer
+    "synchronous": "NORMAL",      # fsync at checkpoints, not every commit (safe with WAL)
+    "busy_timeout": "5000",
+    "temp_store": "MEMORY",
+    "cache_size": "-20000",       # ~20 MB page cache
+}
+
+def make_engine(url: str = DATABASE_URL, echo: bool = DB_ECHO):
+    if not url.startswith("sqlite"):
+        return create_engine(url, echo=echo)
+    # The batch writer commits from its own thread
+    engine = create_engine(url, echo=echo, connect_args={"check_same_thread": False})
+
+    @event.listens_for(engine, "connect")
+    def _set_pragmas(dbapi_conn, _):
+        cursor = dbapi_conn.cursor()
+        for name, value in SQLITE_PRAGMAS.items():
+            cursor.execute(f"PRAGMA {name}={value}")
+        cursor.close()
+
+    return engine
+
+engine = make_engine()
+
+# Dialects whose INSERT ... ON CONFLICT DO UPDATE the bulk upserts use
+UPSERT_INSERTS = {"sqlite": sqlite.insert, "postgresql": postgresql.insert}
 
-engine = create_engine(DATABASE_URL, echo=True)
+def upsert_insert(bind, table):
+    """An INSERT supporting on_conflict_do_update for `bind`'s dialect (engine or connection)."""
+    name = bind.dialect.name
+    if name not in UPSERT_INSERTS:
+        raise RuntimeError(f"Bulk upserts need SQLite or PostgreSQL, DATABASE_URL uses {name!r}")
+    return UPSERT_INSERTS[name](table)
 
 def get_session():
     with Session(engine) as session:
-        yield session
\ No newline at end of file
+        yield session
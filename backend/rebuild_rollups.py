@@ -0,0 +1,31 @@
+"""
+Backfills MetricRollup from the raw MetricsEvent / PredictionLog rows.
+
+Run after enabling rollups on an existing database, or to repair them. Uses the
+same aggregation as the ingest path (services/rollups.py).
+
+Usage (from backend/):
+  python rebuild_rollups.py [--user-id 42] [--chunk-size 5000]
+"""
+import argparse
+import time
+
+from db.init_db import init_db
+from db.session import engine
+from services.rollups import rebuild
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Rebuild per-user metric rollups from raw rows.")
+    parser.add_argument("--user-id",    type=int, default=None, help="Only rebuild this user (default: all)")
+    parser.add_argument("--chunk-size", type=int, default=5000, help="Raw rows aggregated per step (default: 5000)")
+    args = parser.parse_args()
+
+    init_db()
+    start = time.perf_counter()
+    n = rebuild(engine, user_id=args.user_id, chunk_size=args.chunk_size)
+    print(f"Rebuilt rollups from {n:,} rows in {time.perf_counter() - start:.1f} s")
+
+
+if __name__ == "__main__":
+    main()
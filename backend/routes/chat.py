@@ -1,27 +1,172 @@
-from fastapi import APIRouter
+import json
+import os
+import threading
+import traceback
+from typing import Optional
+
+from fastapi import APIRouter, HTTPException
+from fastapi.concurrency import run_in_threadpool
+from fastapi.responses import StreamingResponse
 from pydantic import BaseModel
-from llama_cpp import Llama
+from sqlmodel import Session, select
+
+from db.models import ConversationMessage, PredictionLog
+from db.session import engine
+
+# Shared with the inference service (shared/healin_chat, `pip install ./shared`)
+from healin_chat.context_builder import Prediction, build_context
+from healin_chat.llm import LLMExecutor, LLMTimeout, LLMUnavailable, PrefixCachedLLM, QueueFull
 
 router = APIRouter(tags=["Chat"])
 
-# Load TinyLlama with GPU acceleration
-llm = Llama(
-    model_path="models/tinyllama-1.1b-chat-v1.0.Q4_K_M.gguf",
-    n_gpu_layers=-1, # Put all layers on the AMD GPU
-    n_ctx=2048
-)
+# TinyLlama prompt format. The system turn is identical for every request, so its
+# KV cache is computed once below and restored per request.
+SYSTEM_PREFIX = "<|system|>\nYou are a Parkinson's assistant specialized in exercise advice.</s>\n<|user|>\n"
+
+GEN_KWARGS = dict(max_tokens=256, stop=["</s>"])
+
+# Generation runs on LLM_WORKERS threads (one model instance each) so it never
+# blocks the event loop; more than LLM_MAX_QUEUE waiting requests → 429.
+LLM_WORKERS = int(os.getenv("LLM_WORKERS", "1"))
+LLM_MAX_QUEUE = int(os.getenv("LLM_MAX_QUEUE", "8"))
+LLM_TIMEOUT_S = float(os.getenv("LLM_TIMEOUT_S", "120"))
+
+# Session context added to the prompt: a summary of the last CHAT_CONTEXT_WINDOWS
+# predictions plus as many of the last CHAT_CONTEXT_TURNS messages as fit in
+# CHAT_CONTEXT_TOKENS (see healin_chat.context_builder)
+CHAT_CONTEXT_WINDOWS = int(os.getenv("CHAT_CONTEXT_WINDOWS", "10"))
+CHAT_CONTEXT_TURNS = int(os.getenv("CHAT_CONTEXT_TURNS", "8"))
+CHAT_CONTEXT_TOKENS = int(os.getenv("CHAT_CONTEXT_TOKENS", "384"))
+
+LLM_PATH = os.getenv("LLM_PATH", "models/tinyllama-1.1b-chat-v1.0.Q4_K_M.gguf")
+
+# Loaded in the background by start(), so the API is up (and /health answers)
+# before the model is; chat routes return 503 until then.
+llm: Optional[LLMExecutor] = None
+llm_state = {"state": "pending", "error": None}
+
+def _load():
+    global llm
+    llm_state["state"] = "loading"
+    try:
+        from llama_cpp import Llama
+
+        def instance():
+            cached = PrefixCachedLLM(
+                Llama(
+                    model_path=LLM_PATH,
+                    n_gpu_layers=-1, # Put all layers on the AMD GPU
+                    n_ctx=2048,
+                    use_mmap=True,
+                ),
+                SYSTEM_PREFIX,
+            )
+            cached.warmup()
+            return cached
+
+        llm = LLMExecutor(instance, workers=LLM_WORKERS, max_queue=LLM_MAX_QUEUE)
+        llm_state["state"] = "ready"
+    except Exception as e:
+        traceback.print_exc()
+        llm_state.update(state="failed", error=f"{type(e).__name__}: {e}")
+
+def start():
+    if not os.path.exists(LLM_PATH):
+        llm_state.update(state="absent", error=f"{LLM_PATH} not found")
+        return
+    threading.Thread(target=_load, name="load-chat", daemon=True).start()
+
+def stop():
+    if llm is not None:
+        llm.stop()
+
+def _require_llm() -> LLMExecutor:
+    if llm is None:
+        raise HTTPException(status_code=503, detail=f"Chat model {llm_state['state']}", headers={"Retry-After": "5"})
+    return llm
 
 class ChatRequest(BaseModel):
     message: str
+    user_id: Optional[int] = None
+    session_id: Optional[str] = None    # with user_id, turns are stored and reused as context
+
+def _log_prediction(row: PredictionLog) -> Prediction:
+    """PredictionLog row → (label, confidence, movement_mag) for build_context."""
+    return row.predicted_activity, row.confidence, row.movement_mag
+
+def _load_history(session_id: str) -> tuple[list, list]:
+    """Last predictions and conversation turns of a session, oldest first."""
+    with Session(engine) as session:
+        preds = session.exec(
+            select(PredictionLog).where(PredictionLog.session_id == session_id)
+            .order_by(PredictionLog.created_at.desc()).limit(CHAT_CONTEXT_WINDOWS)
+        ).all()
+        turns = session.exec(
+            select(ConversationMessage).where(ConversationMessage.session_id == session_id,
+                                              ConversationMessage.role != "system")
+            .order_by(ConversationMessage.created_at.desc()).limit(CHAT_CONTEXT_TURNS)
+        ).all()
+    return [_log_prediction(p) for p in reversed(preds)], [(t.role, t.content) for t in reversed(turns)]
+
+def _save_turns(request: ChatRequest, reply: str):
+    with Session(engine) as session:
+        for role, content in (("user", request.message), ("assistant", reply)):
+            session.add(ConversationMessage(user_id=request.user_id, session_id=request.session_id,
+                                            role=role, content=content))
+        session.commit()
+
+async def _suffix(request: ChatRequest) -> str:
+    _require_llm()
+    if request.session_id is None:
+        return f"{request.message}</s>\n<|assistant|>\n"
+    preds, turns = await run_in_threadpool(_load_history, request.session_id)
+    context = build_context(preds, turns, budget_tokens=CHAT_CONTEXT_TOKENS, count_tokens=llm.text_tokens)
+    return f"{context}\n\nUser message: {request.message}</s>\n<|assistant|>\n"
+
+def _submit(suffix: str):
+    try:
+        return _require_llm().submit(suffix, LLM_TIMEOUT_S, **GEN_KWARGS)
+    except QueueFull as e:
+        raise HTTPException(status_code=429, detail=str(e), headers={"Retry-After": "1"})
+    except LLMUnavailable as e:
+        raise HTTPException(status_code=503, detail=str(e))
 
 @router.post("/chat")
 async def chat_with_tinyllama(request: ChatRequest):
-    # TinyLlama prompt format
-    prompt = f"<|system|>\nYou are a Parkinson's assistant specialized in exercise advice.</s>\n<|user|>\n{request.message}</s>\n<|assistant|>\n"
-    
-    response = llm(prompt, max_tokens=256, stop=["</s>"], echo=False)
-    
+    suffix = await _suffix(request)
+    job = _submit(suffix)
+    try:
+        text = "".join([piece async for piece in job.texts()])
+    except LLMTimeout as e:
+        raise HTTPException(status_code=504, detail=str(e))
+
+    reply = text.strip()
+    if request.session_id is not None and request.user_id is not None:
+        await run_in_threadpool(_save_turns, request, reply)
+
     return {
         "role": "assistant",
-        "content": response["choices"][0]["text"].strip()
-    }
\ No newline at end of file
+        "content": reply,
+        "prompt_tokens": llm.count_tokens(suffix),
+    }
+
+@router.post("/chat/stream")
+async def chat_stream(request: ChatRequest):
+    """Streams the reply as Server-Sent Events: `data: {"token": "..."}` per piece, then
+    `data: {"done": true}` (or `{"error": ...}`). Disconnecting cancels generation."""
+    job = _submit(await _suffix(request))
+
+    async def events():
+        pieces = []
+        try:
+            async for text in job.texts():
+                pieces.append(text)
+                yield f"data: {json.dumps({'token': text})}\n\n"
+        except LLMTimeout as e:
+            yield f"data: {json.dumps({'error': str(e)})}\n\n"
+            return
+        if request.session_id is not None and request.user_id is not None:
+            await run_in_threadpool(_save_turns, request, "".join(pieces).strip())
+        yield f"data: {json.dumps({'done': True})}\n\n"
+
+    return StreamingResponse(events(), media_type="text/event-stream")
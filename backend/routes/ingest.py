@@ -0,0 +1,83 @@
+import os
+from datetime import datetime, timezone
+from typing import List
+
+from fastapi import APIRouter, HTTPException
+from pydantic import BaseModel, Field, field_validator
+
+from db.models import MetricsEvent, PredictionLog
+from db.session import engine
+from services.batch_writer import BatchWriter, BufferFull
+from services.rollups import apply_rows, as_utc
+
+router = APIRouter(tags=["Ingest"])
+
+# Rows are committed in batches of INGEST_BATCH_ROWS, or INGEST_MAX_DELAY_S after
+# the oldest pending row arrived; above INGEST_MAX_PENDING buffered rows → 503.
+# A batch that still fails after INGEST_RETRIES retries goes to INGEST_DEAD_LETTER.
+writer = BatchWriter(
+    engine,
+    max_rows=int(os.getenv("INGEST_BATCH_ROWS", "1000")),
+    max_delay_s=float(os.getenv("INGEST_MAX_DELAY_S", "0.5")),
+    max_pending=int(os.getenv("INGEST_MAX_PENDING", "100000")),
+    retries=int(os.getenv("INGEST_RETRIES", "3")),
+    dead_letter_path=os.getenv("INGEST_DEAD_LETTER", "ingest_dead_letter.jsonl"),
+)
+# Minute/hour/day rollups are updated in the same transaction as each flush
+writer.hooks.append(apply_rows)
+
+MAX_ROWS_PER_REQUEST = 10000
+
+def _utc(ts: datetime) -> datetime:
+    """Every timestamp is converted to UTC before it is queued: SQLite's DateTime
+    drops an offset without converting, so a +02:00 time would otherwise be stored
+    as local wall-clock time and disagree with the rollups. Naive input is taken
+    to be UTC already. The value stays tagged UTC, as SQLModel requires an aware
+    datetime; stored, it is the same naive UTC wall time either way."""
+    return as_utc(ts)
+
+class MetricsEventIn(BaseModel):
+    user_id: int
+    ts: datetime
+    hr_bpm: float
+    hrv_rmssd_ms: float
+    steps_last_5m: int
+    sleep_last_night_min: int
+    tremor_index: float
+
+    _utc_ts = field_validator("ts")(_utc)
+
+class PredictionIn(BaseModel):
+    user_id: int
+    session_id: str
+    predicted_activity: str
+    activity_id: int
+    confidence: float
+    fog_severity: float
+    movement_mag: float
+    time_of_day: float
+    caregiver_alerted: bool = False
+    created_at: datetime = Field(default_factory=lambda: datetime.now(timezone.utc), validate_default=True)
+
+    _utc_created_at = field_validator("created_at")(_utc)
+
+def _enqueue(model: type, items: List[BaseModel]) -> dict:
+    if len(items) > MAX_ROWS_PER_REQUEST:
+        raise HTTPException(status_code=413, detail=f"At most {MAX_ROWS_PER_REQUEST} rows per request")
+    try:
+        writer.add(model, [item.model_dump() for item in items])
+    except BufferFull as e:
+        raise HTTPException(status_code=503, detail=str(e), headers={"Retry-After": "1"})
+    return {"accepted": len(items)}
+
+@router.post("/metrics/bulk", status_code=202)
+def ingest_metrics(events: List[MetricsEventIn]):
+    return _enqueue(MetricsEvent, events)
+
+@router.post("/predictions/bulk", status_code=202)
+def ingest_predictions(predictions: List[PredictionIn]):
+    return _enqueue(PredictionLog, predictions)
+
+@router.get("/ingest/stats")
+def ingest_stats():
+    return writer.stats()
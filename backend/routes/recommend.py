@@ -0,0 +1,84 @@
+import os
+import threading
+from datetime import datetime, timezone
+import traceback
+from typing import List
+
+from fastapi import APIRouter, Depends, HTTPException
+from pydantic import BaseModel, Field, field_validator
+from sqlmodel import Session
+
+from db.models import ActivityLog
+from db.session import engine, get_session
+from services.bandit import DEFAULT_ARMS, BanditEngine
+
+router = APIRouter(tags=["Recommend"])
+
+# Arm statistics live in memory; changed cells are written to BanditStat every
+# BANDIT_FLUSH_S seconds and on shutdown.
+BANDIT_FLUSH_S = float(os.getenv("BANDIT_FLUSH_S", "30"))
+
+# Activity ids the bandit chooses between (comma-separated); candidates outside
+# this catalog are rejected with a 422.
+BANDIT_ARMS = tuple(a.strip() for a in os.getenv("BANDIT_ARMS", ",".join(DEFAULT_ARMS)).split(",") if a.strip())
+
+bandit = BanditEngine(BANDIT_ARMS)
+_stop = threading.Event()
+
+class RecommendRequest(BaseModel):
+    user_id: int
+    candidates: List[str] = Field(..., min_length=1, description="Candidate activity ids, e.g. the LSTM's top-k")
+    method: str = "thompson"        # "thompson" | "ucb"
+
+    @field_validator("candidates")
+    @classmethod
+    def _known_arms(cls, v: List[str]) -> List[str]:
+        unknown = bandit.unknown(v)
+        if unknown:
+            raise ValueError(f"Unknown activity ids {unknown}, expected ids from {list(BANDIT_ARMS)}")
+        return v
+
+class ActivityLogIn(BaseModel):
+    user_id: int
+    activity_id: str
+    duration_sec: int
+    helped: bool
+    tremor_after_1to5: int
+    mood_after_1to5: int
+
+def _flush_loop():
+    while not _stop.wait(BANDIT_FLUSH_S):
+        try:
+            bandit.flush(engine)
+        except Exception:
+            traceback.print_exc()
+
+def start():
+    """Loads arm stats (rebuilding them from ActivityLog if BanditStat is empty) and starts flushing."""
+    bandit.load(engine)
+    if len(bandit) == 0:
+        bandit.rebuild_from_logs(engine)
+        bandit.flush(engine)
+    threading.Thread(target=_flush_loop, name="bandit-flush", daemon=True).start()
+
+def stop():
+    _stop.set()
+    bandit.flush(engine)
+
+@router.post("/recommend")
+def recommend(req: RecommendRequest):
+    if req.method not in ("thompson", "ucb"):
+        raise HTTPException(status_code=422, detail="method must be 'thompson' or 'ucb'")
+    return {"activity_id": bandit.recommend(req.user_id, req.candidates, req.method), "method": req.method}
+
+@router.post("/activity-log")
+def log_activity(payload: ActivityLogIn, session: Session = Depends(get_session)):
+    log = ActivityLog(**payload.model_dump(), created_at=datetime.now(timezone.utc))
+    session.add(log)
+    session.commit()
+    bandit.update(log.user_id, log.activity_id, log.helped)
+    return {"status": "logged"}
+
+@router.get("/users/{user_id}/bandit")
+def bandit_stats(user_id: int):
+    return bandit.arm_stats(user_id)
@@ -0,0 +1,60 @@
+from datetime import datetime, timedelta, timezone
+from typing import List, Optional
+
+from fastapi import APIRouter, Depends, HTTPException, Query
+from pydantic import BaseModel
+from sqlmodel import Session
+
+from db.session import get_session
+from services.rollups import METRICS_EVENT_FIELDS, RESOLUTIONS, as_utc, read_activity_mix, read_trend
+
+router = APIRouter(tags=["Trends"])
+
+# Longest range served per resolution, to keep responses small
+MAX_BUCKETS = 1500
+
+class TrendBucket(BaseModel):
+    bucket_start: datetime
+    count: int
+    mean: float
+    min: float
+    max: float
+    last: float
+
+class ActivityMixBucket(BaseModel):
+    bucket_start: datetime
+    counts: dict          # activity_id → predictions in the bucket
+
+def _range(resolution: str, start: Optional[datetime], end: Optional[datetime]) -> tuple:
+    if resolution not in RESOLUTIONS:
+        raise HTTPException(status_code=422, detail=f"resolution must be one of {list(RESOLUTIONS)}")
+    # Query params without an offset are taken as UTC, like everything stored
+    end = as_utc(end) if end is not None else datetime.now(timezone.utc)
+    start = as_utc(start) if start is not None else end - timedelta(seconds=RESOLUTIONS[resolution] * 24)
+    if (end - start).total_seconds() / RESOLUTIONS[resolution] > MAX_BUCKETS:
+        raise HTTPException(status_code=422, detail=f"Range covers more than {MAX_BUCKETS} {resolution} buckets")
+    return start, end
+
+@router.get("/users/{user_id}/trends/{metric}", response_model=List[TrendBucket])
+def get_trend(user_id: int, metric: str, resolution: str = "hour",
+              start: Optional[datetime] = Query(None), end: Optional[datetime] = Query(None),
+              session: Session = Depends(get_session)):
+    """Per-bucket aggregates of one MetricsEvent field; defaults to the last 24 buckets."""
+    if metric not in METRICS_EVENT_FIELDS:
+        raise HTTPException(status_code=404, detail=f"Unknown metric, expected one of {list(METRICS_EVENT_FIELDS)}")
+    start, end = _range(resolution, start, end)
+    return [
+        TrendBucket(bucket_start=r.bucket_start, count=r.count, mean=r.sum / r.count, min=r.min, max=r.max, last=r.last)
+        for r in read_trend(session, user_id, metric, resolution, start, end)
+    ]
+
+@router.get("/users/{user_id}/activity-mix", response_model=List[ActivityMixBucket])
+def get_activity_mix(user_id: int, resolution: str = "day",
+                     start: Optional[datetime] = Query(None), end: Optional[datetime] = Query(None),
+                     session: Session = Depends(get_session)):
+    """Predicted-activity counts per bucket; defaults to the last 24 buckets."""
+    start, end = _range(resolution, start, end)
+    buckets = {}
+    for r in read_activity_mix(session, user_id, resolution, start, end):
+        buckets.setdefault(r.bucket_start, {})[int(r.metric.split("_")[1])] = r.count
+    return [ActivityMixBucket(bucket_start=b, counts=c) for b, c in buckets.items()]
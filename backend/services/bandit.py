@@ -0,0 +1,169 @@
+"""In-memory Beta-Bernoulli bandit over recommended activities.
+
+Per-user arm statistics (trials n, successes s — an ActivityLog row with
+helped=True is a success) live in two int32 arrays of shape (users, arms), so a
+decision never touches the database. choose() scores a whole batch of users at
+once, restricted to each user's candidate arms (the LSTM's top-k activities):
+
+  thompson   sample Beta(s + 1, n - s + 1) per candidate, take the argmax
+  ucb        UCB1: s / n + c * sqrt(2 ln N_user / n); untried arms go first
+
+Updates are applied to the arrays immediately and the touched (user, arm)
+cells are written back to BanditStat in bulk by flush().
+
+The arm set is fixed at construction: the arrays never grow a column, so an
+unknown activity id is rejected by choose() and ignored by the updates.
+"""
+import threading
+from typing import Dict, Iterable, List, Optional, Sequence
+
+import numpy as np
+from sqlmodel import Session, select
+
+from db.models import ActivityLog, BanditStat
+from db.session import upsert_insert
+
+DEFAULT_ARMS = ("0", "1", "2", "3", "4", "6")   # LSTM activity ids
+UCB_C = 1.0
+
+
+class BanditEngine:
+    def __init__(self, arms: Sequence[str] = DEFAULT_ARMS, capacity: int = 1024, seed: Optional[int] = None):
+        self.arms: List[str] = list(arms)
+        self._arm_index: Dict[str, int] = {a: i for i, a in enumerate(self.arms)}
+        self._user_index: Dict[int, int] = {}
+        self._users: List[int] = []
+        self.n = np.zeros((capacity, len(self.arms)), dtype=np.int32)
+        self.s = np.zeros((capacity, len(self.arms)), dtype=np.int32)
+        self._dirty = set()                         # (row, col) cells changed since the last flush
+        self._lock = threading.Lock()
+        self._rng = np.random.default_rng(seed)
+
+    def __len__(self) -> int:
+        return len(self._users)
+
+    # ── indexing ──────────────────────────────────────────────────────────────
+
+    def _row(self, user_id: int) -> int:
+        row = self._user_index.get(user_id)
+        if row is None:
+            row = len(self._users)
+            if row == len(self.n):
+                self.n = np.concatenate([self.n, np.zeros_like(self.n)])
+                self.s = np.concatenate([self.s, np.zeros_like(self.s)])
+            self._user_index[user_id] = row
+            self._users.append(user_id)
+        return row
+
+    def _col(self, activity_id: str) -> int:
+        col = self._arm_index.get(activity_id)
+        if col is None:
+            raise ValueError(f"Unknown activity id {activity_id!r}, expected one of {self.arms}")
+        return col
+
+    def unknown(self, activity_ids: Iterable[str]) -> List[str]:
+        """The ids that are not arms of this bandit."""
+        return [a for a in activity_ids if a not in self._arm_index]
+
+    # ── decisions ─────────────────────────────────────────────────────────────
+
+    def choose(self, user_ids: Sequence[int], candidates: Sequence[Sequence[str]], method: str = "thompson") -> List[str]:
+        """One activity per user, picked among that user's candidates (equal-length lists)."""
+        with self._lock:
+            rows = np.array([self._row(u) for u in user_ids], dtype=np.int64)
+            cols = np.array([[self._col(a) for a in c] for c in candidates], dtype=np.int64)
+            n = self.n[rows[:, None], cols].astype(np.float64)       # (B, k)
+            s = self.s[rows[:, None], cols].astype(np.float64)
+            if method == "thompson":
+                scores = self._rng.beta(s + 1.0, n - s + 1.0)
+            elif method == "ucb":
+                total = np.maximum(self.n[rows].sum(axis=1, keepdims=True), 1)
+                with np.errstate(divide="ignore", invalid="ignore"):
+                    scores = s / n + UCB_C * np.sqrt(2.0 * np.log(total) / n)
+                scores[n == 0] = np.inf
+            else:
+                raise ValueError(f"Unknown method {method!r}, expected 'thompson' or 'ucb'")
+            picks = cols[np.arange(len(rows)), scores.argmax(axis=1)]
+            return [self.arms[c] for c in picks]
+
+    def recommend(self, user_id: int, candidates: Sequence[str], method: str = "thompson") -> str:
+        return self.choose([user_id], [list(candidates)], method)[0]
+
+    def arm_stats(self, user_id: int) -> Dict[str, dict]:
+        with self._lock:
+            row = self._user_index.get(user_id)
+            if row is None:
+                return {}
+            return {a: {"n": int(self.n[row, i]), "success_n": int(self.s[row, i])}
+                    for i, a in enumerate(self.arms) if self.n[row, i]}
+
+    # ── updates ───────────────────────────────────────────────────────────────
+
+    def update_many(self, user_ids: Sequence[int], activity_ids: Sequence[str], helped: Sequence[bool]):
+        """Records outcomes; repeated (user, arm) pairs in one call are all counted.
+        Outcomes for activity ids that are not arms are skipped."""
+        keep = [i for i, a in enumerate(activity_ids) if a in self._arm_index]
+        if len(keep) < len(activity_ids):
+            user_ids = [user_ids[i] for i in keep]
+            activity_ids = [activity_ids[i] for i in keep]
+            helped = [helped[i] for i in keep]
+        if not keep:
+            return
+        with self._lock:
+            rows = np.array([self._row(u) for u in user_ids], dtype=np.int64)
+            cols = np.array([self._col(a) for a in activity_ids], dtype=np.int64)
+            np.add.at(self.n, (rows, cols), 1)
+            np.add.at(self.s, (rows, cols), np.asarray(helped, dtype=np.int32))
+            self._dirty.update(zip(rows.tolist(), cols.tolist()))
+
+    def update(self, user_id: int, activity_id: str, helped: bool):
+        self.update_many([user_id], [activity_id], [helped])
+
+    def update_from_logs(self, logs: Iterable[ActivityLog]):
+        logs = list(logs)
+        if logs:
+            self.update_many([l.user_id for l in logs], [l.activity_id for l in logs], [l.helped for l in logs])
+
+    # ── persistence ───────────────────────────────────────────────────────────
+
+    def load(self, engine):
+        """Replaces in-memory stats with the BanditStat table."""
+        with Session(engine) as session:
+            stats = session.exec(select(BanditStat)).all()
+        with self._lock:
+            for st in stats:
+                if st.activity_id not in self._arm_index:
+                    continue        # arm no longer in the catalog
+                row, col = self._row(st.user_id), self._col(st.activity_id)
+                self.n[row, col] = st.n
+                self.s[row, col] = st.success_n
+            self._dirty.clear()
+
+    def rebuild_from_logs(self, engine, chunk_size: int = 10000):
+        """Recomputes stats from the full ActivityLog history (e.g. an empty BanditStat)."""
+        with Session(engine) as session:
+            result = session.exec(select(ActivityLog).execution_options(yield_per=chunk_size))
+            for chunk in result.partitions():
+                self.update_from_logs(chunk)
+
+    def flush(self, engine) -> int:
+        """Writes changed (user, arm) cells to BanditStat in one transaction. Returns cells written."""
+        with self._lock:
+            cells, self._dirty = self._dirty, set()
+            rows = [{"user_id": self._users[r], "activity_id": self.arms[c],
+                     "n": int(self.n[r, c]), "success_n": int(self.s[r, c])} for r, c in cells]
+        if not rows:
+            return 0
+        stmt = upsert_insert(engine, BanditStat.__table__)
+        stmt = stmt.on_conflict_do_update(
+            index_elements=["user_id", "activity_id"],
+            set_={"n": stmt.excluded.n, "success_n": stmt.excluded.success_n},
+        )
+        try:
+            with engine.begin() as conn:
+                conn.execute(stmt, rows)
+        except Exception:
+            with self._lock:
+                self._dirty |= cells
+            raise
+        return len(rows)
@@ -0,0 +1,166 @@
+"""Buffered, batched inserts for high-rate tables (MetricsEvent, PredictionLog).
+
+Committing one row per request means one transaction, and with WAL one log
+append and lock round trip, per row. BatchWriter collects rows in memory and a
+background thread inserts them with one executemany per table inside a single
+transaction once max_rows are pending or the oldest pending row is max_delay_s
+old. Rows are plain dicts of column values. Hooks run inside the same
+transaction as the inserts (e.g. rollup maintenance), so derived tables never
+drift from the raw rows.
+
+A failed flush is retried `retries` times with exponential backoff. If it still
+fails, the batch is appended to the dead-letter file (one JSON object per row:
+{"table", "row", "error"}) so rows already acknowledged with 202 can be
+replayed instead of being lost.
+
+Accepted rows that have not been flushed yet are lost if the process dies;
+stop() flushes what is pending on a clean shutdown.
+"""
+import json
+import os
+import threading
+import time
+import traceback
+from collections import defaultdict
+from datetime import date, datetime
+from typing import Callable, Dict, List, Optional
+
+from sqlalchemy import insert
+from sqlalchemy.engine import Connection
+
+
+class BufferFull(Exception):
+    """More than max_pending rows are waiting to be written (→ 503)."""
+
+
+class BatchWriter:
+    def __init__(self, engine, max_rows: int = 1000, max_delay_s: float = 0.5, max_pending: int = 100_000,
+                 retries: int = 3, backoff_s: float = 0.2, dead_letter_path: Optional[str] = None):
+        self.engine = engine
+        self.max_rows = max_rows
+        self.max_delay_s = max_delay_s
+        self.max_pending = max_pending
+        self.retries = retries
+        self.backoff_s = backoff_s
+        self.dead_letter_path = dead_letter_path
+        # Called as hook(conn, {model: rows}) after the inserts of every flush
+        self.hooks: List[Callable[[Connection, Dict[type, List[dict]]], None]] = []
+
+        self._buffers: Dict[type, List[dict]] = defaultdict(list)
+        self._pending = 0
+        self._oldest = 0.0
+        self._cond = threading.Condition()
+        self._write_lock = threading.Lock()
+        self._stopping = False
+        self._stats = {"rows_written": 0, "flushes": 0, "retries": 0, "rows_failed": 0, "rows_dead_lettered": 0}
+        self._thread = threading.Thread(target=self._run, name="batch-writer", daemon=True)
+        self._thread.start()
+
+    def add(self, model: type, rows: List[dict]):
+        with self._cond:
+            if self._stopping:
+                raise BufferFull("Writer is shutting down")
+            if self._pending + len(rows) > self.max_pending:
+                raise BufferFull(f"{self._pending} rows already waiting to be written")
+            if self._pending == 0:
+                self._oldest = time.monotonic()
+            self._buffers[model].extend(rows)
+            self._pending += len(rows)
+            if self._pending >= self.max_rows:
+                self._cond.notify()
+
+    def flush(self):
+        """Writes everything pending now, on the calling thread."""
+        with self._cond:
+            batches = self._take()
+        self._write(batches)
+
+    def stats(self) -> dict:
+        with self._cond:
+            return {**self._stats, "pending": self._pending}
+
+    def stop(self):
+        with self._cond:
+            self._stopping = True
+            self._cond.notify()
+        self._thread.join(timeout=10.0)
+        self.flush()
+
+    def _take(self) -> Dict[type, List[dict]]:
+        batches, self._buffers = self._buffers, defaultdict(list)
+        self._pending = 0
+        return batches
+
+    def _run(self):
+        while True:
+            with self._cond:
+                while not self._stopping:
+                    if self._pending >= self.max_rows:
+                        break
+                    if self._pending:
+                        remaining = self._oldest + self.max_delay_s - time.monotonic()
+                        if remaining <= 0:
+                            break
+                        self._cond.wait(remaining)
+                    else:
+                        self._cond.wait()
+                if self._stopping:
+                    return
+                batches = self._take()
+            self._write(batches)
+
+    def _write(self, batches: Dict[type, List[dict]]):
+        if not batches:
+            return
+        n = sum(len(rows) for rows in batches.values())
+        with self._write_lock:
+            for attempt in range(self.retries + 1):
+                try:
+                    with self.engine.begin() as conn:
+                        for model, rows in batches.items():
+                            conn.execute(insert(model.__table__), rows)
+                        for hook in self.hooks:
+                            hook(conn, batches)
+                    break
+                except Exception as e:
+                    error = e
+                    print(f"[batch_writer] Flush of {n} rows failed (attempt {attempt + 1}/{self.retries + 1})")
+                    traceback.print_exc()
+                    if attempt < self.retries:
+                        with self._cond:
+                            self._stats["retries"] += 1
+                        time.sleep(self.backoff_s * 2 ** attempt)
+            else:
+                dead = self._dead_letter(batches, error)
+                with self._cond:
+                    self._stats["rows_failed"] += n
+                    self._stats["rows_dead_lettered"] += dead
+                return
+        with self._cond:
+            self._stats["rows_written"] += n
+            self._stats["flushes"] += 1
+
+    def _dead_letter(self, batches: Dict[type, List[dict]], error: Exception) -> int:
+        """Appends a batch that could not be written to dead_letter_path. Returns rows saved."""
+        n = sum(len(rows) for rows in batches.values())
+        if not self.dead_letter_path:
+            print(f"[batch_writer] No dead-letter file configured; {n} accepted rows are lost")
+            return 0
+        try:
+            with open(self.dead_letter_path, "a") as f:
+                for model, rows in batches.items():
+                    for row in rows:
+                        f.write(json.dumps({"table": model.__tablename__, "row": row, "error": repr(error)},
+                                           default=_json_default) + "\n")
+        except OSError:
+            print(f"[batch_writer] Could not write {n} rows to {self.dead_letter_path}; they are lost")
+            traceback.print_exc()
+            return 0
+        print(f"[batch_writer] Wrote {n} rows to {os.path.abspath(self.dead_letter_path)} for replay")
+        return n
+
+
+def _json_default(value):
+    if isinstance(value, (datetime, date)):
+        return value.isoformat()
+    raise TypeError(f"Cannot serialise {type(value).__name__}")
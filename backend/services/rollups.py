@@ -0,0 +1,165 @@
+"""Incremental per-user rollups of MetricsEvent and PredictionLog.
+
+Every ingested row is folded into one MetricRollup row per (metric, resolution)
+bucket: count / sum / min / max and the value of the latest event. The ingest
+writer calls apply_rows() inside its flush transaction, so rollups cover
+exactly the committed raw rows. Trend reads are then an index range scan over
+MetricRollup returning one row per bucket, independent of how many raw events
+fell into it.
+
+Metrics:
+  tremor_index, hr_bpm, hrv_rmssd_ms, steps_last_5m   from MetricsEvent (value = column)
+  activity_<id>                                       from PredictionLog (value = confidence,
+                                                      so count is the activity mix)
+"""
+from dataclasses import dataclass
+from datetime import datetime, timezone
+from typing import Dict, Iterable, List, Tuple
+
+from sqlalchemy import case, delete, func
+from sqlalchemy.engine import Connection
+from sqlmodel import Session, select
+
+from db.models import MetricRollup, MetricsEvent, PredictionLog
+from db.session import upsert_insert
+
+RESOLUTIONS = {"minute": 60, "hour": 3600, "day": 86400}
+METRICS_EVENT_FIELDS = ("tremor_index", "hr_bpm", "hrv_rmssd_ms", "steps_last_5m")
+ACTIVITY_METRICS = tuple(f"activity_{i}" for i in (0, 1, 2, 3, 4, 6))
+
+Key = Tuple[int, str, str, datetime]     # user_id, metric, resolution, bucket_start
+
+
+@dataclass
+class Agg:
+    count: int
+    sum: float
+    min: float
+    max: float
+    last: float
+    last_ts: datetime
+
+    def add(self, value: float, ts: datetime):
+        self.count += 1
+        self.sum += value
+        self.min = min(self.min, value)
+        self.max = max(self.max, value)
+        if ts >= self.last_ts:
+            self.last, self.last_ts = value, ts
+
+
+def as_utc(ts: datetime) -> datetime:
+    """SQLite hands datetimes back naive; everything stored here is UTC."""
+    return ts.replace(tzinfo=timezone.utc) if ts.tzinfo is None else ts.astimezone(timezone.utc)
+
+
+def bucket_start(ts: datetime, resolution: str) -> datetime:
+    step = RESOLUTIONS[resolution]
+    epoch = int(as_utc(ts).timestamp())
+    return datetime.fromtimestamp(epoch - epoch % step, tz=timezone.utc)
+
+
+def _samples(model: type, row: dict) -> Iterable[Tuple[int, str, float, datetime]]:
+    """(user_id, metric, value, ts) pairs contributed by one raw row."""
+    if model is MetricsEvent:
+        ts = as_utc(row["ts"])
+        for field in METRICS_EVENT_FIELDS:
+            yield row["user_id"], field, float(row[field]), ts
+    elif model is PredictionLog:
+        yield row["user_id"], f"activity_{row['activity_id']}", float(row["confidence"]), as_utc(row["created_at"])
+
+
+def aggregate(batches: Dict[type, List[dict]]) -> Dict[Key, Agg]:
+    """Reduces raw rows to one Agg per bucket, in memory."""
+    aggs: Dict[Key, Agg] = {}
+    for model, rows in batches.items():
+        for row in rows:
+            for user_id, metric, value, ts in _samples(model, row):
+                for resolution in RESOLUTIONS:
+                    key = (user_id, metric, resolution, bucket_start(ts, resolution))
+                    agg = aggs.get(key)
+                    if agg is None:
+                        aggs[key] = Agg(1, value, value, value, value, ts)
+                    else:
+                        agg.add(value, ts)
+    return aggs
+
+
+def upsert(conn: Connection, aggs: Dict[Key, Agg]):
+    """Merges bucket aggregates into MetricRollup with one executemany upsert."""
+    if not aggs:
+        return
+    table = MetricRollup.__table__
+    stmt = upsert_insert(conn, table)
+    ex, c = stmt.excluded, table.c
+    # Two-argument min()/max() are scalar functions in SQLite; PostgreSQL spells them least()/greatest()
+    least, greatest = (func.min, func.max) if conn.dialect.name == "sqlite" else (func.least, func.greatest)
+    stmt = stmt.on_conflict_do_update(
+        index_elements=[c.user_id, c.metric, c.resolution, c.bucket_start],
+        set_={
+            "count": c.count + ex.count,
+            "sum": c.sum + ex.sum,
+            "min": least(c.min, ex.min),
+            "max": greatest(c.max, ex.max),
+            "last": case((ex.last_ts >= c.last_ts, ex.last), else_=c.last),
+            "last_ts": greatest(c.last_ts, ex.last_ts),
+        },
+    )
+    conn.execute(stmt, [
+        {"user_id": user_id, "metric": metric, "resolution": resolution, "bucket_start": start,
+         "count": a.count, "sum": a.sum, "min": a.min, "max": a.max, "last": a.last, "last_ts": a.last_ts}
+        for (user_id, metric, resolution, start), a in aggs.items()
+    ])
+
+
+def apply_rows(conn: Connection, batches: Dict[type, List[dict]]):
+    """BatchWriter hook: folds a flushed batch into the rollups."""
+    upsert(conn, aggregate(batches))
+
+
+def rebuild(engine, user_id: int = None, chunk_size: int = 5000) -> int:
+    """Recomputes rollups from the raw tables (all users, or one). Returns raw rows read."""
+    n = 0
+    with engine.begin() as conn:
+        stmt = delete(MetricRollup)
+        if user_id is not None:
+            stmt = stmt.where(MetricRollup.user_id == user_id)
+        conn.execute(stmt)
+
+        for model in (MetricsEvent, PredictionLog):
+            query = select(model.__table__)
+            if user_id is not None:
+                query = query.where(model.user_id == user_id)
+            result = conn.execution_options(yield_per=chunk_size).execute(query)
+            for chunk in result.mappings().partitions():
+                rows = [dict(r) for r in chunk]
+                upsert(conn, aggregate({model: rows}))
+                n += len(rows)
+    return n
+
+
+def read_trend(session: Session, user_id: int, metric: str, resolution: str,
+               start: datetime, end: datetime) -> List[MetricRollup]:
+    """Buckets with start <= bucket_start < end, oldest first."""
+    return session.exec(
+        select(MetricRollup).where(
+            MetricRollup.user_id == user_id,
+            MetricRollup.metric == metric,
+            MetricRollup.resolution == resolution,
+            MetricRollup.bucket_start >= bucket_start(start, resolution),
+            MetricRollup.bucket_start < as_utc(end),
+        ).order_by(MetricRollup.bucket_start)
+    ).all()
+
+
+def read_activity_mix(session: Session, user_id: int, resolution: str,
+                      start: datetime, end: datetime) -> List[MetricRollup]:
+    return session.exec(
+        select(MetricRollup).where(
+            MetricRollup.user_id == user_id,
+            MetricRollup.metric.in_(ACTIVITY_METRICS),
+            MetricRollup.resolution == resolution,
+            MetricRollup.bucket_start >= bucket_start(start, resolution),
+            MetricRollup.bucket_start < as_utc(end),
+        ).order_by(MetricRollup.bucket_start)
+    ).all()
@@ -0,0 +1,46 @@
+"""Trend range handling. Run from backend/: python -m pytest -q test_trends.py"""
+import os
+import tempfile
+from datetime import datetime, timedelta, timezone
+
+os.environ["DATABASE_URL"] = "sqlite:///" + os.path.join(tempfile.mkdtemp(), "trends.db")
+
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+
+from db.init_db import init_db
+from db.session import engine
+from routes import trends
+from services.rollups import aggregate, upsert
+from db.models import MetricsEvent
+
+app = FastAPI()
+app.include_router(trends.router, prefix="/v1")
+init_db()
+with engine.begin() as conn:
+    upsert(conn, aggregate({MetricsEvent: [{
+        "user_id": 1, "ts": datetime(2024, 1, 1, 10, 30, tzinfo=timezone.utc), "hr_bpm": 70.0, "hrv_rmssd_ms": 40.0,
+        "steps_last_5m": 12, "sleep_last_night_min": 400, "tremor_index": 2.5,
+    }]}))
+client = TestClient(app)
+
+
+def test_naive_and_aware_bounds():
+    # start without an offset (treated as UTC), end with one
+    r = client.get("/v1/users/1/trends/tremor_index",
+                   params={"resolution": "hour", "start": "2024-01-01T00:00:00", "end": "2024-01-02T00:00:00+00:00"})
+    assert r.status_code == 200, r.text
+    assert [b["count"] for b in r.json()] == [1]
+    assert r.json()[0]["mean"] == 2.5
+
+
+def test_naive_bounds_only():
+    r = client.get("/v1/users/1/activity-mix",
+                   params={"resolution": "hour", "start": "2024-01-01T00:00:00", "end": "2024-01-01T12:00:00"})
+    assert r.status_code == 200, r.text
+
+
+def test_naive_start_defaults_end_to_now():
+    start = (datetime.now(timezone.utc) - timedelta(days=2)).replace(tzinfo=None).isoformat()
+    r = client.get("/v1/users/1/trends/tremor_index", params={"resolution": "day", "start": start})
+    assert r.status_code == 200, r.text
@@ -1,29 +1,66 @@
+import json
 import os
+import time
 from typing import List, Optional
 import numpy as np
-import tensorflow as tf
-from fastapi import FastAPI, HTTPException
-from pydantic import BaseModel, Field
-from llama_cpp import Llama
+from fastapi import FastAPI, HTTPException, Request, Response, WebSocket, WebSocketDisconnect
+from fastapi.concurrency import run_in_threadpool
+from fastapi.responses import JSONResponse, PlainTextResponse, StreamingResponse
+from pydantic import BaseModel, Field, ValidationError
+
+import codec
+from batching import MicroBatcher
+from engine import InferenceEngine
+from metrics import METRICS, PROFILER, RATE_BUCKETS, SIZE_BUCKETS
+from registry import ModelRegistry
+from quantize import load_report
+from healin_chat.llm import LLMExecutor, LLMTimeout, LLMUnavailable, PrefixCachedLLM, QueueFull
+from healin_chat.context_builder import build_context, event_prediction
+from context_store import make_store
+from dedup import WindowGate, fingerprint
+from rolling import RollingStore
+from streaming import StreamSessions, decode_samples
+
+from datetime import datetime, timezone
 
-from collections import deque
-from datetime import datetime
+app = FastAPI(title="Parkinson Activity & Chat Assistant")
 
-LATEST_CTX = None
-HISTORY = deque(maxlen=20)
 
-app = FastAPI(title="Parkinson Activity & Chat Assistant")
+METRICS.describe("http_requests_total", "HTTP requests by method, route template and status")
+METRICS.describe("http_request_seconds", "End-to-end HTTP request latency by route template")
+METRICS.describe("http_errors_total", "HTTP requests that ended with a 5xx status, by route template")
+
+
+@app.middleware("http")
+async def _count_requests(request: Request, call_next):
+    """Request counts and end-to-end latency per route template and status."""
+    start = time.perf_counter()
+    status = 500
+    try:
+        response = await call_next(request)
+        status = response.status_code
+        return response
+    finally:
+        route = request.scope.get("route")
+        path = route.path if route is not None else "unmatched"
+        METRICS.inc("http_requests_total", method=request.method, route=path, status=status)
+        METRICS.observe("http_request_seconds", time.perf_counter() - start, route=path)
+        if status >= 500:
+            METRICS.inc("http_errors_total", route=path)
 
-import os
 os.environ['TF_FORCE_GPU_ALLOW_GROWTH'] = 'true'
 os.environ['HSA_OVERRIDE_GFX_VERSION'] = '10.3.0'
 
-ENCODER_CLASSES = np.array([0, 1, 2, 3, 4, 6], dtype=np.int32)
+# Model output index → activity id; None means the indices are the ids
+ENCODER_CLASSES: Optional[np.ndarray] = np.array([0, 1, 2, 3, 4, 6], dtype=np.int32)
 ID_TO_LABEL = {
     0: "Rest", 1: "Seated Exercise", 2: "Gait Training",
     3: "Balance Practice", 4: "Stretching", 6: "Medication Check",
 }
 
+# Requests without an X-Session-Id header / session_id query param share this session
+DEFAULT_SESSION = "default"
+
 class InferRequest(BaseModel):
     x: List[List[float]] = Field(..., description="Windowed IMU features [seq_len][3]")
 
@@ -32,73 +69,264 @@ class InferResponse(BaseModel):
     pred_index: int
     pred_activity_id: int
     pred_label: str
+    reused: bool = False    # prediction of an earlier near-identical window (INFER_DEDUP)
+
+class InferBatchRequest(BaseModel):
+    x: List[List[List[float]]] = Field(..., description="N windows of IMU features [n][seq_len][3]")
+
+class InferBatchResponse(BaseModel):
+    probs: List[List[float]]
+    pred_index: List[int]
+    pred_activity_id: List[int]
+    pred_label: List[str]
+
+class StreamChunk(BaseModel):
+    samples: List[List[float]] = Field(..., description="Raw IMU samples [n][3] (AccV, AccML, AccAP)")
+
+class StreamPrediction(InferResponse):
+    window_start: int
 
 class ChatRequest(BaseModel):
     message: str
-
-_MODEL: Optional[tf.keras.Model] = None
-_LLM: Optional[Llama] = None
+    session_id: str = DEFAULT_SESSION
+
+_ENGINE: Optional[InferenceEngine] = None
+_LLM: Optional[LLMExecutor] = None
+_BATCHER: Optional[MicroBatcher] = None
+
+# Opt-in micro-batching: queue windows from concurrent /infer calls and run them
+# through the model together (flush at INFER_MAX_BATCH windows or INFER_MAX_WAIT_MS).
+INFER_BATCHING = os.getenv("INFER_BATCHING", "0") == "1"
+INFER_MAX_BATCH = int(os.getenv("INFER_MAX_BATCH", "32"))
+INFER_MAX_WAIT_MS = float(os.getenv("INFER_MAX_WAIT_MS", "5"))
+
+# Quantized LSTM published by quantize.py ("float16" / "int8"): selects the tflite
+# backend and fog_6class_lstm.<variant>.tflite unless INFER_BACKEND / MODEL_PATH say
+# otherwise. The variant only loads if its evaluation report says it passed.
+# Set MODEL_SOURCE_PATH to the .keras file to also check that the variant was
+# exported from it (the report's source_sha256); unset, the report is trusted and
+# the serving host needs no .keras file.
+MODEL_VARIANT = os.getenv("MODEL_VARIANT")
+MODEL_SOURCE_PATH = os.getenv("MODEL_SOURCE_PATH")
+
+# Inference backend: "tf" (traced tf.function), "tflite", "onnx" or "numpy".
+# MODEL_PATH must point at the matching artifact (.keras / .tflite / .onnx / .npz).
+# Only the "tf" backend imports TensorFlow.
+INFER_BACKEND = os.getenv("INFER_BACKEND", "tflite" if MODEL_VARIANT else "tf")
+
+# Chat runs on LLM_WORKERS dedicated threads, each with its own model instance.
+# At most LLM_MAX_QUEUE requests wait for a worker (429 beyond that); a request
+# that has not finished LLM_TIMEOUT_S after it was queued gets a 504.
+LLM_WORKERS = int(os.getenv("LLM_WORKERS", "1"))
+LLM_MAX_QUEUE = int(os.getenv("LLM_MAX_QUEUE", "8"))
+LLM_TIMEOUT_S = float(os.getenv("LLM_TIMEOUT_S", "120"))
+
+# Chat prompts get a compact summary of the last CHAT_CONTEXT_WINDOWS predictions and
+# the session's rolling movement stats, capped at CHAT_CONTEXT_TOKENS tokens
+# (see healin_chat.context_builder)
+CHAT_CONTEXT_WINDOWS = int(os.getenv("CHAT_CONTEXT_WINDOWS", "10"))
+CHAT_CONTEXT_TOKENS = int(os.getenv("CHAT_CONTEXT_TOKENS", "256"))
+
+# Opt-in near-duplicate gating for single windows (/infer and streaming): a window whose
+# summary stats are within INFER_DEDUP_THRESHOLD of the session's last inferred window,
+# or whose fingerprint (quantized to INFER_DEDUP_QUANT) is in the LRU result cache,
+# reuses that prediction instead of running the model (see dedup.py).
+INFER_DEDUP = os.getenv("INFER_DEDUP", "0") == "1"
+_GATE: Optional[WindowGate] = WindowGate(
+    threshold=float(os.getenv("INFER_DEDUP_THRESHOLD", "0.02")),
+    quant_step=float(os.getenv("INFER_DEDUP_QUANT", "0.05")),
+    cache_size=int(os.getenv("INFER_DEDUP_CACHE", "4096")),
+    max_sessions=int(os.getenv("CONTEXT_MAX_SESSIONS", "10000")),
+) if INFER_DEDUP else None
+
+# Upper bound on windows per /infer/batch call (413 above this)
+INFER_MAX_BATCH_WINDOWS = int(os.getenv("INFER_MAX_BATCH_WINDOWS", "4096"))
+
+# Per-session inference history used by /chat. CONTEXT_STORE=sqlite:///ctx.db lets
+# several uvicorn workers on one host share it; "memory" is per process.
+CONTEXT = make_store(
+    os.getenv("CONTEXT_STORE", "memory"),
+    capacity=int(os.getenv("CONTEXT_CAPACITY", "20")),
+    max_sessions=int(os.getenv("CONTEXT_MAX_SESSIONS", "10000")),
+    ttl_s=float(os.getenv("CONTEXT_TTL_S", "3600")),
+)
+
+# Movement stats over the last 5 min / 1 h / today per session, updated in O(1) per
+# window (see rolling.py); per process, like the "memory" context store
+ROLLING = RollingStore(max_sessions=int(os.getenv("CONTEXT_MAX_SESSIONS", "10000")))
+
+# Streaming ingestion: per-session ring buffers that cut 100x3 windows server-side
+STREAMS = StreamSessions(max_sessions=int(os.getenv("STREAM_MAX_SESSIONS", "1000")))
 
 def _get_device() -> str:
+    if INFER_BACKEND != "tf":
+        return "CPU"
+    import tensorflow as tf
     gpus = tf.config.list_physical_devices("GPU")
     return f"GPU:{len(gpus)}" if gpus else "CPU"
 
+# Models load in the background: the process answers /health/live immediately and
+# /health/ready once every required model is loaded. The chat model only gates
+# readiness with CHAT_REQUIRED=1.
+MODEL_PATH = os.getenv("MODEL_PATH", f"./fog_6class_lstm.{MODEL_VARIANT}.tflite" if MODEL_VARIANT
+                       else "./fog_6class_lstm_patched.keras")
+LLM_PATH = os.getenv("LLM_PATH", "./models/medgemma-4b-it-q8_0.gguf")
+CHAT_REQUIRED = os.getenv("CHAT_REQUIRED", "0") == "1"
+
+MODELS = ModelRegistry()
+_VARIANT_REPORT: Optional[dict] = None
+
+
+def _load_lstm() -> InferenceEngine:
+    """Loads the LSTM and traces/allocates it before the first request arrives."""
+    global _ENGINE, _BATCHER, _VARIANT_REPORT
+    if MODEL_VARIANT:
+        _VARIANT_REPORT = load_report(MODEL_PATH, MODEL_SOURCE_PATH)
+    engine = InferenceEngine.load(INFER_BACKEND, MODEL_PATH)
+    engine.warmup(batch_sizes=(1, INFER_MAX_BATCH) if INFER_BATCHING else (1,))
+    if INFER_BATCHING:
+        _BATCHER = MicroBatcher(_predict_batch, max_batch=INFER_MAX_BATCH, max_wait_ms=INFER_MAX_WAIT_MS)
+    _ENGINE = engine
+    return engine
+
+
+def _load_chat() -> LLMExecutor:
+    """Loads the chat GGUF (memory-mapped, so pages are shared and faulted in
+    lazily), prefills the system prefix and runs one warmup generation per worker."""
+    global _LLM
+    from llama_cpp import Llama
+
+    def instance():
+        llm = PrefixCachedLLM(
+            Llama(model_path=LLM_PATH, n_gpu_layers=0, n_ctx=3072, use_mmap=True, verbose=True), CHAT_PREFIX
+        )
+        llm.warmup()
+        return llm
+
+    _LLM = LLMExecutor(instance, workers=LLM_WORKERS, max_queue=LLM_MAX_QUEUE)
+    return _LLM
+
+
 @app.on_event("startup")
 def startup_event():
-    global _MODEL, _LLM
-    
-    # Load LSTM Model (TensorFlow)
-    model_path = os.getenv("MODEL_PATH", "./fog_6class_lstm_patched.keras")
-    if os.path.exists(model_path):
-        _MODEL = tf.keras.models.load_model(model_path, safe_mode=False)
-    
-    # Load TinyLlama Model (llama-cpp)
-    # Using n_gpu_layers=10 to save some VRAM for the LSTM model
-    llm_path = "./models/medgemma-4b-it-q8_0.gguf"
-    if os.path.exists(llm_path):
-        _LLM = Llama(model_path=llm_path, n_gpu_layers=0, n_ctx=3072, verbose=True)
+    MODELS.register("lstm", _load_lstm, required=True, path=MODEL_PATH)
+    MODELS.register("chat", _load_chat, required=CHAT_REQUIRED, path=LLM_PATH)
+    MODELS.start()
+
+
+@app.on_event("shutdown")
+def shutdown_event():
+    if _BATCHER is not None:
+        _BATCHER.stop()
+    if _LLM is not None:
+        _LLM.stop()
+
+
+def _not_ready(name: str) -> HTTPException:
+    return HTTPException(status_code=503, detail=f"{name} model {MODELS.state(name) or 'not registered'}",
+                         headers={"Retry-After": "5"})
+
+
+METRICS.describe("model_calls_total", "LSTM model calls, by inference backend")
+METRICS.describe("model_batch_windows", "Windows per LSTM model call")
+
+
+def _predict_batch(x_batched: np.ndarray) -> np.ndarray:
+    """Runs the LSTM on a (B, 100, 3) batch and returns (B, num_classes) probabilities."""
+    METRICS.inc("model_calls_total", backend=INFER_BACKEND)
+    METRICS.observe("model_batch_windows", len(x_batched), buckets=SIZE_BUCKETS)
+    with METRICS.timer("model", "predict"):
+        return _ENGINE.predict(x_batched)
+
+
+@app.get("/health/live")
+def health_live():
+    return {"live": True}
+
+
+@app.get("/health/ready")
+def health_ready():
+    if not MODELS.ready():
+        return JSONResponse(status_code=503, content={"ready": False, "models": MODELS.status()})
+    return {"ready": True}
 
 
 @app.get("/health")
 def health():
     return {
         "ok": True,
-        "device": _get_device(),
-        "lstm_loaded": _MODEL is not None,
+        "live": True,
+        "ready": MODELS.ready(),
+        "models": MODELS.status(),
+        "device": _get_device() if _ENGINE is not None else None,   # don't import TF while it is loading
+        "lstm_loaded": _ENGINE is not None,
+        "backend": _ENGINE.name if _ENGINE is not None else None,
+        "model_variant": MODEL_VARIANT,
+        "variant_eval": {k: _VARIANT_REPORT.get(k) for k in ("agreement", "accuracy", "accuracy_drop", "windows")}
+                        if _VARIANT_REPORT is not None else None,
+        "warmup_ms": _ENGINE.warmup_ms if _ENGINE is not None else None,
         "chat_loaded": _LLM is not None,
+        "chat_queue": _LLM.stats() if _LLM is not None else None,
+        "batching": _BATCHER is not None,
     }
 
-from collections import deque
-from datetime import datetime
-import numpy as np
-from fastapi import HTTPException
 
-# Put these near your globals (top of file)
-LATEST_CTX = None
-HISTORY = deque(maxlen=20)
+@app.get("/infer/stats")
+def infer_stats():
+    """Batch-size histogram and queue-wait percentiles for the micro-batcher, and
+    near-duplicate gating hit rates."""
+    dedup = _GATE.stats() if _GATE is not None else None
+    if _BATCHER is None:
+        return {"batching": False, "dedup": dedup}
+    return {
+        "dedup": dedup,
+        "batching": True,
+        "max_batch": _BATCHER.max_batch,
+        "max_wait_ms": _BATCHER.max_wait * 1000.0,
+        **_BATCHER.stats.snapshot(),
+    }
 
-@app.post("/infer", response_model=InferResponse)
-def infer(req: InferRequest):
-    """Runs LSTM inference on a single IMU window (100x3), returns probs + prediction,
-    and stores a compact context summary for the /chat endpoint to use.
-    """
-    global _MODEL, LATEST_CTX, HISTORY
+@app.get("/sessions/{session_id}/movement")
+def session_movement(session_id: str):
+    """Rolling movement stats (5 min, 1 h, today, EWMA trend) for caregiver alerting."""
+    snapshot = ROLLING.snapshot(session_id)
+    if snapshot is None:
+        raise HTTPException(status_code=404, detail=f"No windows for session {session_id!r}")
+    return snapshot
 
-    if _MODEL is None:
-        raise HTTPException(status_code=500, detail="LSTM Model not loaded")
 
-    x = np.asarray(req.x, dtype=np.float32)
+@app.get("/metrics", response_class=PlainTextResponse)
+def metrics():
+    """Prometheus text exposition of request, stage, model and LLM metrics."""
+    return PlainTextResponse(METRICS.render(), media_type="text/plain; version=0.0.4")
+
+
+@app.get("/debug/profiler")
+def profiler_status():
+    return PROFILER.status()
+
+
+@app.post("/debug/profiler/start")
+def profiler_start(interval_ms: float = 5.0):
+    """Starts sampling all thread stacks every interval_ms (clears earlier samples)."""
+    PROFILER.start(interval_ms=max(interval_ms, 1.0))
+    return PROFILER.status()
+
+
+@app.post("/debug/profiler/stop")
+def profiler_stop():
+    PROFILER.stop()
+    return PROFILER.status()
+
+
+@app.get("/debug/profiler/stacks", response_class=PlainTextResponse)
+def profiler_stacks(limit: int = 0):
+    """Collapsed stacks ("frame;frame;frame count"), for flamegraph.pl or speedscope."""
+    return PROFILER.collapsed(limit)
 
-    if x.ndim != 2:
-        raise HTTPException(status_code=422, detail="x must be a 2D array shaped [seq_len][3]")
-    if x.shape[1] != 3:
-        raise HTTPException(
-            status_code=422,
-            detail=f"x must have 3 features per timestep (ax, ay, az). Got shape {list(x.shape)}",
-        )
-    if x.shape[0] != 100:
-        raise HTTPException(status_code=422, detail=f"Expected seq_len=100 timesteps, got {x.shape[0]}")
 
+def _window_stats(x: np.ndarray) -> dict:
+    """Compact movement summary of one (100, 3) window for the chat context."""
     # Per-axis summary
     mean_xyz = x.mean(axis=0)                 # (3,)
     std_xyz = x.std(axis=0)                   # (3,)
@@ -123,30 +351,74 @@ def infer(req: InferRequest):
         "movement_mag_min": mag_min,
         "movement_mag_max": mag_max,
     }
-
-    x_batched = np.expand_dims(x, axis=0)    
-    probs = _MODEL.predict(x_batched, verbose=0)
+    return stats
+
+
+METRICS.describe("infer_dedup_total", "/infer windows by dedup gate result (miss, or where the reused result came from)")
+METRICS.describe("infer_dedup_saved_seconds_total", "Estimated model time saved by reusing deduplicated results")
+
+
+def _infer_window(x: np.ndarray, session_id: str) -> InferResponse:
+    """Runs the LSTM on one validated (100, 3) window and records it in the session's chat context."""
+    with METRICS.timer("infer", "stats"):
+        stats = _window_stats(x)
+
+    if _GATE is not None:
+        with METRICS.timer("infer", "dedup"):
+            fp = fingerprint(x, _GATE.quant_step)
+            cached, source = _GATE.lookup(session_id, stats, fp)
+        if cached is not None:
+            METRICS.inc("infer_dedup_total", result=source)
+            METRICS.inc("infer_dedup_saved_seconds_total", _GATE.mean_predict_s)
+            resp = _record_prediction(stats, cached, session_id)
+            resp.reused = True
+            return resp
+        METRICS.inc("infer_dedup_total", result="miss")
+
+    with METRICS.timer("infer", "predict"):    # includes micro-batch queueing when enabled
+        if _BATCHER is not None:
+            fut = _BATCHER.submit(x)
+            probs = fut.result()[np.newaxis, :]
+            model_s = fut.model_s              # this window's share of the batch, without queue wait
+        else:
+            start = time.perf_counter()
+            x_batched = np.expand_dims(x, axis=0)
+            probs = _predict_batch(x_batched)
+            model_s = time.perf_counter() - start
 
     probs = np.asarray(probs, dtype=np.float32)
     if probs.ndim != 2 or probs.shape[0] != 1:
         raise HTTPException(status_code=500, detail=f"Unexpected model output shape: {list(probs.shape)}")
 
-    probs_1d = probs[0]                        
+    if _GATE is not None:
+        _GATE.store(session_id, stats, fp, probs[0], model_s)
+    return _record_prediction(stats, probs[0], session_id)
+
+
+def _record_prediction(stats: dict, probs_1d: np.ndarray, session_id: str) -> InferResponse:
+    """Turns one probability row into a prediction and appends it to the session's chat
+    context and rolling stats."""
+    with METRICS.timer("infer", "topk"):
+        resp, event = _prediction_event(stats, probs_1d)
+    with METRICS.timer("infer", "context"):
+        CONTEXT.append(session_id, event)
+        ROLLING.update(session_id, stats)
+    return resp
+
+
+def _prediction_event(stats: dict, probs_1d: np.ndarray) -> tuple:
     pred_index = int(np.argmax(probs_1d))
 
-    try:
-        pred_activity_id = int(ENCODER_CLASSES[pred_index])
-    except Exception:
-        pred_activity_id = pred_index  # fallback
+    pred_activity_id = int(ENCODER_CLASSES[pred_index]) if ENCODER_CLASSES is not None else pred_index
     pred_label = ID_TO_LABEL.get(pred_activity_id, f"CLASS_{pred_activity_id}")
 
     topk = 3
     top_indices = np.argsort(-probs_1d)[:topk].tolist()
-    top_activity_ids = [int(ENCODER_CLASSES[i]) for i in top_indices] if "ENCODER_CLASSES" in globals() else top_indices
+    top_activity_ids = [int(ENCODER_CLASSES[i]) for i in top_indices] if ENCODER_CLASSES is not None else top_indices
     top_labels = [ID_TO_LABEL.get(aid, f"CLASS_{aid}") for aid in top_activity_ids]
 
     event = {
-        "ts": datetime.utcnow().isoformat() + "Z",
+        "ts": datetime.now(timezone.utc).isoformat().replace("+00:00", "Z"),
         "pred_index": pred_index,
         "pred_activity_id": pred_activity_id,
         "pred_label": pred_label,
@@ -156,47 +428,318 @@ def infer(req: InferRequest):
         "top_labels": top_labels,
         "stats": stats,
     }
-    LATEST_CTX = event
-    HISTORY.append(event)
 
     return InferResponse(
         probs=probs_1d.tolist(),
         pred_index=pred_index,
         pred_activity_id=pred_activity_id,
         pred_label=pred_label,
+    ), event
+
+
+def _check_window(x: np.ndarray):
+    if x.ndim != 2:
+        raise HTTPException(status_code=422, detail="x must be a 2D array shaped [seq_len][3]")
+    if x.shape[1] != 3:
+        raise HTTPException(
+            status_code=422,
+            detail=f"x must have 3 features per timestep (ax, ay, az). Got shape {list(x.shape)}",
+        )
+    if x.shape[0] != 100:
+        raise HTTPException(status_code=422, detail=f"Expected seq_len=100 timesteps, got {x.shape[0]}")
+
+
+async def _read_windows(request: Request, model: type) -> np.ndarray:
+    """Decodes the request body as JSON (validated by `model`) or as the binary codec format."""
+    body = await request.body()
+    if codec.is_binary(request.headers.get("content-type", "")):
+        try:
+            return codec.decode(body)
+        except ValueError as e:
+            raise HTTPException(status_code=422, detail=str(e))
+    try:
+        return np.asarray(model.model_validate_json(body).x, dtype=np.float32)
+    except ValidationError as e:
+        raise HTTPException(status_code=422, detail=json.loads(e.json()))
+
+
+def _session_id(request: Request) -> str:
+    return request.headers.get("x-session-id") or request.query_params.get("session_id") or DEFAULT_SESSION
+
+
+def _wants_binary(request: Request) -> bool:
+    return codec.MEDIA_TYPE in request.headers.get("accept", "")
+
+
+def _body_doc(model: type) -> dict:
+    """OpenAPI request body for routes that read the raw body themselves."""
+    return {"requestBody": {"required": True, "content": {
+        "application/json": {"schema": model.model_json_schema()},
+        codec.MEDIA_TYPE: {"schema": {"type": "string", "format": "binary"}},
+    }}}
+
+
+@app.post("/infer", response_model=InferResponse, openapi_extra=_body_doc(InferRequest))
+async def infer(request: Request):
+    """Runs LSTM inference on a single IMU window (100x3), returns probs + prediction,
+    and stores a compact context summary for the /chat endpoint to use.
+
+    Accepts JSON {"x": [[...]]} or a codec.py binary body (application/octet-stream)
+    shaped (100, 3) or (1, 100, 3). Send Accept: application/octet-stream to get the
+    probabilities back in the same binary format. The X-Session-Id header (or
+    ?session_id=) selects whose chat context the prediction is stored under.
+    """
+    if _ENGINE is None:
+        raise _not_ready("lstm")
+
+    with METRICS.timer("infer", "parse"):    # body read + JSON/binary decode + np.asarray
+        x = await _read_windows(request, InferRequest)
+    with METRICS.timer("infer", "validate"):
+        if x.ndim == 3 and x.shape[0] == 1:
+            x = x[0]
+        _check_window(x)
+
+    resp = await run_in_threadpool(_infer_window, x, _session_id(request))
+    if _wants_binary(request):
+        return Response(codec.encode(np.asarray(resp.probs, dtype=np.float32)), media_type=codec.MEDIA_TYPE)
+    return resp
+
+
+def _infer_batch(x: np.ndarray, session_id: str) -> np.ndarray:
+    probs = np.asarray(_predict_batch(x), dtype=np.float32)
+    if probs.ndim != 2 or probs.shape[0] != x.shape[0]:
+        raise HTTPException(status_code=500, detail=f"Unexpected model output shape: {list(probs.shape)}")
+    # Every window feeds the rolling stats; the newest becomes the chat context, same
+    # as a single /infer call
+    if len(x) > 1:
+        mag = np.linalg.norm(x[:-1], axis=2)          # (N-1, 100)
+        ROLLING.update_many(session_id, zip([mag.shape[1]] * len(mag), mag.mean(axis=1), mag.std(axis=1),
+                                            mag.min(axis=1), mag.max(axis=1)))
+    _record_prediction(_window_stats(x[-1]), probs[-1], session_id)
+    return probs
+
+
+@app.post("/infer/batch", response_model=InferBatchResponse, openapi_extra=_body_doc(InferBatchRequest))
+async def infer_batch(request: Request):
+    """Runs N windows (N x 100 x 3) through the LSTM in one call and returns an N x 6
+    probability matrix. Same JSON / binary request and response options as /infer."""
+    if _ENGINE is None:
+        raise _not_ready("lstm")
+
+    with METRICS.timer("infer_batch", "parse"):
+        x = await _read_windows(request, InferBatchRequest)
+    if x.ndim != 3 or x.shape[1:] != (100, 3):
+        raise HTTPException(status_code=422, detail=f"x must be shaped [n][100][3], got {list(x.shape)}")
+    if x.shape[0] == 0:
+        raise HTTPException(status_code=422, detail="x must contain at least one window")
+    if x.shape[0] > INFER_MAX_BATCH_WINDOWS:
+        raise HTTPException(status_code=413, detail=f"At most {INFER_MAX_BATCH_WINDOWS} windows per batch")
+
+    probs = await run_in_threadpool(_infer_batch, x, _session_id(request))
+    if _wants_binary(request):
+        return Response(codec.encode(probs), media_type=codec.MEDIA_TYPE)
+
+    pred_index = probs.argmax(axis=1)
+    pred_activity_id = (ENCODER_CLASSES[pred_index] if ENCODER_CLASSES is not None else pred_index).tolist()
+    return InferBatchResponse(
+        probs=probs.tolist(),
+        pred_index=pred_index.tolist(),
+        pred_activity_id=pred_activity_id,
+        pred_label=[ID_TO_LABEL.get(aid, f"CLASS_{aid}") for aid in pred_activity_id],
     )
 
-@app.post("/chat")
-def chat(req: ChatRequest):
+
+def _stream_push(session_id: str, samples: np.ndarray) -> List[StreamPrediction]:
+    """Feeds raw samples into a session's ring buffer and runs inference on every completed window."""
+    if samples.ndim != 2 or samples.shape[1] != 3:
+        raise HTTPException(status_code=422, detail=f"samples must be shaped [n][3], got {list(samples.shape)}")
+    return [
+        StreamPrediction(window_start=start, **_infer_window(window, session_id).model_dump())
+        for start, window in STREAMS.get(session_id).push(samples)
+    ]
+
+
+@app.post("/stream/{session_id}/samples", response_model=List[StreamPrediction])
+async def stream_samples(session_id: str, request: Request):
+    """Chunked ingestion: JSON {"samples": [[v, ml, ap], ...]} or a raw little-endian
+    float32 body (Content-Type: application/octet-stream). Returns the predictions
+    for every window completed by this chunk (usually zero or one)."""
+    if _ENGINE is None:
+        raise _not_ready("lstm")
+
+    body = await request.body()
+    if request.headers.get("content-type", "").startswith("application/octet-stream"):
+        try:
+            samples = decode_samples(body)
+        except ValueError as e:
+            raise HTTPException(status_code=422, detail=str(e))
+    else:
+        try:
+            samples = np.asarray(StreamChunk.model_validate_json(body).samples, dtype=np.float32)
+        except ValidationError as e:
+            raise HTTPException(status_code=422, detail=json.loads(e.json()))
+    return await run_in_threadpool(_stream_push, session_id, samples)
+
+
+def _close_session(session_id: str) -> bool:
+    """Drops everything kept for a stream session: its window buffer, dedup entries,
+    rolling movement stats and chat context. True if the stream was open."""
+    if _GATE is not None:
+        _GATE.drop(session_id)
+    ROLLING.drop(session_id)
+    CONTEXT.drop(session_id)
+    return STREAMS.close(session_id)
+
+
+@app.delete("/stream/{session_id}")
+def stream_close(session_id: str):
+    return {"closed": _close_session(session_id)}
+
+
+@app.websocket("/stream/{session_id}")
+async def stream_ws(websocket: WebSocket, session_id: str):
+    """WebSocket ingestion: send binary float32 frames or JSON {"samples": [...]} text
+    frames; a prediction message is pushed back for each completed window."""
+    await websocket.accept()
+    if _ENGINE is None:
+        await websocket.close(code=1013, reason=f"lstm model {MODELS.state('lstm')}")
+        return
+    try:
+        while True:
+            msg = await websocket.receive()
+            if msg["type"] == "websocket.disconnect":
+                break
+            try:
+                if msg.get("bytes") is not None:
+                    samples = decode_samples(msg["bytes"])
+                else:
+                    samples = np.asarray(StreamChunk.model_validate_json(msg["text"]).samples, dtype=np.float32)
+                preds = await run_in_threadpool(_stream_push, session_id, samples)
+            except (ValueError, HTTPException) as e:
+                await websocket.send_json({"error": getattr(e, "detail", str(e))})
+                continue
+            for pred in preds:
+                await websocket.send_json(pred.model_dump())
+    except WebSocketDisconnect:
+        pass
+    finally:
+        await run_in_threadpool(_close_session, session_id)
+
+
+# Constant part of every chat prompt. Kept separate from the per-request suffix so
+# its KV cache can be computed once at startup and reused (see healin_chat.llm.PrefixCachedLLM).
+CHAT_PREFIX = """<|system|>
+You are a Parkinson's assistant. Use the provided sensor inference context to give safe, practical suggestions.
+If context is missing, ask 1 clarifying question.
+You have to majorly answer based on a combination of latest research and the interpretation of the sensor
+statistics.
+</s>
+<|user|>
+"""
+
+CHAT_GEN_KWARGS = dict(max_tokens=192, stop=["</s>"])
+
+
+def _chat_suffix(req: ChatRequest) -> str:
     if _LLM is None:
-        raise HTTPException(status_code=500, detail="Chat model not loaded")
+        raise _not_ready("chat")
 
-    global LATEST_CTX, HISTORY
+    recent = CONTEXT.history(req.session_id, CHAT_CONTEXT_WINDOWS)
+    context = build_context([event_prediction(e) for e in recent], budget_tokens=CHAT_CONTEXT_TOKENS,
+                            count_tokens=_LLM.text_tokens, movement=ROLLING.snapshot(req.session_id))
 
-    ctx = LATEST_CTX or {}
-    recent = list(HISTORY)[-5:]  # last 5 events
+    return f"""User message: {req.message}
 
-    prompt = f"""<|system|>
-    You are a Parkinson's assistant. Use the provided sensor inference context to give safe, practical suggestions.
-    If context is missing, ask 1 clarifying question.
-    You have to majorly answer based on a combination of latest research and the interpretation of the sensor
-    statistics.
-    </s>
-    <|user|>
-    User message: {req.message}
+{context}
 
-    Latest inference context (may be empty):
-    {ctx}
+Respond with:
+1) A short recommendation (1-2 sentences)
+2) A brief "why" grounded in the context
+</s>
+<|assistant|>
+"""
 
-    Recent history (last 5):
-    {recent}
 
-    Respond with:
-    1) A short recommendation (1-2 sentences)
-    2) A brief "why" grounded in the context
-    </s>
-    <|assistant|>
-    """
+def _sse(data: dict) -> str:
+    return f"data: {json.dumps(data)}\n\n"
+
+
+METRICS.describe("llm_rejected_total", "Chat requests rejected because the LLM queue was full")
+METRICS.describe("llm_requests_total", "Chat generations that were started")
+METRICS.describe("llm_prompt_tokens_total", "Prompt tokens of chat generations (cached prefix + suffix)")
+METRICS.describe("llm_completion_tokens_total", "Tokens generated by chat generations")
+METRICS.describe("llm_time_to_first_token_seconds", "Time from queueing a chat request to its first token")
+METRICS.describe("llm_tokens_per_second", "Decode speed of chat generations, after the first token")
+METRICS.describe("llm_timeouts_total", "Chat requests that hit LLM_TIMEOUT_S")
+
 
-    output = _LLM(prompt, max_tokens=192, stop=["</s>"], echo=False)
-    return {"role": "assistant", "content": output["choices"][0]["text"].strip()}
+def _submit_chat(suffix: str):
+    """Queues a generation, mapping executor backpressure to HTTP errors."""
+    try:
+        return _LLM.submit(suffix, LLM_TIMEOUT_S, **CHAT_GEN_KWARGS)
+    except QueueFull as e:
+        METRICS.inc("llm_rejected_total")
+        raise HTTPException(status_code=429, detail=str(e), headers={"Retry-After": "1"})
+    except LLMUnavailable as e:
+        raise HTTPException(status_code=503, detail=str(e))
+
+
+async def _tracked_texts(job, prompt_tokens: int):
+    """job.texts() plus LLM metrics: queue wait / time to first token, generation
+    time, token counts and decode tokens/sec (llama-cpp streams one token per piece)."""
+    submitted = time.perf_counter()
+    first = None
+    n = 0
+    try:
+        async for text in job.texts():
+            if first is None:
+                first = time.perf_counter()
+                METRICS.observe("llm_time_to_first_token_seconds", first - submitted)
+            n += 1
+            yield text
+    finally:
+        end = time.perf_counter()
+        METRICS.inc("llm_requests_total")
+        METRICS.inc("llm_prompt_tokens_total", prompt_tokens)
+        METRICS.inc("llm_completion_tokens_total", n)
+        if first is not None:
+            METRICS.observe("stage_seconds", end - first, op="chat", stage="generate")
+            if n > 1 and end > first:
+                METRICS.observe("llm_tokens_per_second", (n - 1) / (end - first), buckets=RATE_BUCKETS)
+
+
+@app.post("/chat")
+async def chat(req: ChatRequest):
+    with METRICS.timer("chat", "prompt_build"):
+        suffix = _chat_suffix(req)
+        prompt_tokens = _LLM.count_tokens(suffix)
+    job = _submit_chat(suffix)
+    try:
+        text = "".join([piece async for piece in _tracked_texts(job, prompt_tokens)])
+    except LLMTimeout as e:
+        METRICS.inc("llm_timeouts_total")
+        raise HTTPException(status_code=504, detail=str(e))
+    return {"role": "assistant", "content": text.strip(), "prompt_tokens": prompt_tokens}
+
+
+@app.post("/chat/stream")
+async def chat_stream(req: ChatRequest):
+    """Same as /chat, but sends tokens as Server-Sent Events while they are generated:
+    `data: {"token": "..."}` per piece, then `data: {"done": true}` (or `{"error": ...}`).
+    Disconnecting cancels generation."""
+    with METRICS.timer("chat", "prompt_build"):
+        suffix = _chat_suffix(req)
+        prompt_tokens = _LLM.count_tokens(suffix)
+    job = _submit_chat(suffix)
+
+    async def events():
+        try:
+            async for text in _tracked_texts(job, prompt_tokens):
+                yield _sse({"token": text})
+        except LLMTimeout as e:
+            METRICS.inc("llm_timeouts_total")
+            yield _sse({"error": str(e)})
+            return
+        yield _sse({"done": True})
+
+    return StreamingResponse(events(), media_type="text/event-stream")
@@ -0,0 +1,159 @@
+"""Micro-batching scheduler for the /infer endpoint.
+
+/infer is an async handler: it reads and validates the body on the event loop,
+then hands the window to the thread pool (run_in_threadpool) for the stats,
+dedup lookup and prediction. Instead of each of those threads calling the model
+with a (1, 100, 3) batch, windows are queued here and one worker thread flushes
+them to the model as a single (B, 100, 3) tensor once `max_batch` windows are
+waiting or the oldest one has waited `max_wait_ms`. Each pool thread blocks on
+its own Future (the event loop never does) and gets back its own row of
+probabilities.
+"""
+import threading
+import time
+from collections import deque
+from concurrent.futures import Future
+from typing import Callable, Optional
+
+import numpy as np
+
+
+class BatchStats:
+    """Thread-safe counters for batch sizes and queue wait, used for tuning
+    max_batch / max_wait_ms against p99 latency."""
+
+    def __init__(self, max_batch: int, window: int = 4096):
+        self._lock = threading.Lock()
+        self.batches = 0
+        self.windows = 0
+        self.errors = 0
+        self.size_hist = [0] * (max_batch + 1)     # size_hist[b] = batches of size b
+        self.wait_ms: deque = deque(maxlen=window)  # recent per-window queue waits
+        self.predict_ms: deque = deque(maxlen=window)
+
+    def record(self, size: int, waits_s: list, predict_s: float):
+        with self._lock:
+            self.batches += 1
+            self.windows += size
+            self.size_hist[size] += 1
+            self.wait_ms.extend(w * 1000.0 for w in waits_s)
+            self.predict_ms.append(predict_s * 1000.0)
+
+    def record_error(self):
+        with self._lock:
+            self.errors += 1
+
+    def snapshot(self) -> dict:
+        with self._lock:
+            waits = np.asarray(self.wait_ms, dtype=np.float64)
+            preds = np.asarray(self.predict_ms, dtype=np.float64)
+            hist = {str(b): n for b, n in enumerate(self.size_hist) if n}
+            batches, windows, errors = self.batches, self.windows, self.errors
+
+        def pct(a: np.ndarray) -> dict:
+            if a.size == 0:
+                return {"p50": None, "p95": None, "p99": None, "max": None}
+            p50, p95, p99 = np.percentile(a, [50, 95, 99])
+            return {"p50": float(p50), "p95": float(p95), "p99": float(p99), "max": float(a.max())}
+
+        return {
+            "batches": batches,
+            "windows": windows,
+            "errors": errors,
+            "mean_batch_size": (windows / batches) if batches else None,
+            "batch_size_hist": hist,
+            "queue_wait_ms": pct(waits),
+            "predict_ms": pct(preds),
+        }
+
+
+class MicroBatcher:
+    """Collects single windows from many threads and runs them as one batch.
+
+    predict_fn takes a float32 array shaped (B, seq_len, 3) and returns
+    probabilities shaped (B, num_classes).
+    """
+
+    def __init__(
+        self,
+        predict_fn: Callable[[np.ndarray], np.ndarray],
+        max_batch: int = 32,
+        max_wait_ms: float = 5.0,
+    ):
+        if max_batch < 1:
+            raise ValueError("max_batch must be >= 1")
+        self._predict_fn = predict_fn
+        self.max_batch = max_batch
+        self.max_wait = max_wait_ms / 1000.0
+        self.stats = BatchStats(max_batch)
+
+        self._queue: deque = deque()
+        self._cond = threading.Condition()
+        self._stopped = False
+        self._thread = threading.Thread(target=self._run, name="infer-batcher", daemon=True)
+        self._thread.start()
+
+    def submit(self, x: np.ndarray) -> Future:
+        """Queues one window and returns a Future resolving to its probability row.
+        Once resolved, its model_s attribute is the window's share of the batch's
+        model time (queue wait excluded)."""
+        fut: Future = Future()
+        with self._cond:
+            if self._stopped:
+                raise RuntimeError("MicroBatcher is stopped")
+            self._queue.append((x, time.perf_counter(), fut))
+            self._cond.notify()
+        return fut
+
+    def predict(self, x: np.ndarray, timeout: Optional[float] = None) -> np.ndarray:
+        """Blocking helper: returns the probability row for a single window."""
+        return self.submit(x).result(timeout)
+
+    def stop(self, timeout: float = 5.0):
+        """Flushes whatever is still queued, then stops the worker thread."""
+        with self._cond:
+            self._stopped = True
+            self._cond.notify_all()
+        self._thread.join(timeout)
+
+    def _next_batch(self) -> Optional[list]:
+        with self._cond:
+            while not self._queue and not self._stopped:
+                self._cond.wait()
+            if not self._queue:
+                return None  # stopped and drained
+
+            # Wait for the batch to fill, but never past the oldest window's deadline
+            deadline = self._queue[0][1] + self.max_wait
+            while len(self._queue) < self.max_batch and not self._stopped:
+                remaining = deadline - time.perf_counter()
+                if remaining <= 0:
+                    break
+                self._cond.wait(remaining)
+
+            n = min(len(self._queue), self.max_batch)
+            return [self._queue.popleft() for _ in range(n)]
+
+    def _run(self):
+        while True:
+            items = self._next_batch()
+            if items is None:
+                return
+
+            start = time.perf_counter()
+            try:
+                batch = np.stack([x for x, _, _ in items]).astype(np.float32, copy=False)
+                probs = np.asarray(self._predict_fn(batch), dtype=np.float32)
+                if probs.ndim != 2 or probs.shape[0] != len(items):
+                    raise RuntimeError(f"Unexpected model output shape: {list(probs.shape)}")
+            except Exception as e:
+                self.stats.record_error()
+                for _, _, fut in items:
+                    fut.set_exception(e)
+                continue
+
+            predict_s = time.perf_counter() - start
+            self.stats.record(len(items), [start - enqueued for _, enqueued, _ in items], predict_s)
+            for row, (_, _, fut) in zip(probs, items):
+                fut.model_s = predict_s / len(items)
+                fut.set_result(row)
@@ -0,0 +1,85 @@
+"""Time-to-first-token and decode speed for /chat, with and without the prefix cache.
+
+"full prefill" resets the llama context before each request so the whole
+prompt (system block + user turn) is evaluated, which is what the old /chat
+did on a cold context. "prefix cache" restores the saved system-block state
+and only evaluates the user turn.
+
+Usage:
+  python bench_chat.py [--model ./models/medgemma-4b-it-q8_0.gguf] [--requests 5] [--max-tokens 64]
+"""
+import argparse
+import time
+
+import numpy as np
+from llama_cpp import Llama
+
+from app import CHAT_PREFIX
+from healin_chat.llm import PrefixCachedLLM
+
+MESSAGES = [
+    "I feel stiff this morning, what should I do?",
+    "Is it a good time for a walk?",
+    "My legs froze twice in the kitchen today.",
+    "Can I do balance exercises right now?",
+    "I just took my medication, any suggestions?",
+]
+
+
+def suffix_for(message: str) -> str:
+    return f"User message: {message}\n\nLatest inference context (may be empty):\n{{}}\n\n" \
+           f"Recent history (last 5):\n[]\n\nRespond with:\n1) A short recommendation (1-2 sentences)\n" \
+           f"2) A brief \"why\" grounded in the context\n</s>\n<|assistant|>\n"
+
+
+def run(tokens_iter) -> tuple[float, float, int]:
+    """Returns (ttft_s, decode tok/s, n_pieces) for one streamed completion."""
+    start = time.perf_counter()
+    first = None
+    n = 0
+    for _ in tokens_iter:
+        n += 1
+        if first is None:
+            first = time.perf_counter()
+    end = time.perf_counter()
+    first = first or end
+    rate = (n - 1) / (end - first) if n > 1 and end > first else 0.0
+    return first - start, rate, n
+
+
+def full_prefill(cached: PrefixCachedLLM, suffix: str, **kwargs):
+    cached.llm.reset()
+    for chunk in cached.llm.create_completion(cached._prompt(suffix), stream=True, **kwargs):
+        yield chunk["choices"][0]["text"]
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark prefix-cached vs full-prefill chat completions.")
+    parser.add_argument("--model",      default="./models/medgemma-4b-it-q8_0.gguf")
+    parser.add_argument("--requests",   type=int, default=5,  help="Requests per mode (default: 5)")
+    parser.add_argument("--max-tokens", type=int, default=64, help="Tokens generated per request (default: 64)")
+    parser.add_argument("--n-ctx",      type=int, default=3072)
+    args = parser.parse_args()
+
+    start = time.perf_counter()
+    cached = PrefixCachedLLM(Llama(model_path=args.model, n_gpu_layers=0, n_ctx=args.n_ctx, verbose=False), CHAT_PREFIX)
+    print(f"load + prefix prefill: {time.perf_counter() - start:.2f} s  "
+          f"(prefix {len(cached.prefix_tokens)} tokens, prompt ~{cached.count_tokens(suffix_for(MESSAGES[0]))} tokens)\n")
+
+    kwargs = dict(max_tokens=args.max_tokens, stop=["</s>"])
+    modes = {
+        "full prefill": lambda s: full_prefill(cached, s, **kwargs),
+        "prefix cache": lambda s: cached.stream(s, **kwargs),
+    }
+    print(f"{'mode':<14} {'TTFT p50 ms':>12} {'TTFT max ms':>12} {'decode tok/s':>13}")
+    for name, fn in modes.items():
+        ttfts, rates = [], []
+        for i in range(args.requests):
+            ttft, rate, _ = run(fn(suffix_for(MESSAGES[i % len(MESSAGES)])))
+            ttfts.append(ttft * 1e3)
+            rates.append(rate)
+        print(f"{name:<14} {np.median(ttfts):>12.1f} {max(ttfts):>12.1f} {np.mean(rates):>13.1f}")
+
+
+if __name__ == "__main__":
+    main()
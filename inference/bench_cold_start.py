@@ -0,0 +1,91 @@
+"""Cold start of the inference service: time to live, ready and first /infer.
+
+Starts `uvicorn app:app` in a fresh process and polls it, measuring from
+process spawn until
+  live          GET /health/live answers
+  ready         GET /health/ready returns 200 (all required models loaded)
+  first infer   POST /infer with a zero window returns 200
+
+Usage:
+  python bench_cold_start.py [--backend numpy --model fog_6class_lstm.npz] [--runs 3] [--env CHAT_REQUIRED=1]
+"""
+import argparse
+import json
+import os
+import socket
+import subprocess
+import sys
+import time
+import urllib.error
+import urllib.request
+
+import numpy as np
+
+WINDOW = json.dumps({"x": np.zeros((100, 3)).tolist()}).encode()
+
+
+def free_port() -> int:
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def status(url: str, data: bytes = None) -> int:
+    req = urllib.request.Request(url, data=data, headers={"Content-Type": "application/json"})
+    try:
+        with urllib.request.urlopen(req, timeout=5) as resp:
+            return resp.status
+    except urllib.error.HTTPError as e:
+        return e.code
+    except (urllib.error.URLError, ConnectionError, TimeoutError):
+        return 0
+
+
+def run_once(env: dict, timeout_s: float) -> dict:
+    port = free_port()
+    base = f"http://127.0.0.1:{port}"
+    start = time.perf_counter()
+    proc = subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", "app:app", "--port", str(port), "--log-level", "warning"],
+        env={**os.environ, **env}, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL,
+    )
+    marks = {}
+    try:
+        while len(marks) < 3 and time.perf_counter() - start < timeout_s:
+            if "live" not in marks and status(f"{base}/health/live") == 200:
+                marks["live"] = time.perf_counter() - start
+            if "live" in marks and "ready" not in marks and status(f"{base}/health/ready") == 200:
+                marks["ready"] = time.perf_counter() - start
+            if "live" in marks and "first infer" not in marks and status(f"{base}/infer", WINDOW) == 200:
+                marks["first infer"] = time.perf_counter() - start
+            time.sleep(0.02)
+    finally:
+        proc.terminate()
+        proc.wait(timeout=30)
+    return marks
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Measure inference service cold start.")
+    parser.add_argument("--backend", default=None, help="INFER_BACKEND for the service")
+    parser.add_argument("--model",   default=None, help="MODEL_PATH for the service")
+    parser.add_argument("--runs",    type=int, default=3)
+    parser.add_argument("--timeout", type=float, default=300.0, help="Seconds to wait per run (default: 300)")
+    parser.add_argument("--env",     action="append", default=[], help="Extra KEY=VALUE for the service")
+    args = parser.parse_args()
+
+    env = dict(kv.split("=", 1) for kv in args.env)
+    if args.backend:
+        env["INFER_BACKEND"] = args.backend
+    if args.model:
+        env["MODEL_PATH"] = args.model
+
+    print(f"{'run':>4} {'live s':>8} {'ready s':>8} {'first infer s':>14}")
+    for i in range(args.runs):
+        m = run_once(env, args.timeout)
+        cols = [f"{m[k]:.2f}" if k in m else "-" for k in ("live", "ready", "first infer")]
+        print(f"{i + 1:>4} {cols[0]:>8} {cols[1]:>8} {cols[2]:>14}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,100 @@
+"""Prompt size and prefill time: raw event reprs vs the compact context builder.
+
+"repr" is how /chat used to build its user turn (latest event + last 5 events
+pasted as Python reprs); "compact" is context_builder.build_context over the
+last --windows events. Token counts use the model tokenizer when --model is
+given (otherwise ~4 chars/token), and with --model the prefill time of each
+suffix is measured on top of the cached system prefix (1 generated token).
+
+Usage:
+  python bench_context_builder.py [--model ./models/medgemma-4b-it-q8_0.gguf] [--windows 10] [--repeats 3]
+"""
+import argparse
+import time
+
+import numpy as np
+
+from healin_chat.context_builder import approx_tokens, build_context, event_prediction
+
+LABELS = ["Rest", "Seated Exercise", "Gait Training", "Balance Practice", "Stretching", "Medication Check"]
+TAIL = "Respond with:\n1) A short recommendation (1-2 sentences)\n2) A brief \"why\" grounded in the context\n</s>\n<|assistant|>\n"
+MESSAGE = "My legs froze twice in the kitchen today, what should I do?"
+
+
+def fake_event(rng: np.random.Generator) -> dict:
+    """Same shape as the events app._record_prediction stores."""
+    probs = rng.dirichlet(np.ones(6))
+    x = rng.normal(0, 0.3, size=(100, 3)) + [1.0, 0.0, 0.0]
+    mag = np.linalg.norm(x, axis=1)
+    top = np.argsort(-probs)[:3].tolist()
+    return {
+        "ts": "2026-01-01T00:00:00Z",
+        "pred_index": int(probs.argmax()),
+        "pred_activity_id": int(probs.argmax()),
+        "pred_label": LABELS[int(probs.argmax())],
+        "probs": probs.tolist(),
+        "top_indices": top,
+        "top_activity_ids": top,
+        "top_labels": [LABELS[i] for i in top],
+        "stats": {
+            "seq_len": 100,
+            "mean_xyz": x.mean(axis=0).tolist(), "std_xyz": x.std(axis=0).tolist(),
+            "min_xyz": x.min(axis=0).tolist(), "max_xyz": x.max(axis=0).tolist(),
+            "movement_mag_mean": float(mag.mean()), "movement_mag_std": float(mag.std()),
+            "movement_mag_min": float(mag.min()), "movement_mag_max": float(mag.max()),
+        },
+    }
+
+
+def repr_suffix(events: list) -> str:
+    recent = events[-5:]
+    return f"User message: {MESSAGE}\n\nLatest inference context (may be empty):\n{recent[-1]}\n\n" \
+           f"Recent history (last 5):\n{recent}\n\n{TAIL}"
+
+
+def compact_suffix(events: list, budget: int, count) -> str:
+    context = build_context([event_prediction(e) for e in events], budget_tokens=budget, count_tokens=count)
+    return f"User message: {MESSAGE}\n\n{context}\n\n{TAIL}"
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Compare chat prompt size and prefill time.")
+    parser.add_argument("--model",   default=None, help="GGUF model for exact token counts and prefill timing")
+    parser.add_argument("--windows", type=int, default=10,  help="Events summarized by the compact builder (default: 10)")
+    parser.add_argument("--budget",  type=int, default=160, help="Context token budget (default: 160)")
+    parser.add_argument("--repeats", type=int, default=3,   help="Prefill timings per variant (default: 3)")
+    args = parser.parse_args()
+
+    rng = np.random.default_rng(0)
+    events = [fake_event(rng) for _ in range(max(args.windows, 5))]
+
+    cached = None
+    count = approx_tokens
+    if args.model:
+        from llama_cpp import Llama
+        from app import CHAT_PREFIX
+        from healin_chat.llm import PrefixCachedLLM
+        cached = PrefixCachedLLM(Llama(model_path=args.model, n_gpu_layers=0, n_ctx=3072, verbose=False), CHAT_PREFIX)
+        count = lambda text: len(cached.llm.tokenize(text.encode("utf-8"), add_bos=False, special=True))
+
+    variants = {
+        "repr (old)": repr_suffix(events),
+        "compact":    compact_suffix(events[-args.windows:], args.budget, count),
+    }
+    print(f"{'variant':<12} {'suffix tokens':>14} {'prefill ms':>11}")
+    for name, suffix in variants.items():
+        prefill = "-"
+        if cached is not None:
+            times = []
+            for _ in range(args.repeats):
+                start = time.perf_counter()
+                cached.complete(suffix, max_tokens=1)
+                times.append((time.perf_counter() - start) * 1e3)
+            prefill = f"{np.median(times):.1f}"
+        print(f"{name:<12} {count(suffix):>14} {prefill:>11}")
+
+    print("\nCompact context:\n" + variants["compact"])
+
+
+if __name__ == "__main__":
+    main()
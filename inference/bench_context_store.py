@@ -0,0 +1,76 @@
+"""Memory and throughput of the per-session context store under many sessions.
+
+Replays inference events from `--sessions` simulated users in random order
+and samples traced Python memory (in-memory store) or the database size
+(SQLite store) every `--step` appends. With max_sessions below the number of
+simulated users, the curve should go flat once the LRU bound is reached.
+
+Usage:
+  python bench_context_store.py [--store memory|sqlite] [--sessions 10000] [--events 200000] \
+      [--max-sessions 2000] [--capacity 20]
+"""
+import argparse
+import json
+import os
+import tempfile
+import time
+import tracemalloc
+
+import numpy as np
+
+from context_store import make_store
+
+
+def fake_event(rng: np.random.Generator) -> dict:
+    probs = rng.dirichlet(np.ones(6)).astype(np.float32)
+    return {
+        "ts": "2026-01-01T00:00:00Z",
+        "pred_index": int(probs.argmax()),
+        "probs": probs.tolist(),
+        "stats": {"mean_xyz": rng.normal(size=3).tolist(), "movement_mag_mean": float(rng.random())},
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the per-session context store.")
+    parser.add_argument("--store",        choices=["memory", "sqlite"], default="memory")
+    parser.add_argument("--sessions",     type=int, default=10000,  help="Simulated users (default: 10000)")
+    parser.add_argument("--events",       type=int, default=200000, help="Total appends (default: 200000)")
+    parser.add_argument("--max-sessions", type=int, default=2000,   help="LRU bound (default: 2000)")
+    parser.add_argument("--capacity",     type=int, default=20,     help="Events per session (default: 20)")
+    parser.add_argument("--step",         type=int, default=20000,  help="Appends between samples (default: 20000)")
+    args = parser.parse_args()
+
+    rng = np.random.default_rng(0)
+    # Decode a fresh dict per append so every stored event is its own object, as in the service
+    events = [json.dumps(fake_event(rng)) for _ in range(256)]
+    session_ids = [f"user-{i}" for i in range(args.sessions)]
+    picks = rng.integers(0, args.sessions, size=args.events)
+
+    tmpdir = tempfile.mkdtemp()
+    db_path = os.path.join(tmpdir, "ctx.db")
+    url = "memory" if args.store == "memory" else f"sqlite:///{db_path}"
+    store = make_store(url, capacity=args.capacity, max_sessions=args.max_sessions, ttl_s=3600.0)
+
+    if args.store == "memory":
+        tracemalloc.start()
+    print(f"{'appends':>9} {'sessions':>9} {'memory MB':>10} {'appends/s':>11}")
+    start = time.perf_counter()
+    for i, pick in enumerate(picks, 1):
+        store.append(session_ids[pick], json.loads(events[i % len(events)]))
+        if i % args.step == 0:
+            if args.store == "memory":
+                mb = tracemalloc.get_traced_memory()[0] / 1e6
+            else:
+                mb = sum(os.path.getsize(db_path + sfx) for sfx in ("", "-wal") if os.path.exists(db_path + sfx)) / 1e6
+            rate = i / (time.perf_counter() - start)
+            print(f"{i:>9,} {len(store):>9,} {mb:>10.2f} {rate:>11,.0f}")
+
+    start = time.perf_counter()
+    for pick in picks[:10000]:
+        store.history(session_ids[pick], 5)
+    print(f"\nhistory(n=5): {10000 / (time.perf_counter() - start):,.0f} reads/s")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,71 @@
+"""Per-call latency of the inference backends.
+
+Compares the old `model.predict` path against every engine backend for which
+an artifact is given, at batch size 1 and at a larger batch size.
+
+Usage:
+  python bench_engine.py --keras fog_6class_lstm_patched.keras \
+      [--tflite fog_6class_lstm.tflite] [--onnx fog_6class_lstm.onnx] [--npz fog_6class_lstm.npz] \
+      [--n 200] [--batch 32]
+"""
+import argparse
+import time
+
+import numpy as np
+
+from engine import N_FEATURES, SEQ_LEN, InferenceEngine
+
+
+def time_calls(fn, x: np.ndarray, n: int) -> dict:
+    fn(x)  # warmup / tracing
+    lat = np.empty(n, dtype=np.float64)
+    for i in range(n):
+        start = time.perf_counter()
+        fn(x)
+        lat[i] = (time.perf_counter() - start) * 1000.0
+    p50, p99 = np.percentile(lat, [50, 99])
+    return {
+        "mean_ms": float(lat.mean()),
+        "p50_ms": float(p50),
+        "p99_ms": float(p99),
+        "windows_per_s": x.shape[0] * 1000.0 / float(lat.mean()),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark LSTM inference backends.")
+    parser.add_argument("--keras",  help="Path to the .keras model (enables 'keras.predict' and 'tf')")
+    parser.add_argument("--tflite", help="Path to a .tflite model")
+    parser.add_argument("--onnx",   help="Path to an .onnx model")
+    parser.add_argument("--npz",    help="Path to NumPy weights exported with numpy_lstm.py")
+    parser.add_argument("--n",      type=int, default=200, help="Timed calls per configuration (default: 200)")
+    parser.add_argument("--batch",  type=int, default=32,  help="Batch size for the batched run (default: 32)")
+    args = parser.parse_args()
+
+    candidates = {}
+    if args.keras:
+        import tensorflow as tf
+        model = tf.keras.models.load_model(args.keras, safe_mode=False)
+        candidates["keras.predict"] = lambda x: model.predict(x, verbose=0)
+        candidates["tf"] = InferenceEngine.load("tf", args.keras).predict
+    if args.tflite:
+        candidates["tflite"] = InferenceEngine.load("tflite", args.tflite).predict
+    if args.onnx:
+        candidates["onnx"] = InferenceEngine.load("onnx", args.onnx).predict
+    if args.npz:
+        candidates["numpy"] = InferenceEngine.load("numpy", args.npz).predict
+    if not candidates:
+        parser.error("Give at least one of --keras / --tflite / --onnx / --npz")
+
+    rng = np.random.default_rng(0)
+    print(f"{'backend':<14} {'batch':>5} {'mean ms':>9} {'p50 ms':>9} {'p99 ms':>9} {'win/s':>10}")
+    for batch in (1, args.batch):
+        x = rng.normal(size=(batch, SEQ_LEN, N_FEATURES)).astype(np.float32)
+        for name, fn in candidates.items():
+            r = time_calls(fn, x, args.n)
+            print(f"{name:<14} {batch:>5} {r['mean_ms']:>9.3f} {r['p50_ms']:>9.3f} "
+                  f"{r['p99_ms']:>9.3f} {r['windows_per_s']:>10.1f}")
+
+
+if __name__ == "__main__":
+    main()
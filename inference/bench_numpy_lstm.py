@@ -0,0 +1,67 @@
+"""Cold-start and latency benchmark: NumPy runtime vs TensorFlow.
+
+Cold start is measured in a fresh interpreter per run (import + load weights
++ first prediction), which is what a new CPU-only pod pays before it can
+serve. Latency reuses bench_engine.time_calls.
+
+Usage:
+  python bench_numpy_lstm.py --npz fog_6class_lstm.npz [--keras fog_6class_lstm_patched.keras] [--runs 3]
+"""
+import argparse
+import subprocess
+import sys
+import time
+
+import numpy as np
+
+from bench_engine import time_calls
+from engine import N_FEATURES, SEQ_LEN, InferenceEngine
+
+COLD_START = """
+import time, numpy as np
+t0 = time.perf_counter()
+from engine import InferenceEngine
+e = InferenceEngine.load({backend!r}, {path!r})
+e.predict(np.zeros((1, {seq_len}, {n_features}), dtype=np.float32))
+print(time.perf_counter() - t0)
+"""
+
+
+def cold_start_s(backend: str, path: str) -> tuple[float, float]:
+    """Returns (in-process import+load+first predict, total wall incl. interpreter start)."""
+    code = COLD_START.format(backend=backend, path=path, seq_len=SEQ_LEN, n_features=N_FEATURES)
+    start = time.perf_counter()
+    out = subprocess.run([sys.executable, "-c", code], capture_output=True, text=True, check=True)
+    wall = time.perf_counter() - start
+    return float(out.stdout.strip().splitlines()[-1]), wall
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the NumPy BiLSTM runtime against TensorFlow.")
+    parser.add_argument("--npz",   required=True, help="Weights exported with numpy_lstm.py export")
+    parser.add_argument("--keras", help="Optional .keras model for the TensorFlow comparison")
+    parser.add_argument("--runs",  type=int, default=3,   help="Cold-start runs per backend (default: 3)")
+    parser.add_argument("--n",     type=int, default=100, help="Timed calls per batch size (default: 100)")
+    args = parser.parse_args()
+
+    targets = [("numpy", args.npz)] + ([("tf", args.keras)] if args.keras else [])
+
+    print("Cold start (fresh interpreter, best of runs):")
+    for backend, path in targets:
+        runs = [cold_start_s(backend, path) for _ in range(args.runs)]
+        load_s, wall_s = min(runs)
+        print(f"  {backend:<6} load+first predict {load_s:7.3f} s   total wall {wall_s:7.3f} s")
+
+    print("\nPer-call latency:")
+    rng = np.random.default_rng(0)
+    engines = {backend: InferenceEngine.load(backend, path) for backend, path in targets}
+    for batch in (1, 8, 32):
+        x = rng.normal(size=(batch, SEQ_LEN, N_FEATURES)).astype(np.float32)
+        for backend, engine in engines.items():
+            r = time_calls(engine.predict, x, args.n)
+            print(f"  {backend:<6} batch={batch:<3} mean {r['mean_ms']:8.3f} ms   p99 {r['p99_ms']:8.3f} ms   "
+                  f"{r['windows_per_s']:9.1f} win/s")
+
+
+if __name__ == "__main__":
+    main()
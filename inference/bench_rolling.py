@@ -0,0 +1,52 @@
+"""Per-window cost of rolling movement stats: online (rolling.py) vs recomputing
+from stored windows.
+
+Feeds --windows windows (one per --interval seconds of simulated time) into a
+session and times each update plus a snapshot, against the naive approach of
+keeping every window's magnitudes and recomputing mean/std/min/max over the
+5 min, 1 h and today horizons after each one.
+
+Usage:
+  python bench_rolling.py [--windows 3600] [--interval 1.0]
+"""
+import argparse
+import time
+
+import numpy as np
+
+from rolling import HORIZONS, RollingStore
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark rolling session statistics.")
+    parser.add_argument("--windows",  type=int,   default=3600, help="Windows fed to one session (default: 3600)")
+    parser.add_argument("--interval", type=float, default=1.0,  help="Simulated seconds between windows (default: 1)")
+    args = parser.parse_args()
+
+    rng = np.random.default_rng(0)
+    mags = np.abs(rng.normal(1.0, 0.3, size=(args.windows, 100)))
+    aggs = list(zip([100] * args.windows, mags.mean(axis=1), mags.std(axis=1), mags.min(axis=1), mags.max(axis=1)))
+    ts = np.arange(args.windows) * args.interval
+
+    store = RollingStore()
+    start = time.perf_counter()
+    for t, agg in zip(ts, aggs):
+        store.update_many("s", [agg], t=t)
+        store.snapshot("s", now=t)
+    online = (time.perf_counter() - start) / args.windows
+
+    start = time.perf_counter()
+    for i, t in enumerate(ts):
+        for span in list(HORIZONS.values()) + [86400.0]:
+            sel = mags[(ts > t - span) & (ts <= t)][: i + 1].ravel()
+            sel.mean(), sel.std(), sel.min(), sel.max()
+    naive = (time.perf_counter() - start) / args.windows
+
+    print(f"{args.windows:,} windows, {args.interval:g} s apart")
+    print(f"{'method':<12} {'µs/window':>10}")
+    print(f"{'online':<12} {online * 1e6:>10.1f}")
+    print(f"{'recompute':<12} {naive * 1e6:>10.1f}   ({naive / online:.0f}x, grows with history)")
+
+
+if __name__ == "__main__":
+    main()
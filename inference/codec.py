@@ -0,0 +1,58 @@
+"""Compact binary tensor format for /infer and /infer/batch.
+
+Layout (all little-endian):
+
+  offset 0   4s   magic  b"FOG1"
+  offset 4   B    dtype  (1 = float32)
+  offset 5   B    ndim
+  offset 6   2x   reserved
+  offset 8   ndim x uint32  shape
+  ...        raw float32 data, C order
+
+A (N, 100, 3) batch is 20 bytes of header + N * 1200 bytes, and decoding is a
+zero-copy np.frombuffer view instead of validating 300 Python floats per window.
+"""
+import struct
+
+import numpy as np
+
+MAGIC = b"FOG1"
+MEDIA_TYPE = "application/octet-stream"
+DTYPE_FLOAT32 = 1
+MAX_NDIM = 4
+
+_PREFIX = struct.Struct("<4sBB2x")
+
+
+def encode(arr: np.ndarray) -> bytes:
+    arr = np.ascontiguousarray(arr, dtype="<f4")
+    if arr.ndim > MAX_NDIM:
+        raise ValueError(f"At most {MAX_NDIM} dimensions are supported, got {arr.ndim}")
+    header = _PREFIX.pack(MAGIC, DTYPE_FLOAT32, arr.ndim) + struct.pack(f"<{arr.ndim}I", *arr.shape)
+    return header + arr.tobytes()
+
+
+def decode(body: bytes) -> np.ndarray:
+    """Returns a read-only float32 view over `body` with the encoded shape."""
+    if len(body) < _PREFIX.size:
+        raise ValueError("Binary body too short for header")
+    magic, dtype, ndim = _PREFIX.unpack_from(body)
+    if magic != MAGIC:
+        raise ValueError(f"Bad magic {magic!r}, expected {MAGIC!r}")
+    if dtype != DTYPE_FLOAT32:
+        raise ValueError(f"Unsupported dtype code {dtype}, only float32 (1) is supported")
+    if not 1 <= ndim <= MAX_NDIM:
+        raise ValueError(f"Unsupported ndim {ndim}")
+
+    offset = _PREFIX.size + 4 * ndim
+    if len(body) < offset:
+        raise ValueError("Binary body too short for header")
+    shape = struct.unpack_from(f"<{ndim}I", body, _PREFIX.size)
+    count = int(np.prod(shape))
+    if len(body) - offset != 4 * count:
+        raise ValueError(f"Body has {len(body) - offset} data bytes, shape {list(shape)} needs {4 * count}")
+    return np.frombuffer(body, dtype="<f4", count=count, offset=offset).reshape(shape)
+
+
+def is_binary(content_type: str) -> bool:
+    return content_type.split(";")[0].strip().lower() == MEDIA_TYPE
@@ -0,0 +1,193 @@
+"""Per-session inference context for /chat.
+
+Replaces the process-global LATEST_CTX / HISTORY, which mixed every user's
+windows together and pinned the service to a single worker. Each session keeps
+its own bounded history of inference events; memory is bounded by
+
+  - capacity      : events kept per session
+  - max_sessions  : least recently used sessions are evicted beyond this
+  - ttl_s         : sessions idle longer than this are dropped
+
+Backends:
+  - MemoryContextStore : in-process OrderedDict (single worker)
+  - SQLiteContextStore : local SQLite file in WAL mode, shared by all uvicorn
+                         workers on the same host
+
+Select one with make_store("memory") or make_store("sqlite:///path/to/ctx.db").
+"""
+import itertools
+import json
+import sqlite3
+import threading
+import time
+from collections import OrderedDict, deque
+from typing import List, Optional
+
+
+class ContextStore:
+    """Interface shared by every backend."""
+
+    def append(self, session_id: str, event: dict):
+        raise NotImplementedError
+
+    def history(self, session_id: str, n: Optional[int] = None) -> List[dict]:
+        """Last n events for the session, oldest first (all kept events if n is None)."""
+        raise NotImplementedError
+
+    def latest(self, session_id: str) -> Optional[dict]:
+        events = self.history(session_id, 1)
+        return events[-1] if events else None
+
+    def drop(self, session_id: str):
+        raise NotImplementedError
+
+    def __len__(self) -> int:
+        raise NotImplementedError
+
+
+class MemoryContextStore(ContextStore):
+    def __init__(self, capacity: int = 20, max_sessions: int = 10000, ttl_s: float = 3600.0):
+        self.capacity = capacity
+        self.max_sessions = max_sessions
+        self.ttl_s = ttl_s
+        # session_id → (last_seen, deque of events); ordered from least to most recently used
+        self._sessions: "OrderedDict[str, tuple[float, deque]]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def _expire(self, now: float):
+        # The front of the OrderedDict is always the longest-idle session
+        while self._sessions:
+            session_id, (last_seen, _) = next(iter(self._sessions.items()))
+            if now - last_seen <= self.ttl_s and len(self._sessions) <= self.max_sessions:
+                break
+            del self._sessions[session_id]
+
+    def append(self, session_id: str, event: dict):
+        now = time.monotonic()
+        with self._lock:
+            entry = self._sessions.pop(session_id, None)
+            events = entry[1] if entry else deque(maxlen=self.capacity)
+            events.append(event)
+            self._sessions[session_id] = (now, events)
+            self._expire(now)
+
+    def history(self, session_id: str, n: Optional[int] = None) -> List[dict]:
+        now = time.monotonic()
+        with self._lock:
+            self._expire(now)
+            entry = self._sessions.get(session_id)
+            if entry is None:
+                return []
+            events = list(entry[1])
+        return events[-n:] if n else events
+
+    def drop(self, session_id: str):
+        with self._lock:
+            self._sessions.pop(session_id, None)
+
+    def __len__(self) -> int:
+        return len(self._sessions)
+
+
+class SQLiteContextStore(ContextStore):
+    """Events are stored as JSON rows; one connection per thread, WAL so that
+    several worker processes can read while one writes."""
+
+    PURGE_EVERY = 256   # appends between TTL / LRU sweeps
+
+    def __init__(self, path: str, capacity: int = 20, max_sessions: int = 10000, ttl_s: float = 3600.0):
+        self.path = path
+        self.capacity = capacity
+        self.max_sessions = max_sessions
+        self.ttl_s = ttl_s
+        self._local = threading.local()
+        self._appends = itertools.count(1)   # next() is atomic; shared by request threads
+        with self._conn() as conn:
+            conn.executescript("""
+                CREATE TABLE IF NOT EXISTS ctx_events (
+                    seq        INTEGER PRIMARY KEY AUTOINCREMENT,
+                    session_id TEXT NOT NULL,
+                    event      TEXT NOT NULL
+                );
+                CREATE INDEX IF NOT EXISTS ix_ctx_events_session ON ctx_events (session_id, seq);
+                CREATE TABLE IF NOT EXISTS ctx_sessions (
+                    session_id TEXT PRIMARY KEY,
+                    last_seen  REAL NOT NULL
+                );
+                CREATE INDEX IF NOT EXISTS ix_ctx_sessions_last_seen ON ctx_sessions (last_seen);
+            """)
+
+    def _conn(self) -> sqlite3.Connection:
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=10.0, isolation_level=None)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn = conn
+        return conn
+
+    def append(self, session_id: str, event: dict):
+        now = time.time()
+        conn = self._conn()
+        with conn:
+            conn.execute("BEGIN IMMEDIATE")
+            conn.execute("INSERT INTO ctx_events (session_id, event) VALUES (?, ?)",
+                         (session_id, json.dumps(event)))
+            conn.execute(
+                "INSERT INTO ctx_sessions (session_id, last_seen) VALUES (?, ?) "
+                "ON CONFLICT(session_id) DO UPDATE SET last_seen = excluded.last_seen",
+                (session_id, now),
+            )
+            # Keep only the newest `capacity` events of this session
+            conn.execute(
+                "DELETE FROM ctx_events WHERE session_id = ? AND seq <= ("
+                "  SELECT seq FROM ctx_events WHERE session_id = ? ORDER BY seq DESC LIMIT 1 OFFSET ?)",
+                (session_id, session_id, self.capacity),
+            )
+        if next(self._appends) % self.PURGE_EVERY == 0:
+            self.purge(now)
+
+    def purge(self, now: Optional[float] = None):
+        """Drops sessions idle longer than ttl_s, then the least recently used
+        ones beyond max_sessions."""
+        now = time.time() if now is None else now
+        conn = self._conn()
+        with conn:
+            conn.execute("BEGIN IMMEDIATE")
+            conn.execute("DELETE FROM ctx_sessions WHERE last_seen < ?", (now - self.ttl_s,))
+            conn.execute(
+                "DELETE FROM ctx_sessions WHERE session_id IN ("
+                "  SELECT session_id FROM ctx_sessions ORDER BY last_seen DESC LIMIT -1 OFFSET ?)",
+                (self.max_sessions,),
+            )
+            conn.execute("DELETE FROM ctx_events WHERE session_id NOT IN (SELECT session_id FROM ctx_sessions)")
+
+    def history(self, session_id: str, n: Optional[int] = None) -> List[dict]:
+        conn = self._conn()
+        row = conn.execute("SELECT last_seen FROM ctx_sessions WHERE session_id = ?", (session_id,)).fetchone()
+        if row is None or time.time() - row[0] > self.ttl_s:
+            return []
+        rows = conn.execute(
+            "SELECT event FROM ctx_events WHERE session_id = ? ORDER BY seq DESC LIMIT ?",
+            (session_id, n or self.capacity),
+        ).fetchall()
+        return [json.loads(r[0]) for r in reversed(rows)]
+
+    def drop(self, session_id: str):
+        conn = self._conn()
+        with conn:
+            conn.execute("BEGIN IMMEDIATE")
+            conn.execute("DELETE FROM ctx_events WHERE session_id = ?", (session_id,))
+            conn.execute("DELETE FROM ctx_sessions WHERE session_id = ?", (session_id,))
+
+    def __len__(self) -> int:
+        return self._conn().execute("SELECT COUNT(*) FROM ctx_sessions").fetchone()[0]
+
+
+def make_store(url: str = "memory", **kwargs) -> ContextStore:
+    """"memory" → MemoryContextStore, "sqlite:///path.db" → SQLiteContextStore."""
+    if url == "memory":
+        return MemoryContextStore(**kwargs)
+    if url.startswith("sqlite:///"):
+        return SQLiteContextStore(url[len("sqlite:///"):], **kwargs)
+    raise ValueError(f"Unknown context store {url!r} (expected 'memory' or 'sqlite:///path.db')")
@@ -0,0 +1,111 @@
+"""Near-duplicate window gating and a fingerprint-keyed result cache for /infer.
+
+A wearable lying still (the Rest / Medication Check case) sends long runs of
+nearly identical windows, and each used to cost a full BiLSTM pass. Before the
+model runs, WindowGate checks two things:
+
+  session   the window's summary (per-axis mean/std and magnitude mean/std,
+            already computed by _window_stats) differs from the session's last
+            *inferred* window by at most `threshold` in every component, or the
+            window's fingerprint equals that window's → reuse its prediction.
+            The anchor only moves when the model actually runs, so a slow
+            drift cannot chain reuse indefinitely.
+  cache     the fingerprint (the window quantized to `quant_step`, hashed) is
+            in a bounded LRU of recent results from any session.
+
+Counters: hits per source, misses, and model time saved (hits × the running
+mean predict time).
+"""
+import hashlib
+import threading
+from collections import OrderedDict
+from typing import Optional, Tuple
+
+import numpy as np
+
+SESSION, CACHE = "session", "cache"
+
+
+def summary_vector(stats: dict) -> np.ndarray:
+    return np.array(stats["mean_xyz"] + stats["std_xyz"] + [stats["movement_mag_mean"], stats["movement_mag_std"]],
+                    dtype=np.float64)
+
+
+def fingerprint(x: np.ndarray, quant_step: float) -> bytes:
+    q = np.round(np.asarray(x, dtype=np.float32) / quant_step).astype(np.int32)
+    return hashlib.blake2b(q.tobytes(), digest_size=16).digest()
+
+
+class WindowGate:
+    def __init__(self, threshold: float = 0.02, quant_step: float = 0.05, cache_size: int = 4096,
+                 max_sessions: int = 10000):
+        self.threshold = threshold
+        self.quant_step = quant_step
+        self.cache_size = cache_size
+        self.max_sessions = max_sessions
+        # session_id → (summary, fingerprint, probs) of the last window the model ran on
+        self._anchors: "OrderedDict[str, Tuple[np.ndarray, bytes, np.ndarray]]" = OrderedDict()
+        self._cache: "OrderedDict[bytes, np.ndarray]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = {SESSION: 0, CACHE: 0}
+        self.misses = 0
+        self._predict_s = 0.0       # total model time of stored results (no queue wait), for the mean
+        self._computed = 0
+
+    def lookup(self, session_id: str, stats: dict, fp: bytes) -> Tuple[Optional[np.ndarray], Optional[str]]:
+        """(probs, source) of a reusable prediction, or (None, None) if the model must run."""
+        summary = summary_vector(stats)
+        with self._lock:
+            anchor = self._anchors.get(session_id)
+            if anchor is not None:
+                self._anchors.move_to_end(session_id)
+                a_summary, a_fp, a_probs = anchor
+                if a_fp == fp or float(np.abs(summary - a_summary).max()) <= self.threshold:
+                    self.hits[SESSION] += 1
+                    return a_probs, SESSION
+            probs = self._cache.get(fp)
+            if probs is not None:
+                self._cache.move_to_end(fp)
+                self.hits[CACHE] += 1
+                return probs, CACHE
+            self.misses += 1
+            return None, None
+
+    def store(self, session_id: str, stats: dict, fp: bytes, probs: np.ndarray, predict_s: float):
+        """Records a computed prediction as the session's anchor and in the cache."""
+        probs = np.array(probs, dtype=np.float32)
+        with self._lock:
+            self._predict_s += predict_s
+            self._computed += 1
+            self._anchors[session_id] = (summary_vector(stats), fp, probs)
+            self._anchors.move_to_end(session_id)
+            while len(self._anchors) > self.max_sessions:
+                self._anchors.popitem(last=False)
+            if self.cache_size > 0:
+                self._cache[fp] = probs
+                self._cache.move_to_end(fp)
+                while len(self._cache) > self.cache_size:
+                    self._cache.popitem(last=False)
+
+    @property
+    def mean_predict_s(self) -> float:
+        return self._predict_s / self._computed if self._computed else 0.0
+
+    def drop(self, session_id: str):
+        with self._lock:
+            self._anchors.pop(session_id, None)
+
+    def stats(self) -> dict:
+        with self._lock:
+            hits = sum(self.hits.values())
+            total = hits + self.misses
+            return {
+                "threshold": self.threshold,
+                "quant_step": self.quant_step,
+                "hits": dict(self.hits),
+                "misses": self.misses,
+                "hit_rate": hits / total if total else 0.0,
+                "saved_model_s": hits * self.mean_predict_s,
+                "sessions": len(self._anchors),
+                "cache_entries": len(self._cache),
+            }
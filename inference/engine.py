@@ -0,0 +1,181 @@
+"""Inference engine for the FOG activity LSTM.
+
+`tf.keras.Model.predict` builds a data adapter and an execution loop on every
+call, which for a single (1, 100, 3) window costs more than the BiLSTM itself.
+The engine wraps a backend that exposes one plain `predict(batch)` call:
+
+  - "tf"     : Keras model wrapped in a traced tf.function with a fixed
+               (None, 100, 3) float32 input signature
+  - "tflite" : TFLite interpreter (tflite_runtime or tf.lite)
+  - "onnx"   : ONNX Runtime session
+  - "numpy"  : pure-NumPy BiLSTM from an exported .npz (no TensorFlow needed)
+
+Heavy runtimes are imported inside each backend so the service only pays for
+the one it actually uses. New backends can be added with register_backend().
+"""
+import time
+from typing import Callable, Dict, Iterable, Optional
+
+import numpy as np
+
+from numpy_lstm import NumpyLSTM
+
+SEQ_LEN = 100
+N_FEATURES = 3
+
+
+class Backend:
+    """Minimal interface every backend implements."""
+
+    name = "base"
+
+    def predict(self, x: np.ndarray) -> np.ndarray:
+        """x: float32 (B, SEQ_LEN, N_FEATURES) → float32 (B, num_classes) probabilities."""
+        raise NotImplementedError
+
+
+class TFBackend(Backend):
+    name = "tf"
+
+    def __init__(self, model_path: str, seq_len: int = SEQ_LEN, jit_compile: bool = False):
+        import tensorflow as tf
+
+        self._tf = tf
+        self.model = tf.keras.models.load_model(model_path, safe_mode=False)
+        model = self.model
+
+        @tf.function(
+            input_signature=[tf.TensorSpec(shape=(None, seq_len, N_FEATURES), dtype=tf.float32)],
+            jit_compile=jit_compile,
+        )
+        def serve(x):
+            return model(x, training=False)
+
+        self._serve = serve
+
+    def predict(self, x: np.ndarray) -> np.ndarray:
+        return self._serve(self._tf.constant(x)).numpy()
+
+
+class TFLiteBackend(Backend):
+    name = "tflite"
+
+    def __init__(self, model_path: str, num_threads: Optional[int] = None):
+        try:
+            from tflite_runtime.interpreter import Interpreter
+        except ImportError:
+            import tensorflow as tf
+            Interpreter = tf.lite.Interpreter
+
+        self._interp = Interpreter(model_path=model_path, num_threads=num_threads)
+        details = self._interp.get_input_details()[0]
+        self._input = details["index"]
+        self._output = self._interp.get_output_details()[0]["index"]
+        self._batch = None
+        # Models exported with a static batch size (quantize.py, because Keras 3 LSTMs
+        # only lower to the fused TFLite kernels that way) cannot be resized
+        signature = details.get("shape_signature", details["shape"])
+        self.fixed_batch = int(signature[0]) if signature[0] > 0 and len(signature) == 3 else None
+        if self.fixed_batch is not None:
+            self._interp.allocate_tensors()
+            self._batch = self.fixed_batch
+
+    def predict(self, x: np.ndarray) -> np.ndarray:
+        if self.fixed_batch is not None:
+            return self._predict_chunked(x)
+        # The interpreter has static shapes; only re-allocate when the batch size changes
+        if x.shape[0] != self._batch:
+            self._interp.resize_tensor_input(self._input, list(x.shape))
+            self._interp.allocate_tensors()
+            self._batch = x.shape[0]
+        self._interp.set_tensor(self._input, x)
+        self._interp.invoke()
+        return self._interp.get_tensor(self._output)
+
+    def _predict_chunked(self, x: np.ndarray) -> np.ndarray:
+        """Runs x in chunks of the model's batch size, zero-padding the last one."""
+        b = self.fixed_batch
+        out = []
+        for i in range(0, len(x), b):
+            chunk = x[i:i + b]
+            n = len(chunk)
+            if n < b:
+                chunk = np.concatenate([chunk, np.zeros((b - n,) + chunk.shape[1:], dtype=chunk.dtype)])
+            self._interp.set_tensor(self._input, chunk)
+            self._interp.invoke()
+            out.append(self._interp.get_tensor(self._output)[:n].copy())
+        return np.concatenate(out)
+
+
+class OnnxBackend(Backend):
+    name = "onnx"
+
+    def __init__(self, model_path: str, num_threads: Optional[int] = None):
+        import onnxruntime as ort
+
+        opts = ort.SessionOptions()
+        if num_threads:
+            opts.intra_op_num_threads = num_threads
+        self._session = ort.InferenceSession(model_path, opts, providers=["CPUExecutionProvider"])
+        self._input = self._session.get_inputs()[0].name
+
+    def predict(self, x: np.ndarray) -> np.ndarray:
+        return self._session.run(None, {self._input: x})[0]
+
+
+class NumpyBackend(Backend):
+    name = "numpy"
+
+    def __init__(self, model_path: str):
+        self._model = NumpyLSTM.load(model_path)
+
+    def predict(self, x: np.ndarray) -> np.ndarray:
+        return self._model.predict(x)
+
+
+BACKENDS: Dict[str, Callable[..., Backend]] = {
+    "tf": TFBackend,
+    "tflite": TFLiteBackend,
+    "onnx": OnnxBackend,
+    "numpy": NumpyBackend,
+}
+
+
+def register_backend(name: str, factory: Callable[..., Backend]):
+    """Makes a backend selectable via InferenceEngine.load(name, ...)."""
+    BACKENDS[name] = factory
+
+
+class InferenceEngine:
+    """Shape-checked, warmed-up front end over a single backend."""
+
+    def __init__(self, backend: Backend, seq_len: int = SEQ_LEN):
+        self.backend = backend
+        self.seq_len = seq_len
+        self.warmup_ms: Dict[int, float] = {}
+
+    @classmethod
+    def load(cls, backend: str, model_path: str, **kwargs) -> "InferenceEngine":
+        if backend not in BACKENDS:
+            raise ValueError(f"Unknown inference backend {backend!r}. Available: {sorted(BACKENDS)}")
+        return cls(BACKENDS[backend](model_path, **kwargs))
+
+    @property
+    def name(self) -> str:
+        return self.backend.name
+
+    def predict(self, x: np.ndarray) -> np.ndarray:
+        """x: (B, seq_len, 3) → float32 (B, num_classes)."""
+        x = np.ascontiguousarray(x, dtype=np.float32)
+        if x.ndim != 3 or x.shape[1:] != (self.seq_len, N_FEATURES):
+            raise ValueError(f"Expected input shaped (B, {self.seq_len}, {N_FEATURES}), got {list(x.shape)}")
+        return np.asarray(self.backend.predict(x), dtype=np.float32)
+
+    def warmup(self, batch_sizes: Iterable[int] = (1,)) -> Dict[int, float]:
+        """Runs one dummy batch per size so tracing / allocation happens before
+        the first real request. Returns the warmup time per batch size in ms."""
+        for b in batch_sizes:
+            start = time.perf_counter()
+            self.predict(np.zeros((b, self.seq_len, N_FEATURES), dtype=np.float32))
+            self.warmup_ms[b] = (time.perf_counter() - start) * 1000.0
+        return self.warmup_ms
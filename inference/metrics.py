@@ -0,0 +1,188 @@
+"""In-process metrics in Prometheus text format, plus an on-demand sampling profiler.
+
+  METRICS.describe("infer_requests_total", "Windows received on /infer")
+  METRICS.inc("infer_requests_total", route="/infer")
+  with METRICS.timer("infer", "predict"):
+      ...
+  METRICS.observe("llm_tokens_per_second", 23.1, buckets=RATE_BUCKETS)
+
+Counters and histograms are keyed by name plus sorted label pairs; updates take
+one lock and a bisect, a few microseconds. describe() registers the # HELP text
+of a series, next to the code that emits it. render() produces the exposition
+text served on /metrics.
+
+SamplingProfiler snapshots every thread's stack with sys._current_frames()
+every interval and counts collapsed stacks ("a;b;c N", flamegraph.pl /
+speedscope input). It costs nothing until started, and is meant to be switched
+on for a short window on a live process.
+"""
+import bisect
+import collections
+import sys
+import threading
+import time
+from contextlib import contextmanager
+from typing import Dict, Optional, Sequence, Tuple
+
+# Seconds: 50 µs … 30 s
+LATENCY_BUCKETS = (5e-5, 1e-4, 2.5e-4, 5e-4, 1e-3, 2.5e-3, 5e-3, 1e-2, 2.5e-2, 5e-2, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+SIZE_BUCKETS = (1, 2, 4, 8, 16, 32, 64, 128, 256, 512, 1024, 4096)
+RATE_BUCKETS = (1, 2, 5, 10, 20, 30, 50, 75, 100, 200)
+
+Key = Tuple[str, Tuple[Tuple[str, str], ...]]
+
+
+class Histogram:
+    def __init__(self, buckets: Sequence[float]):
+        self.buckets = tuple(buckets)
+        self.counts = [0] * (len(self.buckets) + 1)   # last slot is +Inf
+        self.sum = 0.0
+        self.count = 0
+
+    def observe(self, value: float):
+        self.counts[bisect.bisect_left(self.buckets, value)] += 1
+        self.sum += value
+        self.count += 1
+
+
+class Metrics:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._counters: Dict[Key, float] = {}
+        self._hists: Dict[Key, Histogram] = {}
+        self._help: Dict[str, str] = {}
+        self.describe("stage_seconds", "Wall time of one stage of a request or model call, by op and stage")
+
+    @staticmethod
+    def _key(name: str, labels: dict) -> Key:
+        return name, tuple(sorted((k, str(v)) for k, v in labels.items()))
+
+    def describe(self, name: str, text: str):
+        self._help[name] = text
+
+    def inc(self, name: str, value: float = 1.0, **labels):
+        key = self._key(name, labels)
+        with self._lock:
+            self._counters[key] = self._counters.get(key, 0.0) + value
+
+    def observe(self, name: str, value: float, buckets: Sequence[float] = LATENCY_BUCKETS, **labels):
+        key = self._key(name, labels)
+        with self._lock:
+            hist = self._hists.get(key)
+            if hist is None:
+                hist = self._hists[key] = Histogram(buckets)
+            hist.observe(value)
+
+    @contextmanager
+    def timer(self, op: str, stage: str):
+        """Observes the block's wall time in stage_seconds{op, stage}."""
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe("stage_seconds", time.perf_counter() - start, op=op, stage=stage)
+
+    def render(self) -> str:
+        with self._lock:
+            counters = sorted(self._counters.items())
+            hists = sorted((k, (h.buckets, list(h.counts), h.sum, h.count)) for k, h in self._hists.items())
+
+        lines, typed = [], set()
+
+        def header(name: str, kind: str):
+            if name not in typed:
+                typed.add(name)
+                if name in self._help:
+                    lines.append(f"# HELP {name} {self._help[name]}")
+                lines.append(f"# TYPE {name} {kind}")
+
+        for (name, labels), value in counters:
+            header(name, "counter")
+            lines.append(f"{name}{_labels(labels)} {value:g}")
+        for (name, labels), (buckets, counts, total, count) in hists:
+            header(name, "histogram")
+            cumulative = 0
+            for bound, n in zip(list(buckets) + ["+Inf"], counts):
+                cumulative += n
+                le = bound if bound == "+Inf" else f"{bound:g}"
+                lines.append(f"{name}_bucket{_labels(labels + (('le', le),))} {cumulative}")
+            lines.append(f"{name}_sum{_labels(labels)} {total:.6g}")
+            lines.append(f"{name}_count{_labels(labels)} {count}")
+        return "\n".join(lines) + "\n"
+
+
+def _labels(pairs) -> str:
+    if not pairs:
+        return ""
+    return "{" + ",".join(f'{k}="{_escape(v)}"' for k, v in pairs) + "}"
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+METRICS = Metrics()
+
+
+class SamplingProfiler:
+    def __init__(self):
+        self._thread: Optional[threading.Thread] = None
+        self._stop = threading.Event()
+        self._lock = threading.Lock()
+        self.stacks: collections.Counter = collections.Counter()
+        self.samples = 0
+        self.interval_s = 0.005
+        self.started_at: Optional[float] = None
+
+    @property
+    def running(self) -> bool:
+        return self._thread is not None and self._thread.is_alive()
+
+    def start(self, interval_ms: float = 5.0, reset: bool = True):
+        self.stop()
+        with self._lock:
+            if reset:
+                self.stacks.clear()
+                self.samples = 0
+            self.interval_s = interval_ms / 1000.0
+            self.started_at = time.time()
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, name="sampling-profiler", daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        if self._thread is not None:
+            self._stop.set()
+            self._thread.join()
+            self._thread = None
+
+    def _run(self):
+        own = threading.get_ident()
+        while not self._stop.wait(self.interval_s):
+            frames = sys._current_frames()
+            collapsed = []
+            for ident, frame in frames.items():
+                if ident == own:
+                    continue
+                stack = []
+                while frame is not None:
+                    code = frame.f_code
+                    stack.append(f"{code.co_name} ({code.co_filename.rsplit('/', 1)[-1]}:{code.co_firstlineno})")
+                    frame = frame.f_back
+                collapsed.append(";".join(reversed(stack)))
+            with self._lock:
+                self.stacks.update(collapsed)
+                self.samples += 1
+
+    def collapsed(self, limit: int = 0) -> str:
+        """Collapsed-stack text, most frequent first."""
+        with self._lock:
+            items = self.stacks.most_common(limit or None)
+        return "\n".join(f"{stack} {n}" for stack, n in items) + "\n"
+
+    def status(self) -> dict:
+        return {"running": self.running, "interval_ms": self.interval_s * 1000.0,
+                "samples": self.samples, "distinct_stacks": len(self.stacks), "started_at": self.started_at}
+
+
+PROFILER = SamplingProfiler()
@@ -0,0 +1,175 @@
+"""Pure-NumPy forward pass for the fog_6class_lstm model.
+
+Mirrors `build_model()` in model_training/dataset/model.py:
+
+  Input(100, 3)
+  → Bidirectional(LSTM(128, return_sequences=True))
+  → Bidirectional(LSTM(128))
+  → Dense(64, relu) → Dropout (identity at inference) → Dense(6, softmax)
+
+The weights are exported once from the .keras file into a compact .npz, after
+which serving only needs NumPy — no TensorFlow import, no multi-GB image.
+All timesteps' input projections are computed in one matmul per direction;
+the recurrence then runs vectorized over the batch dimension.
+
+CLI:
+  python numpy_lstm.py export fog_6class_lstm.keras fog_6class_lstm.npz
+  python numpy_lstm.py check  fog_6class_lstm.keras fog_6class_lstm.npz [--tol 1e-4]
+"""
+import argparse
+import sys
+
+import numpy as np
+
+FORMAT_VERSION = 1
+
+
+def _sigmoid(z: np.ndarray) -> np.ndarray:
+    # Numerically stable and avoids overflow warnings from exp(-z)
+    return 0.5 * (1.0 + np.tanh(0.5 * z))
+
+
+def _lstm(x: np.ndarray, kernel: np.ndarray, recurrent: np.ndarray, bias: np.ndarray,
+          reverse: bool = False, return_sequences: bool = False) -> np.ndarray:
+    """Keras LSTM (gate order i, f, c, o; sigmoid/tanh) over x shaped (B, T, F)."""
+    batch, steps, _ = x.shape
+    units = recurrent.shape[0]
+
+    xw = x @ kernel + bias                                   # (B, T, 4U) for all timesteps at once
+    h = np.zeros((batch, units), dtype=x.dtype)
+    c = np.zeros((batch, units), dtype=x.dtype)
+    out = np.empty((batch, steps, units), dtype=x.dtype) if return_sequences else None
+
+    for t in (range(steps - 1, -1, -1) if reverse else range(steps)):
+        z = xw[:, t] + h @ recurrent
+        i = _sigmoid(z[:, :units])
+        f = _sigmoid(z[:, units:2 * units])
+        g = np.tanh(z[:, 2 * units:3 * units])
+        o = _sigmoid(z[:, 3 * units:])
+        c = f * c + i * g
+        h = o * np.tanh(c)
+        if return_sequences:
+            out[:, t] = h   # backward outputs are stored in forward time order, like Keras
+
+    return out if return_sequences else h
+
+
+class NumpyLSTM:
+    """Forward-only BiLSTM classifier built from an exported .npz."""
+
+    def __init__(self, weights: dict):
+        self.n_lstm = int(weights["n_lstm"])
+        self.n_dense = int(weights["n_dense"])
+        self.w = {k: np.asarray(v, dtype=np.float32) for k, v in weights.items()
+                  if k not in ("n_lstm", "n_dense", "format_version")}
+
+    @classmethod
+    def load(cls, npz_path: str) -> "NumpyLSTM":
+        with np.load(npz_path) as data:
+            version = int(data["format_version"])
+            if version != FORMAT_VERSION:
+                raise ValueError(f"Unsupported weights format version {version} in {npz_path}")
+            return cls({k: data[k] for k in data.files})
+
+    def predict(self, x: np.ndarray) -> np.ndarray:
+        """x: (B, T, 3) float32 → (B, num_classes) softmax probabilities."""
+        h = np.asarray(x, dtype=np.float32)
+        for i in range(self.n_lstm):
+            last = i == self.n_lstm - 1
+            fw = _lstm(h, self.w[f"lstm{i}_fw_kernel"], self.w[f"lstm{i}_fw_recurrent"],
+                       self.w[f"lstm{i}_fw_bias"], return_sequences=not last)
+            bw = _lstm(h, self.w[f"lstm{i}_bw_kernel"], self.w[f"lstm{i}_bw_recurrent"],
+                       self.w[f"lstm{i}_bw_bias"], reverse=True, return_sequences=not last)
+            h = np.concatenate([fw, bw], axis=-1)
+
+        for i in range(self.n_dense):
+            h = h @ self.w[f"dense{i}_kernel"] + self.w[f"dense{i}_bias"]
+            if i < self.n_dense - 1:
+                h = np.maximum(h, 0.0)          # relu; Dropout/linear Activation are no-ops here
+
+        h = h - h.max(axis=1, keepdims=True)    # softmax
+        e = np.exp(h)
+        return e / e.sum(axis=1, keepdims=True)
+
+
+def export_npz(keras_path: str, npz_path: str) -> dict:
+    """Writes the BiLSTM/Dense weights of a .keras model to a compressed .npz.
+    This is the only step that needs TensorFlow."""
+    import tensorflow as tf
+
+    model = tf.keras.models.load_model(keras_path, safe_mode=False)
+    arrays = {}
+    n_lstm = n_dense = 0
+    for layer in model.layers:
+        if isinstance(layer, tf.keras.layers.Bidirectional):
+            for direction, lstm in (("fw", layer.forward_layer), ("bw", layer.backward_layer)):
+                kernel, recurrent, bias = lstm.get_weights()
+                arrays[f"lstm{n_lstm}_{direction}_kernel"] = kernel
+                arrays[f"lstm{n_lstm}_{direction}_recurrent"] = recurrent
+                arrays[f"lstm{n_lstm}_{direction}_bias"] = bias
+            n_lstm += 1
+        elif isinstance(layer, tf.keras.layers.Dense):
+            kernel, bias = layer.get_weights()
+            arrays[f"dense{n_dense}_kernel"] = kernel
+            arrays[f"dense{n_dense}_bias"] = bias
+            n_dense += 1
+
+    if n_lstm == 0 or n_dense == 0:
+        raise ValueError(f"{keras_path} does not look like a build_model() BiLSTM classifier")
+
+    arrays = {k: v.astype(np.float32) for k, v in arrays.items()}
+    np.savez_compressed(
+        npz_path,
+        format_version=np.int32(FORMAT_VERSION),
+        n_lstm=np.int32(n_lstm),
+        n_dense=np.int32(n_dense),
+        **arrays,
+    )
+    return {"n_lstm": n_lstm, "n_dense": n_dense, "n_params": int(sum(a.size for a in arrays.values()))}
+
+
+def check_parity(keras_path: str, npz_path: str, n: int = 64, tol: float = 1e-4, seed: int = 0) -> dict:
+    """Compares NumPy and Keras outputs on random windows plus a stationary one."""
+    import tensorflow as tf
+
+    model = tf.keras.models.load_model(keras_path, safe_mode=False)
+    seq_len = model.input_shape[1]
+    rng = np.random.default_rng(seed)
+    x = rng.normal(0.0, 1.0, size=(n, seq_len, 3)).astype(np.float32)
+    x[0] = [-0.98, 0.0, 0.0]   # gravity-only window, the Rest/Medication Check case
+
+    ref = model(x, training=False).numpy()
+    out = NumpyLSTM.load(npz_path).predict(x)
+    max_abs = float(np.abs(ref - out).max())
+    agree = float((ref.argmax(axis=1) == out.argmax(axis=1)).mean())
+    return {"max_abs_diff": max_abs, "argmax_agreement": agree, "ok": max_abs <= tol and agree == 1.0}
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Export / verify NumPy weights for the FOG BiLSTM.")
+    sub = parser.add_subparsers(dest="cmd", required=True)
+    p_exp = sub.add_parser("export", help="Write weights from a .keras model to .npz")
+    p_exp.add_argument("keras_path")
+    p_exp.add_argument("npz_path")
+    p_chk = sub.add_parser("check", help="Parity check NumPy vs Keras outputs")
+    p_chk.add_argument("keras_path")
+    p_chk.add_argument("npz_path")
+    p_chk.add_argument("--n",   type=int,   default=64,   help="Random windows to compare (default: 64)")
+    p_chk.add_argument("--tol", type=float, default=1e-4, help="Max abs probability difference (default: 1e-4)")
+    args = parser.parse_args()
+
+    if args.cmd == "export":
+        info = export_npz(args.keras_path, args.npz_path)
+        print(f"Saved → {args.npz_path}  ({info['n_lstm']} BiLSTM + {info['n_dense']} Dense layers, "
+              f"{info['n_params']:,} params)")
+    else:
+        res = check_parity(args.keras_path, args.npz_path, n=args.n, tol=args.tol)
+        print(f"max |Δp| = {res['max_abs_diff']:.2e}   argmax agreement = {res['argmax_agreement']:.1%}")
+        if not res["ok"]:
+            print(f"[FAIL] NumPy runtime differs from Keras by more than tol={args.tol}")
+            sys.exit(1)
+        print("[OK] NumPy runtime matches Keras")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,326 @@
+"""Quantized TFLite variants of the FOG LSTM, published only if they match float32.
+
+Variants:
+  float32  plain TFLite conversion (no quantization; isolates the runtime)
+  float16  weights stored as float16, dequantized at load
+  int8     dynamic-range quantization: int8 weights, activations quantized on
+           the fly inside the fused LSTM / fully-connected kernels
+
+Every variant is scored against the float32 Keras model on held-out windows
+before it is published:
+  agreement      share of windows whose argmax matches float32
+  accuracy       against the dataset labels, when the data has them
+  max |Δp|       largest probability difference
+It is written to <stem>.<variant>.tflite, next to a <stem>.<variant>.json
+report, only if agreement >= --min-agreement and accuracy dropped by at most
+--max-accuracy-drop; otherwise a previously published file for that variant is
+removed and the command exits 1. The service only loads a variant whose report
+says it passed (MODEL_VARIANT, see app.py); with MODEL_SOURCE_PATH it also
+checks that source_sha256 still matches that Keras model.
+
+Keras 3 LSTMs only lower to TFLite's fused LSTM kernels with a static batch
+size, so the model is rebuilt with a fixed batch of --batch windows before
+conversion; TFLiteBackend feeds larger batches in chunks.
+
+Held-out windows (--data):
+  .npz           arrays x (N, 100, 3) and optionally y (activity ids)
+  store / .csv   a window store, sharded store or CSV from model_training/dataset;
+                 the validation rows of the split model.py trains with
+  (none)         random windows; agreement only
+
+Usage:
+  python quantize.py export fog_6class_lstm.keras --data ../model_training/dataset/train_windows_augmented
+  python quantize.py export fog_6class_lstm.keras --variants int8 --min-agreement 0.995
+  python quantize.py evaluate fog_6class_lstm.keras fog_6class_lstm.int8.tflite --data held_out.npz
+"""
+import argparse
+import hashlib
+import json
+import os
+import sys
+import time
+from typing import Callable, Optional, Tuple
+
+import numpy as np
+
+VARIANTS = ("float32", "float16", "int8")
+REPORT_VERSION = 1
+ACTIVITY_IDS = np.array([0, 1, 2, 3, 4, 6], dtype=np.int32)    # model output index → activity id
+DATASET_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "model_training", "dataset")
+
+
+def variant_path(keras_path: str, variant: str, out_dir: Optional[str] = None) -> str:
+    stem = os.path.splitext(os.path.basename(keras_path))[0]
+    return os.path.join(out_dir or os.path.dirname(keras_path) or ".", f"{stem}.{variant}.tflite")
+
+
+def report_path(tflite_path: str) -> str:
+    return os.path.splitext(tflite_path)[0] + ".json"
+
+
+def load_report(tflite_path: str, source_path: Optional[str] = None) -> dict:
+    """The evaluation report published with a variant; raises if it is missing,
+    failed, or was written for a different file. With source_path, also raises
+    if that Keras model is not the one the variant was converted from (the
+    report's source_sha256); without it the recorded hash is trusted, so a
+    serving host needs no .keras file."""
+    path = report_path(tflite_path)
+    if not os.path.exists(path):
+        raise FileNotFoundError(f"{path} not found; export variants with quantize.py")
+    with open(path) as f:
+        report = json.load(f)
+    if not report.get("passed"):
+        raise ValueError(f"{tflite_path} did not pass evaluation: {report.get('reason')}")
+    if report.get("sha256") != file_sha256(tflite_path):
+        raise ValueError(f"{tflite_path} does not match the model its report was written for")
+    if source_path is not None and report.get("source_sha256") != file_sha256(source_path):
+        raise ValueError(f"{tflite_path} was exported from an older {report['source']}; re-export it with quantize.py")
+    return report
+
+
+def file_sha256(path: str) -> str:
+    h = hashlib.sha256()
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(1 << 20), b""):
+            h.update(block)
+    return h.hexdigest()
+
+
+# ── Conversion ────────────────────────────────────────────────────────────────
+
+def convert(model, variant: str, batch: int = 1) -> bytes:
+    """TFLite flatbuffer of a Keras model for one of VARIANTS."""
+    import tensorflow as tf
+
+    fixed = tf.keras.models.clone_model(
+        model, input_tensors=tf.keras.Input(batch_shape=(batch,) + tuple(model.input_shape[1:]))
+    )
+    fixed.set_weights(model.get_weights())
+    converter = tf.lite.TFLiteConverter.from_keras_model(fixed)
+    if variant == "float16":
+        converter.optimizations = [tf.lite.Optimize.DEFAULT]
+        converter.target_spec.supported_types = [tf.float16]
+    elif variant == "int8":
+        converter.optimizations = [tf.lite.Optimize.DEFAULT]
+    elif variant != "float32":
+        raise ValueError(f"Unknown variant {variant!r}, expected one of {VARIANTS}")
+    return converter.convert()
+
+
+# ── Held-out data ─────────────────────────────────────────────────────────────
+
+def held_out_windows(data: Optional[str], limit: int, seq_len: int, seed: int = 0) -> Tuple[np.ndarray, Optional[np.ndarray]]:
+    """(X, y) to evaluate on; y is None when the data has no labels."""
+    rng = np.random.default_rng(seed)
+    if data is None:
+        X = rng.normal(0.0, 1.0, size=(limit, seq_len, 3)).astype(np.float32)
+        X[0] = [-0.98, 0.0, 0.0]   # gravity-only window, the Rest/Medication Check case
+        return X, None
+
+    if data.endswith(".npz"):
+        arrays = np.load(data)
+        X = arrays["x"]
+        y = arrays["y"] if "y" in arrays.files else None
+        rows = np.arange(len(X))
+    else:
+        X, y, rows = _validation_rows(data)
+
+    if len(rows) > limit:
+        rows = np.sort(rng.choice(rows, size=limit, replace=False))
+    return _take(X, rows), (np.asarray(y)[rows].astype(np.int32) if y is not None else None)
+
+
+def _validation_rows(data: str) -> tuple:
+    """Validation split of a model_training dataset, as model.py draws it."""
+    sys.path.insert(0, DATASET_DIR)
+    from window_store import is_sharded, load_index, read_dataset, shard_path
+
+    if is_sharded(data):
+        from model import stratified_split
+
+        index = load_index(data)
+        y = index["target_activity"].to_numpy()
+        _, y_encoded = np.unique(y, return_inverse=True)
+        rows = np.flatnonzero(stratified_split(y_encoded, 0.2, seed=42))
+        return _ShardedWindows(data, index, shard_path), y, rows
+
+    from sklearn.model_selection import train_test_split
+
+    X, meta = read_dataset(data, mmap=True)
+    y = meta["target_activity"].to_numpy()
+    _, y_encoded = np.unique(y, return_inverse=True)
+    _, rows = train_test_split(np.arange(len(y)), test_size=0.2, random_state=42, stratify=y_encoded)
+    return X, y, np.sort(rows)
+
+
+class _ShardedWindows:
+    """Row lookup over a sharded store, reading only the shards that are needed."""
+
+    def __init__(self, path: str, index, shard_path: Callable[[str, int], str]):
+        self.path = path
+        self.shard = index["shard"].to_numpy()
+        self.row = index["row"].to_numpy()
+        self.shard_path = shard_path
+
+    def take(self, rows: np.ndarray) -> np.ndarray:
+        out = [None] * len(rows)
+        shards = self.shard[rows]
+        for s in np.unique(shards):
+            pos = np.flatnonzero(shards == s)
+            X = np.load(self.shard_path(self.path, int(s)), mmap_mode="r")
+            for p, x in zip(pos, X[self.row[rows[pos]]]):
+                out[p] = x
+        return np.stack(out)
+
+
+def _take(X, rows: np.ndarray) -> np.ndarray:
+    if isinstance(X, _ShardedWindows):
+        return np.ascontiguousarray(X.take(rows), dtype=np.float32)
+    return np.ascontiguousarray(X[rows], dtype=np.float32)
+
+
+# ── Evaluation ────────────────────────────────────────────────────────────────
+
+def compare(ref: np.ndarray, out: np.ndarray, y: Optional[np.ndarray]) -> dict:
+    res = {
+        "windows": int(len(ref)),
+        "agreement": float((ref.argmax(axis=1) == out.argmax(axis=1)).mean()),
+        "max_abs_diff": float(np.abs(ref - out).max()),
+        "mean_abs_diff": float(np.abs(ref - out).mean()),
+        "accuracy": None, "reference_accuracy": None, "accuracy_drop": None,
+    }
+    if y is not None:
+        res["reference_accuracy"] = float((ACTIVITY_IDS[ref.argmax(axis=1)] == y).mean())
+        res["accuracy"] = float((ACTIVITY_IDS[out.argmax(axis=1)] == y).mean())
+        res["accuracy_drop"] = res["reference_accuracy"] - res["accuracy"]
+    return res
+
+
+def gate(res: dict, min_agreement: float, max_accuracy_drop: float) -> Optional[str]:
+    """Why a variant must not be published, or None if it may."""
+    if res["agreement"] < min_agreement:
+        return f"agreement {res['agreement']:.4f} < {min_agreement}"
+    if res["accuracy_drop"] is not None and res["accuracy_drop"] > max_accuracy_drop:
+        return f"accuracy drop {res['accuracy_drop']:.4f} > {max_accuracy_drop}"
+    return None
+
+
+def ms_per_window(predict: Callable[[np.ndarray], np.ndarray], X: np.ndarray, n: int = 50) -> float:
+    """Median latency of a single-window call."""
+    predict(X[:1])
+    lat = []
+    for i in range(n):
+        start = time.perf_counter()
+        predict(X[i % len(X):i % len(X) + 1])
+        lat.append(time.perf_counter() - start)
+    return float(np.median(lat) * 1e3)
+
+
+def evaluate(keras_path: str, tflite_path: str, X: np.ndarray, y: Optional[np.ndarray], ref: np.ndarray = None) -> dict:
+    from engine import InferenceEngine
+
+    if ref is None:
+        ref = InferenceEngine.load("tf", keras_path).predict(X)
+    engine = InferenceEngine.load("tflite", tflite_path)
+    res = compare(ref, engine.predict(X), y)
+    res["ms_per_window"] = ms_per_window(engine.predict, X)
+    return res
+
+
+def export(keras_path: str, variants, X: np.ndarray, y: Optional[np.ndarray], data: Optional[str],
+           min_agreement: float, max_accuracy_drop: float, batch: int = 1, out_dir: Optional[str] = None) -> dict:
+    """Converts, evaluates and (if it passes) publishes each variant. Returns the reports."""
+    import tensorflow as tf
+    from engine import InferenceEngine
+
+    model = tf.keras.models.load_model(keras_path, safe_mode=False)
+    reference = InferenceEngine.load("tf", keras_path)
+    ref = reference.predict(X)
+    ref_ms = ms_per_window(reference.predict, X)
+
+    reports = {}
+    for variant in variants:
+        path = variant_path(keras_path, variant, out_dir)
+        tmp = path + ".tmp"
+        with open(tmp, "wb") as f:
+            f.write(convert(model, variant, batch))
+        try:
+            res = evaluate(keras_path, tmp, X, y, ref=ref)
+        except Exception:
+            os.remove(tmp)
+            raise
+        reason = gate(res, min_agreement, max_accuracy_drop)
+        report = {
+            "version": REPORT_VERSION, "variant": variant, "source": os.path.basename(keras_path),
+            "source_sha256": file_sha256(keras_path), "batch": batch, "bytes": os.path.getsize(tmp),
+            "data": data or "random", "min_agreement": min_agreement, "max_accuracy_drop": max_accuracy_drop,
+            "reference_ms_per_window": ref_ms, **res, "passed": reason is None, "reason": reason,
+        }
+        if reason is None:
+            report["sha256"] = file_sha256(tmp)
+            os.replace(tmp, path)
+            with open(report_path(path), "w") as f:
+                json.dump(report, f, indent=2)
+        else:
+            # A variant published from an earlier model must not outlive a refused re-export
+            for stale in (tmp, path, report_path(path)):
+                if os.path.exists(stale):
+                    os.remove(stale)
+        reports[variant] = report
+    return reports
+
+
+def _fmt(v, spec: str) -> str:
+    return "-" if v is None else format(v, spec)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Export and gate quantized TFLite variants of the FOG LSTM.")
+    sub = parser.add_subparsers(dest="cmd", required=True)
+    for name, help_text in (("export", "Convert, evaluate and publish variants"),
+                            ("evaluate", "Score an existing .tflite against the Keras model")):
+        p = sub.add_parser(name, help=help_text)
+        p.add_argument("keras_path")
+        if name == "export":
+            p.add_argument("--variants", nargs="+", choices=VARIANTS, default=["float16", "int8"])
+            p.add_argument("--batch",    type=int, default=1, help="Static batch size of the exported model (default: 1)")
+            p.add_argument("--out-dir",  default=None, help="Where to publish (default: next to the .keras)")
+        else:
+            p.add_argument("tflite_path")
+        p.add_argument("--data",  default=None, help=".npz, window store, sharded store or .csv (default: random windows)")
+        p.add_argument("--limit", type=int, default=5000, help="Max held-out windows (default: 5000)")
+        p.add_argument("--min-agreement",     type=float, default=0.99, help="Min argmax agreement (default: 0.99)")
+        p.add_argument("--max-accuracy-drop", type=float, default=0.01, help="Max accuracy loss (default: 0.01)")
+    args = parser.parse_args()
+
+    import tensorflow as tf
+    seq_len = tf.keras.models.load_model(args.keras_path, safe_mode=False).input_shape[1]
+    X, y = held_out_windows(args.data, args.limit, seq_len)
+    print(f"{len(X):,} held-out windows from {args.data or 'random data'}"
+          f"{'' if y is not None else ' (no labels: agreement only)'}")
+
+    if args.cmd == "evaluate":
+        res = evaluate(args.keras_path, args.tflite_path, X, y)
+        reason = gate(res, args.min_agreement, args.max_accuracy_drop)
+        print(f"agreement {res['agreement']:.2%}  accuracy {_fmt(res['accuracy'], '.2%')} "
+              f"(float32 {_fmt(res['reference_accuracy'], '.2%')})  max |Δp| {res['max_abs_diff']:.2e}  "
+              f"{res['ms_per_window']:.2f} ms/window")
+        print(f"[FAIL] {reason}" if reason else "[OK] within thresholds")
+        sys.exit(1 if reason else 0)
+
+    reports = export(args.keras_path, args.variants, X, y, args.data, args.min_agreement,
+                     args.max_accuracy_drop, batch=args.batch, out_dir=args.out_dir)
+    first = next(iter(reports.values()))
+    print(f"float32 Keras: accuracy {_fmt(first['reference_accuracy'], '.2%')}, "
+          f"{first['reference_ms_per_window']:.2f} ms/window\n")
+    print(f"{'variant':<8} {'MB':>6} {'agree':>8} {'acc':>8} {'max|Δp|':>9} {'ms/win':>7}  result")
+    for variant, r in reports.items():
+        result = f"published {variant_path(args.keras_path, variant, args.out_dir)}" if r["passed"] else f"REFUSED: {r['reason']}"
+        print(f"{variant:<8} {r['bytes'] / 1e6:>6.2f} {r['agreement']:>8.2%} {_fmt(r['accuracy'], '.2%'):>8} "
+              f"{r['max_abs_diff']:>9.2e} {r['ms_per_window']:>7.2f}  {result}")
+    if not all(r["passed"] for r in reports.values()):
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
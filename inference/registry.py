@@ -0,0 +1,88 @@
+"""Background model loading with per-model state.
+
+Startup used to load the LSTM and the GGUF synchronously, so the process could
+not answer anything (not even /health) until both were in memory. Models are
+now registered with a loader function and loaded on background threads; the
+app is live as soon as uvicorn is up and ready once every required model has
+loaded. Loaders import their runtime (tensorflow, llama_cpp, ...) themselves,
+so importing app.py stays cheap.
+
+States: pending → loading → ready | failed, or absent when the artifact does
+not exist.
+"""
+import os
+import threading
+import time
+import traceback
+from typing import Any, Callable, Dict, Optional
+
+PENDING, LOADING, READY, FAILED, ABSENT = "pending", "loading", "ready", "failed", "absent"
+
+
+class ModelSlot:
+    def __init__(self, name: str, loader: Callable[[], Any], required: bool, path: Optional[str]):
+        self.name = name
+        self.loader = loader
+        self.required = required
+        self.path = path
+        self.state = PENDING
+        self.value: Any = None
+        self.error: Optional[str] = None
+        self.load_s: Optional[float] = None
+
+    def status(self) -> dict:
+        return {"state": self.state, "required": self.required, "load_s": self.load_s, "error": self.error}
+
+
+class ModelRegistry:
+    def __init__(self):
+        self._slots: Dict[str, ModelSlot] = {}
+        self._lock = threading.Lock()
+
+    def register(self, name: str, loader: Callable[[], Any], required: bool = True, path: Optional[str] = None):
+        """`path`, if given, is checked before loading; a missing file marks the slot absent."""
+        self._slots[name] = ModelSlot(name, loader, required, path)
+
+    def start(self):
+        """Loads every registered model on its own daemon thread."""
+        for slot in self._slots.values():
+            threading.Thread(target=self._load, args=(slot,), name=f"load-{slot.name}", daemon=True).start()
+
+    def load_now(self):
+        """Synchronous alternative to start(), e.g. for scripts."""
+        for slot in self._slots.values():
+            self._load(slot)
+
+    def _load(self, slot: ModelSlot):
+        if slot.path is not None and not os.path.exists(slot.path):
+            slot.state = ABSENT
+            slot.error = f"{slot.path} not found"
+            return
+        slot.state = LOADING
+        start = time.perf_counter()
+        try:
+            value = slot.loader()
+        except Exception as e:
+            traceback.print_exc()
+            slot.error = f"{type(e).__name__}: {e}"
+            slot.state = FAILED
+            return
+        with self._lock:
+            slot.value = value
+            slot.load_s = round(time.perf_counter() - start, 3)
+            slot.state = READY
+
+    def get(self, name: str) -> Any:
+        """The loaded object, or None while it is not ready."""
+        slot = self._slots.get(name)
+        return slot.value if slot is not None and slot.state == READY else None
+
+    def state(self, name: str) -> Optional[str]:
+        slot = self._slots.get(name)
+        return slot.state if slot is not None else None
+
+    def ready(self) -> bool:
+        return all(s.state == READY for s in self._slots.values() if s.required)
+
+    def status(self) -> Dict[str, dict]:
+        return {name: slot.status() for name, slot in self._slots.items()}
@@ -0,0 +1,283 @@
+"""Online movement statistics per session over longer horizons.
+
+The chat context only sees the last CONTEXT_CAPACITY events, and recomputing
+statistics over an hour of stored windows on every update is quadratic. Here
+each window contributes the acceleration-magnitude aggregate _window_stats
+already computes (n samples, mean, std, min, max), so an update costs O(1)
+per window whatever the horizon:
+
+  sliding (5 min, 1 h)  Welford/Chan accumulators: a window's (n, mean, M2) is
+                        merged on arrival and un-merged when it ages out; min
+                        and max come from monotonic queues of window extremes
+  today                 cumulative accumulator, reset at UTC midnight
+  trend                 time-decayed EWMAs of the window mean magnitude with
+                        1 min and 15 min time constants; fast - slow > 0 means
+                        movement is picking up
+
+The windows of a sliding horizon are rows of one float64 NumPy ring buffer
+(t, n, mean, M2, min, max) addressed by head/tail sequence numbers, and the
+monotonic queues are rings of sequence numbers into it, so a session costs a
+few compact arrays rather than a Python tuple per window. Buffers double when
+full and halve once three quarters empty.
+
+State is per process, like the "memory" context store.
+"""
+import math
+import threading
+import time
+from collections import OrderedDict
+from typing import Dict, Iterable, Optional, Sequence, Tuple
+
+import numpy as np
+
+HORIZONS: Dict[str, float] = {"5m": 300.0, "1h": 3600.0}
+EWMA_TAU_S = (60.0, 900.0)
+DAY_S = 86400.0
+
+
+class _Acc:
+    """Count, mean and sum of squared deviations (M2) of a multiset of samples."""
+    __slots__ = ("n", "mean", "m2")
+
+    def __init__(self):
+        self.n, self.mean, self.m2 = 0, 0.0, 0.0
+
+    def add(self, n: int, mean: float, m2: float):
+        total = self.n + n
+        delta = mean - self.mean
+        self.mean += delta * n / total
+        self.m2 += m2 + delta * delta * self.n * n / total
+        self.n = total
+
+    def remove(self, n: int, mean: float, m2: float):
+        rest = self.n - n
+        if rest <= 0:
+            self.n, self.mean, self.m2 = 0, 0.0, 0.0
+            return
+        rest_mean = (self.n * self.mean - n * mean) / rest
+        delta = mean - rest_mean
+        self.m2 = max(self.m2 - m2 - delta * delta * rest * n / self.n, 0.0)
+        self.mean = rest_mean
+        self.n = rest
+
+    def std(self) -> float:
+        return math.sqrt(self.m2 / self.n) if self.n else 0.0
+
+
+_T, _N, _MEAN, _M2, _MIN, _MAX = range(6)     # columns of _Horizon.buf
+MIN_CAPACITY = 16
+
+
+def _relayout(arr: np.ndarray, head: int, tail: int, capacity: int) -> np.ndarray:
+    """Copy of ring `arr` (live sequence numbers head..tail) with a new capacity."""
+    seq = np.arange(head, tail)
+    out = np.empty((capacity,) + arr.shape[1:], dtype=arr.dtype)
+    out[seq % capacity] = arr[seq % len(arr)]
+    return out
+
+
+class _SeqQueue:
+    """Double-ended queue of window sequence numbers in an int64 ring, sized like
+    the window buffer (doubles when full, halves once three quarters empty)."""
+    __slots__ = ("ring", "head", "tail")
+
+    def __init__(self):
+        self.ring = np.empty(MIN_CAPACITY, dtype=np.int64)
+        self.head = self.tail = 0
+
+    def __len__(self) -> int:
+        return self.tail - self.head
+
+    def first(self) -> int:
+        return self.ring.item(self.head % len(self.ring))
+
+    def last(self) -> int:
+        return self.ring.item((self.tail - 1) % len(self.ring))
+
+    def append(self, seq: int):
+        if len(self) == len(self.ring):
+            self.ring = _relayout(self.ring, self.head, self.tail, 2 * len(self.ring))
+        self.ring[self.tail % len(self.ring)] = seq
+        self.tail += 1
+
+    def pop(self):
+        self.tail -= 1
+
+    def popleft(self):
+        self.head += 1
+
+    def shrink(self):
+        if len(self.ring) > MIN_CAPACITY and 4 * len(self) <= len(self.ring):
+            self.ring = _relayout(self.ring, self.head, self.tail, len(self.ring) // 2)
+
+
+class _Horizon:
+    __slots__ = ("span", "acc", "buf", "head", "tail", "mins", "maxs", "removed")
+
+    def __init__(self, span: float):
+        self.span = span
+        self.acc = _Acc()
+        self.buf = np.empty((MIN_CAPACITY, 6))    # window seq s lives in row s % capacity
+        self.head = self.tail = 0                 # live windows: seq head..tail-1
+        self.mins = _SeqQueue()                   # seqs whose min values increase
+        self.maxs = _SeqQueue()                   # seqs whose max values decrease
+        self.removed = 0
+
+    def __len__(self) -> int:
+        return self.tail - self.head
+
+    def push(self, t: float, n: int, mean: float, m2: float, lo: float, hi: float):
+        if len(self) == len(self.buf):
+            self.buf = _relayout(self.buf, self.head, self.tail, 2 * len(self.buf))
+        buf, cap, seq = self.buf, len(self.buf), self.tail
+        buf[seq % cap] = (t, n, mean, m2, lo, hi)
+        self.tail += 1
+        self.acc.add(n, mean, m2)
+        while self.mins and buf.item(self.mins.last() % cap, _MIN) >= lo:
+            self.mins.pop()
+        self.mins.append(seq)
+        while self.maxs and buf.item(self.maxs.last() % cap, _MAX) <= hi:
+            self.maxs.pop()
+        self.maxs.append(seq)
+
+    def expire(self, now: float):
+        cutoff = now - self.span
+        buf, cap = self.buf, len(self.buf)
+        while self.head < self.tail and buf.item(self.head % cap, _T) <= cutoff:
+            _, n, mean, m2, _, _ = buf[self.head % cap].tolist()
+            self.acc.remove(int(n), mean, m2)
+            self.head += 1
+            self.removed += 1
+        # Un-merging accumulates rounding error; re-sum once as many windows have
+        # left as remain, which keeps the amortized cost O(1)
+        if self.removed > max(len(self), 64):
+            self.acc = _Acc()
+            if len(self):
+                rows = buf[np.arange(self.head, self.tail) % cap]
+                self.acc.add(int(rows[:, _N].sum()), *_merged(rows[:, _N], rows[:, _MEAN], rows[:, _M2]))
+            self.removed = 0
+        while self.mins and self.mins.first() < self.head:
+            self.mins.popleft()
+        while self.maxs and self.maxs.first() < self.head:
+            self.maxs.popleft()
+        if cap > MIN_CAPACITY and 4 * len(self) <= cap:
+            self.buf = _relayout(self.buf, self.head, self.tail, cap // 2)
+        self.mins.shrink()
+        self.maxs.shrink()
+
+    def snapshot(self) -> dict:
+        cap = len(self.buf)
+        return _summary(len(self), self.acc,
+                        self.buf.item(self.mins.first() % cap, _MIN) if self.mins else None,
+                        self.buf.item(self.maxs.first() % cap, _MAX) if self.maxs else None)
+
+
+def _merged(n: np.ndarray, mean: np.ndarray, m2: np.ndarray) -> Tuple[float, float]:
+    """(mean, M2) of the union of windows given their (n, mean, M2) columns."""
+    total_mean = float((n * mean).sum() / n.sum())
+    return total_mean, float((m2 + n * (mean - total_mean) ** 2).sum())
+
+
+def _summary(windows: int, acc: _Acc, lo: Optional[float], hi: Optional[float]) -> dict:
+    return {"windows": windows, "samples": acc.n, "mean": acc.mean, "std": acc.std(), "min": lo, "max": hi}
+
+
+class SessionStats:
+    def __init__(self, horizons: Sequence[float] = tuple(HORIZONS.values()), ewma_tau_s: Sequence[float] = EWMA_TAU_S):
+        self.horizons = [_Horizon(span) for span in horizons]
+        self.day = -1
+        self.today = _Acc()
+        self.today_windows = 0
+        self.today_min = math.inf
+        self.today_max = -math.inf
+        self.tau = tuple(ewma_tau_s)
+        self.ewma = [0.0] * len(self.tau)
+        self.last_t: Optional[float] = None
+
+    def update(self, t: float, n: int, mean: float, std: float, lo: float, hi: float):
+        m2 = std * std * n
+        for h in self.horizons:
+            h.push(t, n, mean, m2, lo, hi)
+            h.expire(t)
+
+        day = int(t // DAY_S)
+        if day != self.day:
+            self.day, self.today, self.today_windows = day, _Acc(), 0
+            self.today_min, self.today_max = math.inf, -math.inf
+        self.today.add(n, mean, m2)
+        self.today_windows += 1
+        self.today_min = min(self.today_min, lo)
+        self.today_max = max(self.today_max, hi)
+
+        if self.last_t is None:
+            self.ewma = [mean] * len(self.tau)
+        else:
+            dt = max(t - self.last_t, 0.0)
+            for i, tau in enumerate(self.tau):
+                w = math.exp(-dt / tau)
+                self.ewma[i] = w * self.ewma[i] + (1.0 - w) * mean
+        self.last_t = t
+
+    def snapshot(self, now: float) -> dict:
+        for h in self.horizons:
+            h.expire(now)
+        today = int(now // DAY_S) == self.day
+        return {
+            "horizons": {_span_name(h.span): h.snapshot() for h in self.horizons},
+            "today": _summary(self.today_windows, self.today, self.today_min, self.today_max) if today
+                     else _summary(0, _Acc(), None, None),
+            "ewma": {f"{int(tau)}s": v for tau, v in zip(self.tau, self.ewma)},
+            "trend": self.ewma[0] - self.ewma[-1],
+            "last_update_s_ago": now - self.last_t if self.last_t is not None else None,
+        }
+
+
+def _span_name(span: float) -> str:
+    for name, s in HORIZONS.items():
+        if s == span:
+            return name
+    return f"{int(span)}s"
+
+
+class RollingStore:
+    """SessionStats per session; least recently updated sessions are evicted beyond max_sessions."""
+
+    def __init__(self, max_sessions: int = 10000, horizons: Sequence[float] = tuple(HORIZONS.values())):
+        self.max_sessions = max_sessions
+        self.horizons = tuple(horizons)
+        self._sessions: "OrderedDict[str, SessionStats]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def _get(self, session_id: str) -> SessionStats:
+        stats = self._sessions.pop(session_id, None) or SessionStats(self.horizons)
+        self._sessions[session_id] = stats
+        while len(self._sessions) > self.max_sessions:
+            self._sessions.popitem(last=False)
+        return stats
+
+    def update(self, session_id: str, window_stats: dict, t: Optional[float] = None):
+        """Adds one window, summarized as in app._window_stats."""
+        self.update_many(session_id, [(window_stats["seq_len"], window_stats["movement_mag_mean"],
+                                       window_stats["movement_mag_std"], window_stats["movement_mag_min"],
+                                       window_stats["movement_mag_max"])], t)
+
+    def update_many(self, session_id: str, aggregates: Iterable[Tuple[int, float, float, float, float]],
+                    t: Optional[float] = None):
+        """Adds windows given as (n, mean, std, min, max) magnitude aggregates, oldest first."""
+        t = time.time() if t is None else t
+        with self._lock:
+            stats = self._get(session_id)
+            for n, mean, std, lo, hi in aggregates:
+                stats.update(t, int(n), float(mean), float(std), float(lo), float(hi))
+
+    def snapshot(self, session_id: str, now: Optional[float] = None) -> Optional[dict]:
+        with self._lock:
+            stats = self._sessions.get(session_id)
+            return stats.snapshot(time.time() if now is None else now) if stats is not None else None
+
+    def drop(self, session_id: str):
+        with self._lock:
+            self._sessions.pop(session_id, None)
+
+    def __len__(self) -> int:
+        return len(self._sessions)
@@ -0,0 +1,90 @@
+"""Server-side sliding windows for streamed IMU samples.
+
+Instead of POSTing pre-built 100x3 windows (and re-sending every sample twice
+because of the 50% overlap), clients stream raw AccV/AccML/AccAP samples per
+session. Each session keeps a ring buffer of the last WINDOW_SIZE raw samples
+and cuts a window every STRIDE samples, downsampled exactly like
+`clean_dataset.compute_imu_features`: raw[i : i + WINDOW_SIZE][::DOWNSAMPLE_STEP].
+"""
+import threading
+from collections import OrderedDict
+from typing import List, Tuple
+
+import numpy as np
+
+# Must match model_training/dataset/clean_dataset.py (checked by test_streaming.py)
+WINDOW_SIZE = 1000      # raw samples per window  (10s @ 100Hz)
+STRIDE = 500            # 50% overlap
+DOWNSAMPLE_STEP = 10    # 1000 // 10 = 100 timesteps fed to the LSTM
+
+
+class SessionWindower:
+    """Ring buffer for one session. push() returns every window completed by
+    the new samples as (window_start, downsampled (100, 3) float32 array)."""
+
+    def __init__(self, window_size: int = WINDOW_SIZE, stride: int = STRIDE,
+                 downsample_step: int = DOWNSAMPLE_STEP):
+        self.window_size = window_size
+        self.stride = stride
+        self.downsample_step = downsample_step
+        self.n_samples = 0                 # total samples received so far
+        self._next_end = window_size       # sample count at which the next window completes
+        self._buf = np.zeros((window_size, 3), dtype=np.float32)
+        self._lock = threading.Lock()
+
+    def push(self, samples: np.ndarray) -> List[Tuple[int, np.ndarray]]:
+        samples = np.asarray(samples, dtype=np.float32).reshape(-1, 3)
+        windows = []
+        with self._lock:
+            pos = 0
+            while pos < len(samples):
+                # Copy up to the next window boundary, wrapping around the ring
+                take = min(len(samples) - pos, self._next_end - self.n_samples)
+                start = self.n_samples % self.window_size
+                first = min(take, self.window_size - start)
+                self._buf[start:start + first] = samples[pos:pos + first]
+                self._buf[:take - first] = samples[pos + first:pos + take]
+                self.n_samples += take
+                pos += take
+
+                if self.n_samples == self._next_end:
+                    oldest = self.n_samples % self.window_size
+                    raw = np.concatenate([self._buf[oldest:], self._buf[:oldest]])
+                    windows.append((self._next_end - self.window_size, raw[::self.downsample_step].copy()))
+                    self._next_end += self.stride
+        return windows
+
+
+class StreamSessions:
+    """Bounded map of session_id → SessionWindower; least recently used
+    sessions are dropped once max_sessions is reached."""
+
+    def __init__(self, max_sessions: int = 1000):
+        self.max_sessions = max_sessions
+        self._sessions: "OrderedDict[str, SessionWindower]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, session_id: str) -> SessionWindower:
+        with self._lock:
+            windower = self._sessions.get(session_id)
+            if windower is None:
+                windower = self._sessions[session_id] = SessionWindower()
+                while len(self._sessions) > self.max_sessions:
+                    self._sessions.popitem(last=False)
+            else:
+                self._sessions.move_to_end(session_id)
+            return windower
+
+    def close(self, session_id: str) -> bool:
+        with self._lock:
+            return self._sessions.pop(session_id, None) is not None
+
+    def __len__(self) -> int:
+        return len(self._sessions)
+
+
+def decode_samples(body: bytes) -> np.ndarray:
+    """Raw little-endian float32 (n, 3) sample chunk → array, without copying."""
+    if len(body) % 12:
+        raise ValueError(f"Binary sample chunk must be a multiple of 12 bytes (3 x float32), got {len(body)}")
+    return np.frombuffer(body, dtype="<f4").reshape(-1, 3)
@@ -0,0 +1,57 @@
+"""NumPy runtime vs Keras parity. Run from inference/: python -m pytest -q test_numpy_lstm.py"""
+import os
+import sys
+import zipfile
+
+import numpy as np
+import pytest
+
+tf = pytest.importorskip("tensorflow")
+
+from numpy_lstm import NumpyLSTM, check_parity, export_npz
+
+DATASET_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "model_training", "dataset")
+TRAINED_MODEL = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "model_training", "fog_6class_lstm.keras")
+TOL = 1e-5
+
+
+@pytest.fixture(scope="module")
+def random_model(tmp_path_factory):
+    """build_model() with its default initializers under a fixed seed."""
+    sys.path.insert(0, DATASET_DIR)
+    from model import build_model
+
+    tf.keras.utils.set_random_seed(0)
+    model = build_model(100)
+    path = str(tmp_path_factory.mktemp("parity") / "random.keras")
+    model.save(path)
+    return path
+
+
+def _parity(keras_path, tmp_path):
+    npz_path = str(tmp_path / "weights.npz")
+    export_npz(keras_path, npz_path)
+    return check_parity(keras_path, npz_path, n=64, tol=TOL)
+
+
+def test_random_weights_match_keras(random_model, tmp_path):
+    res = _parity(random_model, tmp_path)
+    assert res["max_abs_diff"] <= TOL, res
+    assert res["argmax_agreement"] == 1.0, res
+
+
+@pytest.mark.skipif(not zipfile.is_zipfile(TRAINED_MODEL), reason="trained model not checked out (git-lfs)")
+def test_trained_model_matches_keras(tmp_path):
+    res = _parity(TRAINED_MODEL, tmp_path)
+    assert res["max_abs_diff"] <= TOL, res
+    assert res["argmax_agreement"] == 1.0, res
+
+
+def test_batch_rows_are_independent(random_model, tmp_path):
+    npz_path = str(tmp_path / "weights.npz")
+    export_npz(random_model, npz_path)
+    model = NumpyLSTM.load(npz_path)
+    x = np.random.default_rng(1).normal(size=(8, 100, 3)).astype(np.float32)
+    batched = model.predict(x)
+    single = np.concatenate([model.predict(x[i:i + 1]) for i in range(len(x))])
+    np.testing.assert_allclose(batched, single, atol=1e-6)
@@ -0,0 +1,41 @@
+"""Streaming windows vs the training windows. Run from inference/: python -m pytest -q test_streaming.py"""
+import os
+import sys
+
+import numpy as np
+import pytest
+
+pd = pytest.importorskip("pandas")
+
+from streaming import DOWNSAMPLE_STEP, STRIDE, WINDOW_SIZE, SessionWindower
+
+DATASET_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "model_training", "dataset")
+
+
+@pytest.fixture(scope="module")
+def clean_dataset():
+    sys.path.insert(0, DATASET_DIR)
+    import clean_dataset
+    return clean_dataset
+
+
+def test_constants_match_training(clean_dataset):
+    assert (WINDOW_SIZE, STRIDE, DOWNSAMPLE_STEP) == (
+        clean_dataset.WINDOW_SIZE, clean_dataset.STRIDE, clean_dataset.DOWNSAMPLE_STEP)
+
+
+def test_windows_match_window_recording(clean_dataset):
+    n = 3 * WINDOW_SIZE + STRIDE // 3
+    acc = np.random.default_rng(0).normal(size=(n, 3)).astype(np.float32)
+    df = pd.DataFrame(acc, columns=clean_dataset.ACC_COLS)
+    for col in clean_dataset.EVENT_COLS:
+        df[col] = 0
+    expected = clean_dataset.window_recording(df)
+
+    windower = SessionWindower()
+    got = []
+    for chunk in np.array_split(acc, 37):       # uneven chunks that straddle window boundaries
+        got.extend(windower.push(chunk))
+
+    assert [start for start, _ in got] == expected["window_start"].tolist()
+    np.testing.assert_array_equal(np.stack([w for _, w in got]), expected["imu_features"].astype(np.float32))
@@ -0,0 +1,617 @@
+"""Load test for the inference service and the backend.
+
+Replays a request mix against either service, in-process (the ASGI app is
+imported and driven through httpx without a socket) or over HTTP against a
+running uvicorn (--url), and reports latency percentiles, throughput, error
+counts and memory.
+
+  closed loop   --concurrency N clients, each sending its next request as soon
+                as the previous one returns (--requests total, or --duration)
+  open loop     --rate R requests/s with Poisson arrivals for --duration
+                seconds. Latency is measured from the scheduled arrival time,
+                so a server that falls behind shows up as queueing delay
+                instead of silently lowering the offered load.
+
+Workload:
+  windows   --windows dummydata.txt (one 100x3 window), a JSON array of
+            windows, or JSONL with one window (or {"x": window}) per line;
+            synthetic gait-like windows otherwise
+  messages  --messages FILE, one chat message per line; a few built-in ones
+            otherwise
+  mix       --scenario infer:8,chat:1 (weights, default 1)
+
+Scenarios
+  inference   infer, infer_batch, chat, chat_stream
+  backend     ingest, recommend, activity_log, trend, chat, chat_stream
+
+Chat is only meaningful with a model or --stub-llm (in-process only), which
+puts a fake model that emits --stub-tokens tokens --stub-token-ms apart behind
+the real LLMExecutor, so queueing, 429s and timeouts behave as in production.
+
+"ttfb" is the time to the first response bytes (the first token for
+chat_stream). It only means something with --url: httpx's ASGI transport
+buffers the whole response, so in-process it equals the total latency.
+
+Results can be saved with --save-baseline FILE and later runs compared against
+it with --baseline FILE: the run fails (exit 1) if a scenario's p50/p95/p99
+grew, or its throughput dropped, by more than --tolerance.
+
+Usage (from the repo root):
+  INFER_BACKEND=numpy MODEL_PATH=model_training/fog_6class_lstm.npz \\
+    python loadtest/loadtest.py inference --scenario infer:8,chat:1 --stub-llm --concurrency 16 --requests 2000
+  python loadtest/loadtest.py backend --scenario ingest,recommend,trend --rate 200 --duration 30
+  python loadtest/loadtest.py inference --url http://localhost:8001 --scenario infer --server-pid 1234
+"""
+import argparse
+import asyncio
+import collections
+import json
+import os
+import platform
+import random
+import subprocess
+import sys
+import tempfile
+import time
+import tracemalloc
+from contextlib import asynccontextmanager
+from datetime import datetime, timedelta, timezone
+from typing import Callable, Dict, List, Optional, Tuple
+
+import httpx
+import numpy as np
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+MESSAGES = [
+    "What should I do right now?",
+    "My legs feel stiff this morning, is walking a good idea?",
+    "Why do you recommend this activity?",
+    "I felt a freeze while turning earlier. Should I rest?",
+    "Can I do balance practice before my medication kicks in?",
+]
+
+WINDOW_LEN, CHANNELS = 100, 3
+ACTIVITIES = ["0", "1", "2", "3", "4", "6"]
+
+
+# ── Workload ──────────────────────────────────────────────────────────────────
+
+def load_windows(path: Optional[str], n: int, seed: int) -> np.ndarray:
+    """(N, 100, 3) float32 windows from a file, or N synthetic ones."""
+    if path is None:
+        rng = np.random.default_rng(seed)
+        t = np.arange(WINDOW_LEN)[None, :, None] / 100.0                          # 100 Hz
+        freq = rng.uniform(0.8, 2.2, size=(n, 1, 1))                               # step rate
+        phase = rng.uniform(0, 2 * np.pi, size=(n, 1, CHANNELS))
+        amp = rng.uniform(0.1, 1.5, size=(n, 1, CHANNELS))
+        base = np.array([-1.0, 0.0, 0.0])[None, None, :]                           # gravity on AccV
+        noise = rng.normal(0, 0.05, size=(n, WINDOW_LEN, CHANNELS))
+        return (base + amp * np.sin(2 * np.pi * freq * t + phase) + noise).astype(np.float32)
+
+    with open(path) as f:
+        text = f.read()
+    try:
+        data = np.asarray(json.loads(text), dtype=np.float32)
+    except json.JSONDecodeError:
+        rows = [json.loads(line) for line in text.splitlines() if line.strip()]
+        data = np.asarray([r["x"] if isinstance(r, dict) else r for r in rows], dtype=np.float32)
+    if data.ndim == 2:
+        data = data[None]
+    if data.shape[1:] != (WINDOW_LEN, CHANNELS):
+        raise SystemExit(f"{path}: expected windows of shape ({WINDOW_LEN}, {CHANNELS}), got {data.shape[1:]}")
+    return data
+
+
+def load_messages(path: Optional[str]) -> List[str]:
+    if path is None:
+        return MESSAGES
+    with open(path) as f:
+        return [line.strip() for line in f if line.strip()]
+
+
+Request = Tuple[str, str, Optional[object]]     # method, path, json body
+
+
+class Workload:
+    def __init__(self, windows: np.ndarray, messages: List[str], batch: int, sessions: int, users: int, seed: int):
+        self.windows = [w.tolist() for w in windows]
+        self.messages = messages
+        self.batch = batch
+        self.sessions = sessions
+        self.users = users
+        self.rng = random.Random(seed)
+        self.start_ts = datetime.now(timezone.utc)
+
+    def _session(self) -> str:
+        return f"loadtest-{self.rng.randrange(self.sessions)}"
+
+    def _user(self) -> int:
+        return self.rng.randrange(1, self.users + 1)
+
+    # inference
+
+    def infer(self) -> Request:
+        return "POST", f"/infer?session_id={self._session()}", {"x": self.rng.choice(self.windows)}
+
+    def infer_batch(self) -> Request:
+        return "POST", "/infer/batch", {"x": [self.rng.choice(self.windows) for _ in range(self.batch)]}
+
+    def chat(self) -> Request:
+        return "POST", "/chat", {"message": self.rng.choice(self.messages), "session_id": self._session()}
+
+    def chat_stream(self) -> Request:
+        return "POST", "/chat/stream", {"message": self.rng.choice(self.messages), "session_id": self._session()}
+
+    # backend
+
+    def ingest(self) -> Request:
+        rows = []
+        for _ in range(self.batch):
+            ts = self.start_ts + timedelta(seconds=self.rng.uniform(0, 86400))
+            rows.append({
+                "user_id": self._user(), "ts": ts.isoformat(),
+                "hr_bpm": self.rng.gauss(72, 8), "hrv_rmssd_ms": self.rng.gauss(40, 10),
+                "steps_last_5m": self.rng.randrange(0, 600), "sleep_last_night_min": self.rng.randrange(240, 540),
+                "tremor_index": self.rng.random(),
+            })
+        return "POST", "/v1/metrics/bulk", rows
+
+    def recommend(self) -> Request:
+        return "POST", "/v1/recommend", {"user_id": self._user(), "candidates": self.rng.sample(ACTIVITIES, 3)}
+
+    def activity_log(self) -> Request:
+        return "POST", "/v1/activity-log", {
+            "user_id": self._user(), "activity_id": self.rng.choice(ACTIVITIES), "duration_sec": 300,
+            "helped": self.rng.random() < 0.4, "tremor_after_1to5": 3, "mood_after_1to5": 3,
+        }
+
+    def trend(self) -> Request:
+        return "GET", f"/v1/users/{self._user()}/trends/hr_bpm?resolution=hour", None
+
+    def backend_chat(self) -> Request:
+        return "POST", "/v1/chat", {"message": self.rng.choice(self.messages)}
+
+    def backend_chat_stream(self) -> Request:
+        return "POST", "/v1/chat/stream", {"message": self.rng.choice(self.messages)}
+
+
+SCENARIOS: Dict[str, Dict[str, Callable[[Workload], Request]]] = {
+    "inference": {
+        "infer": Workload.infer,
+        "infer_batch": Workload.infer_batch,
+        "chat": Workload.chat,
+        "chat_stream": Workload.chat_stream,
+    },
+    "backend": {
+        "ingest": Workload.ingest,
+        "recommend": Workload.recommend,
+        "activity_log": Workload.activity_log,
+        "trend": Workload.trend,
+        "chat": Workload.backend_chat,
+        "chat_stream": Workload.backend_chat_stream,
+    },
+}
+
+
+def parse_mix(target: str, spec: str) -> List[Tuple[str, float]]:
+    mix = []
+    for part in spec.split(","):
+        name, _, weight = part.strip().partition(":")
+        if name not in SCENARIOS[target]:
+            raise SystemExit(f"Unknown {target} scenario {name!r}; choose from {', '.join(SCENARIOS[target])}")
+        mix.append((name, float(weight or 1)))
+    return mix
+
+
+# ── Stub LLM ──────────────────────────────────────────────────────────────────
+
+class StubLLM:
+    """Stands in for PrefixCachedLLM: ~4 bytes per token, and stream() sleeps
+    token_ms per token (releasing the GIL, like llama-cpp does while decoding)."""
+
+    def __init__(self, tokens: int, token_ms: float):
+        self.tokens = tokens
+        self.token_s = token_ms / 1000.0
+        self.llm = self             # LLMExecutor.text_tokens() calls .llm.tokenize()
+
+    def tokenize(self, data: bytes, add_bos: bool = False, special: bool = False) -> List[int]:
+        return list(range(len(data) // 4 + int(add_bos)))
+
+    def count_tokens(self, suffix: str) -> int:
+        return len(self.tokenize(suffix.encode("utf-8"), add_bos=True))
+
+    def stream(self, suffix: str, max_tokens: int = 256, **kwargs):
+        for i in range(min(self.tokens, max_tokens)):
+            time.sleep(self.token_s)
+            yield f" tok{i}"
+
+
+# ── Targets ───────────────────────────────────────────────────────────────────
+
+def _import_path(service_dir: str):
+    sys.path.insert(0, service_dir)
+    os.chdir(service_dir)
+
+
+@asynccontextmanager
+async def inference_app(args):
+    """inference/app.py with its startup/shutdown hooks, ready to serve /infer."""
+    if args.stub_llm:
+        os.environ["LLM_PATH"] = os.path.join(tempfile.gettempdir(), "loadtest-no-such-model.gguf")
+    _import_path(os.path.join(ROOT, "inference"))
+    import app as service
+    from healin_chat.llm import LLMExecutor
+
+    async with service.app.router.lifespan_context(service.app):
+        deadline = time.monotonic() + args.ready_timeout
+        while not service.MODELS.ready():
+            if time.monotonic() > deadline:
+                raise SystemExit(f"Models not ready after {args.ready_timeout:.0f} s: {service.MODELS.status()}")
+            await asyncio.sleep(0.05)
+        if args.stub_llm:
+            service._LLM = LLMExecutor(lambda: StubLLM(args.stub_tokens, args.stub_token_ms),
+                                       workers=service.LLM_WORKERS, max_queue=service.LLM_MAX_QUEUE)
+        yield service.app
+
+
+@asynccontextmanager
+async def backend_app(args):
+    """The backend's routers on a fresh SQLite file (or DATABASE_URL if set).
+
+    app/main.py is not imported directly: it pulls in routes that are not part
+    of this load test and would shadow inference's `app` module name."""
+    tmpdir = None
+    if "DATABASE_URL" not in os.environ:
+        tmpdir = tempfile.mkdtemp(prefix="loadtest-")
+        os.environ["DATABASE_URL"] = f"sqlite:///{os.path.join(tmpdir, 'loadtest.db')}"
+    _import_path(os.path.join(ROOT, "backend"))
+    from fastapi import FastAPI
+    from db.init_db import init_db
+    from routes import chat, ingest, recommend, trends, users
+    LLMExecutor = chat.LLMExecutor
+
+    @asynccontextmanager
+    async def lifespan(_):
+        init_db()
+        recommend.start()
+        if args.stub_llm:
+            chat.llm = LLMExecutor(lambda: StubLLM(args.stub_tokens, args.stub_token_ms),
+                                   workers=chat.LLM_WORKERS, max_queue=chat.LLM_MAX_QUEUE)
+            chat.llm_state["state"] = "ready"
+        else:
+            chat.start()
+        yield
+        recommend.stop()
+        ingest.writer.stop()
+        chat.stop()
+
+    app = FastAPI(lifespan=lifespan)
+    for module in (users, chat, ingest, trends, recommend):
+        app.include_router(module.router, prefix="/v1")
+    try:
+        async with app.router.lifespan_context(app):
+            yield app
+    finally:
+        if tmpdir is not None:
+            import shutil
+            shutil.rmtree(tmpdir, ignore_errors=True)
+
+
+async def wait_ready(client: httpx.AsyncClient, target: str, timeout_s: float):
+    path = "/health/ready" if target == "inference" else "/health"
+    deadline = time.monotonic() + timeout_s
+    while time.monotonic() < deadline:
+        try:
+            if (await client.get(path)).status_code == 200:
+                return
+        except httpx.TransportError:
+            pass
+        await asyncio.sleep(0.2)
+    raise SystemExit(f"{client.base_url}{path} not ready after {timeout_s:.0f} s")
+
+
+# ── Memory ────────────────────────────────────────────────────────────────────
+
+def proc_memory(pid: int) -> dict:
+    """Current and peak resident set size in MB, from /proc (Linux)."""
+    out = {}
+    try:
+        with open(f"/proc/{pid}/status") as f:
+            for line in f:
+                key, _, value = line.partition(":")
+                if key in ("VmRSS", "VmHWM"):
+                    out["rss_mb" if key == "VmRSS" else "peak_rss_mb"] = round(int(value.split()[0]) / 1024, 1)
+    except OSError:
+        pass
+    return out
+
+
+# ── Runner ────────────────────────────────────────────────────────────────────
+
+class Recorder:
+    def __init__(self):
+        self.latency: Dict[str, List[float]] = collections.defaultdict(list)
+        self.first_byte: Dict[str, List[float]] = collections.defaultdict(list)
+        self.status: Dict[str, collections.Counter] = collections.defaultdict(collections.Counter)
+
+    def add(self, scenario: str, status, latency_s: float, first_byte_s: float):
+        self.status[scenario][status] += 1
+        if isinstance(status, int) and status < 400:
+            self.latency[scenario].append(latency_s)
+            self.first_byte[scenario].append(first_byte_s)
+
+
+async def send(client: httpx.AsyncClient, rec: Recorder, scenario: str, request: Request, started: float):
+    """One request; latency runs from `started` (the scheduled time in open-loop mode)."""
+    method, path, body = request
+    status = "error"
+    first = None
+    try:
+        async with client.stream(method, path, json=body) as resp:
+            status = resp.status_code
+            async for _ in resp.aiter_raw():
+                if first is None:
+                    first = time.perf_counter()
+    except httpx.TimeoutException:
+        status = "timeout"
+    except httpx.TransportError as e:
+        status = type(e).__name__
+    end = time.perf_counter()
+    rec.add(scenario, status, end - started, (first or end) - started)
+
+
+class Picker:
+    def __init__(self, target: str, mix: List[Tuple[str, float]], workload: Workload):
+        self.names = [name for name, _ in mix]
+        self.weights = [w for _, w in mix]
+        self.makers = [SCENARIOS[target][name] for name in self.names]
+        self.workload = workload
+
+    def next(self) -> Tuple[str, Request]:
+        i = self.workload.rng.choices(range(len(self.names)), weights=self.weights)[0]
+        return self.names[i], self.makers[i](self.workload)
+
+
+async def closed_loop(client, picker: Picker, rec: Recorder, concurrency: int, requests: int, duration_s: float):
+    remaining = [requests]
+    deadline = time.perf_counter() + duration_s if duration_s else None
+
+    async def client_loop():
+        while remaining[0] > 0 and (deadline is None or time.perf_counter() < deadline):
+            remaining[0] -= 1
+            scenario, request = picker.next()
+            await send(client, rec, scenario, request, time.perf_counter())
+
+    await asyncio.gather(*(client_loop() for _ in range(concurrency)))
+
+
+async def open_loop(client, picker: Picker, rec: Recorder, rate: float, duration_s: float, max_inflight: int, seed: int):
+    rng = random.Random(seed)
+    start = time.perf_counter()
+    scheduled = start
+    tasks = set()
+    while True:
+        scheduled += rng.expovariate(rate)
+        if scheduled - start > duration_s:
+            break
+        delay = scheduled - time.perf_counter()
+        if delay > 0:
+            await asyncio.sleep(delay)
+        scenario, request = picker.next()
+        if len(tasks) >= max_inflight:
+            rec.add(scenario, "dropped", 0.0, 0.0)
+            continue
+        task = asyncio.create_task(send(client, rec, scenario, request, scheduled))
+        tasks.add(task)
+        task.add_done_callback(tasks.discard)
+    if tasks:
+        await asyncio.gather(*tasks)
+
+
+def summarize(rec: Recorder, elapsed_s: float) -> dict:
+    def row(lat: List[float], fb: List[float], status: collections.Counter) -> dict:
+        total = sum(status.values())
+        ok = len(lat)
+        out = {"requests": total, "ok": ok, "errors": total - ok,
+               "throughput_rps": round(ok / elapsed_s, 2) if elapsed_s else 0.0,
+               "status": {str(k): v for k, v in sorted(status.items(), key=str)}}
+        if lat:
+            ms = np.asarray(lat) * 1e3
+            out.update({f"p{q}_ms": round(float(np.percentile(ms, q)), 3) for q in (50, 95, 99)})
+            out["max_ms"] = round(float(ms.max()), 3)
+            out["mean_ms"] = round(float(ms.mean()), 3)
+            out["p50_first_byte_ms"] = round(float(np.percentile(np.asarray(fb) * 1e3, 50)), 3)
+        return out
+
+    results = {name: row(rec.latency[name], rec.first_byte[name], rec.status[name]) for name in rec.status}
+    if len(results) > 1:
+        results["all"] = row([x for v in rec.latency.values() for x in v],
+                             [x for v in rec.first_byte.values() for x in v],
+                             sum(rec.status.values(), collections.Counter()))
+    return results
+
+
+def print_results(results: dict, memory: dict):
+    cols = ("requests", "errors", "throughput_rps", "p50_ms", "p95_ms", "p99_ms", "max_ms", "p50_first_byte_ms")
+    heads = ("requests", "errors", "req/s", "p50 ms", "p95 ms", "p99 ms", "max ms", "p50 ttfb")
+    print(f"\n{'scenario':<13}" + "".join(f"{h:>10}" for h in heads))
+    for name, r in results.items():
+        cells = [r.get(c) for c in cols]
+        print(f"{name:<13}" + "".join(f"{'-' if v is None else f'{v:,.1f}' if isinstance(v, float) else v:>10}"
+                                      for v in cells))
+    for name, r in results.items():
+        bad = {k: v for k, v in r["status"].items() if not (k.isdigit() and int(k) < 400)}
+        if bad:
+            print(f"  {name} errors: {bad}")
+    if memory:
+        print("\nmemory: " + ", ".join(f"{k} {v}" for k, v in memory.items()))
+
+
+# ── Baselines ─────────────────────────────────────────────────────────────────
+
+def compare(results: dict, baseline: dict, tolerance: float) -> List[str]:
+    """Regressions of this run against a saved baseline, as printable lines."""
+    regressions = []
+    print(f"\n{'scenario':<13}{'metric':>16}{'baseline':>12}{'now':>12}{'change':>9}")
+    for name, base in baseline["results"].items():
+        now = results.get(name)
+        if now is None:
+            continue
+        for metric, higher_is_worse in (("p50_ms", True), ("p95_ms", True), ("p99_ms", True),
+                                        ("throughput_rps", False)):
+            b, n = base.get(metric), now.get(metric)
+            if not b or n is None:
+                continue
+            change = (n - b) / b
+            worse = change > tolerance if higher_is_worse else change < -tolerance
+            flag = "  REGRESSION" if worse else ""
+            print(f"{name:<13}{metric:>16}{b:>12,.2f}{n:>12,.2f}{change:>+9.1%}{flag}")
+            if worse:
+                regressions.append(f"{name} {metric} {b:,.2f} → {n:,.2f} ({change:+.1%})")
+        base_rate = base["errors"] / max(base["requests"], 1)
+        now_rate = now["errors"] / max(now["requests"], 1)
+        if now_rate > base_rate + 0.01:
+            regressions.append(f"{name} error rate {base_rate:.1%} → {now_rate:.1%}")
+    return regressions
+
+
+def git_rev() -> Optional[str]:
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], cwd=ROOT, capture_output=True,
+                              text=True, timeout=5).stdout.strip() or None
+    except (OSError, subprocess.SubprocessError):
+        return None
+
+
+# ── Main ──────────────────────────────────────────────────────────────────────
+
+async def run(args) -> dict:
+    windows = load_windows(args.windows, args.synthetic_windows, args.seed)
+    workload = Workload(windows, load_messages(args.messages), args.batch, args.sessions, args.users, args.seed)
+    picker = Picker(args.target, parse_mix(args.target, args.scenario), workload)
+    timeout = httpx.Timeout(args.timeout)
+    limits = httpx.Limits(max_connections=max(args.concurrency, args.max_inflight))
+
+    if args.url:
+        server = None
+        client = httpx.AsyncClient(base_url=args.url, timeout=timeout, limits=limits)
+    else:
+        server = (inference_app if args.target == "inference" else backend_app)(args)
+        app = await server.__aenter__()
+        client = httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://loadtest",
+                                   timeout=timeout)
+    try:
+        if args.url:
+            await wait_ready(client, args.target, args.ready_timeout)
+
+        if args.warmup:
+            await closed_loop(client, picker, Recorder(), min(args.concurrency, args.warmup), args.warmup, 0)
+
+        pid = args.server_pid or (None if args.url else os.getpid())
+        mem_before = proc_memory(pid) if pid else {}
+        if args.tracemalloc:
+            tracemalloc.start()
+
+        rec = Recorder()
+        start = time.perf_counter()
+        if args.rate:
+            await open_loop(client, picker, rec, args.rate, args.duration or 10.0, args.max_inflight, args.seed)
+        else:
+            await closed_loop(client, picker, rec, args.concurrency, args.requests, args.duration)
+        elapsed = time.perf_counter() - start
+
+        memory = {}
+        if pid:
+            after = proc_memory(pid)
+            memory = {"rss_mb": after.get("rss_mb"), "peak_rss_mb": after.get("peak_rss_mb"),
+                      "rss_growth_mb": round(after.get("rss_mb", 0) - mem_before.get("rss_mb", 0), 1)}
+        if args.tracemalloc:
+            _, peak = tracemalloc.get_traced_memory()
+            tracemalloc.stop()
+            memory["tracemalloc_peak_mb"] = round(peak / 2**20, 1)
+    finally:
+        await client.aclose()
+        if server is not None:
+            await server.__aexit__(None, None, None)
+
+    results = summarize(rec, elapsed)
+    print_results(results, memory)
+    return {
+        "meta": {
+            "target": args.target, "url": args.url or "in-process", "scenario": args.scenario,
+            "mode": f"open {args.rate}/s" if args.rate else f"closed x{args.concurrency}",
+            "duration_s": round(elapsed, 2), "windows": args.windows or "synthetic", "batch": args.batch,
+            "stub_llm": args.stub_llm, "git": git_rev(), "python": platform.python_version(),
+            "env": {k: os.environ[k] for k in ("INFER_BACKEND", "MODEL_PATH", "INFER_BATCHING", "LLM_WORKERS")
+                    if k in os.environ},
+            "at": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+        },
+        "results": results,
+        "memory": memory,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Load-test the inference service or the backend.")
+    parser.add_argument("target", choices=sorted(SCENARIOS))
+    parser.add_argument("--url",        default=None, help="Base URL of a running service (default: in-process)")
+    parser.add_argument("--scenario",   default=None, help="Weighted mix, e.g. infer:8,chat:1 (default: infer / ingest)")
+    parser.add_argument("--concurrency", type=int, default=8, help="Closed loop: concurrent clients (default: 8)")
+    parser.add_argument("--requests",   type=int, default=1000, help="Closed loop: total requests (default: 1000)")
+    parser.add_argument("--rate",       type=float, default=0.0, help="Open loop: arrivals per second")
+    parser.add_argument("--duration",   type=float, default=0.0,
+                        help="Seconds to run (open loop default 10; closed loop: stop early)")
+    parser.add_argument("--max-inflight", type=int, default=1000, help="Open loop: drop arrivals above this (default: 1000)")
+    parser.add_argument("--warmup",     type=int, default=20, help="Unrecorded requests before measuring (default: 20)")
+    parser.add_argument("--timeout",    type=float, default=60.0, help="Per-request timeout in seconds (default: 60)")
+    parser.add_argument("--ready-timeout", type=float, default=300.0, help="Seconds to wait for models (default: 300)")
+    parser.add_argument("--windows",    default=None, help="dummydata.txt, a JSON array or JSONL of 100x3 windows")
+    parser.add_argument("--synthetic-windows", type=int, default=256, help="Generated windows without --windows")
+    parser.add_argument("--messages",   default=None, help="Chat messages, one per line")
+    parser.add_argument("--batch",      type=int, default=32, help="Windows per infer_batch / rows per ingest (default: 32)")
+    parser.add_argument("--sessions",   type=int, default=64, help="Distinct session ids (default: 64)")
+    parser.add_argument("--users",      type=int, default=1000, help="Distinct backend user ids (default: 1000)")
+    parser.add_argument("--seed",       type=int, default=0)
+    parser.add_argument("--stub-llm",   action="store_true", help="In-process: serve chat from a fake model")
+    parser.add_argument("--stub-tokens", type=int, default=48, help="Tokens per stub reply (default: 48)")
+    parser.add_argument("--stub-token-ms", type=float, default=5.0, help="Stub decode time per token (default: 5)")
+    parser.add_argument("--server-pid", type=int, default=None, help="With --url: report this process's RSS")
+    parser.add_argument("--tracemalloc", action="store_true", help="In-process: also report peak Python allocations")
+    parser.add_argument("--save-baseline", default=None, help="Write results to this JSON file")
+    parser.add_argument("--baseline",   default=None, help="Compare against this JSON file; exit 1 on regression")
+    parser.add_argument("--tolerance",  type=float, default=0.2, help="Allowed relative regression (default: 0.2)")
+    args = parser.parse_args()
+
+    args.scenario = args.scenario or ("infer" if args.target == "inference" else "ingest")
+    if args.url and (args.stub_llm or args.tracemalloc):
+        parser.error("--stub-llm and --tracemalloc only apply in-process")
+    for name in ("windows", "messages", "save_baseline", "baseline"):
+        if getattr(args, name):
+            setattr(args, name, os.path.abspath(getattr(args, name)))   # in-process runs chdir into the service
+
+    report = asyncio.run(run(args))
+
+    if args.save_baseline:
+        os.makedirs(os.path.dirname(args.save_baseline), exist_ok=True)
+        with open(args.save_baseline, "w") as f:
+            json.dump(report, f, indent=2)
+        print(f"\nbaseline written to {args.save_baseline}")
+
+    if args.baseline:
+        with open(args.baseline) as f:
+            baseline = json.load(f)
+        if baseline["meta"]["scenario"] != args.scenario or baseline["meta"]["mode"] != report["meta"]["mode"]:
+            print(f"\nwarning: baseline ran {baseline['meta']['scenario']} ({baseline['meta']['mode']}), "
+                  f"this run {args.scenario} ({report['meta']['mode']})")
+        regressions = compare(report["results"], baseline, args.tolerance)
+        if regressions:
+            print(f"\n{len(regressions)} regression(s) beyond {args.tolerance:.0%}:")
+            for line in regressions:
+                print(f"  {line}")
+            sys.exit(1)
+        print(f"\nno regressions beyond {args.tolerance:.0%}")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,57 +1,94 @@
 import argparse
-import ast
 import numpy as np
 import pandas as pd
+import os
 from pathlib import Path
 
+from build_cache import dataset_fingerprint, file_sha256, fingerprint
+from labeling import SYNTHETIC_RULE
+from window_store import clear_stamp, create_windows, is_csv, read_dataset, read_stamp, save_meta, write_dataset, write_stamp
 
+CHUNK_SIZE = 4096   # synthetic windows generated per array op (bounds memory at large --target)
+
+
+# ── Time-series augmentations ─────────────────────────────────────────────────
+# All operate on a whole chunk x of shape (n, T, 3) — axes AccV, AccML, AccAP —
+# and draw their randomness in one call per op.
+
+def jitter(x, rng, sigma):
+    """Additive Gaussian noise; sigma broadcasts against (n, 1, 3)."""
+    return x + rng.normal(0.0, 1.0, size=x.shape).astype(np.float32) * sigma
+
+
+def scale(x, rng, sigma, axes=(0, 1, 2)):
+    """Per-window, per-axis amplitude scaling of the deviation from the window mean."""
+    mean   = x.mean(axis=1, keepdims=True)
+    factor = np.ones((len(x), 1, 3), dtype=np.float32)
+    factor[:, :, list(axes)] = rng.normal(1.0, sigma, size=(len(x), 1, len(axes)))
+    return mean + (x - mean) * factor
+
+
+def time_warp(x, rng, sigma, knots=4):
+    """Smoothly speeds up / slows down each window: a random speed curve through
+    `knots` interior points is integrated into new sample positions, and every
+    axis is linearly resampled there."""
+    n, T, _ = x.shape
+    speeds  = rng.normal(1.0, sigma, size=(n, knots + 2)).clip(0.2, None)
+
+    # Piecewise-linear interpolation of the knot speeds onto T steps (same weights for every window)
+    grid    = np.linspace(0, knots + 1, T)
+    lo      = np.minimum(grid.astype(int), knots)
+    frac    = grid - lo
+    speed_t = speeds[:, lo] * (1 - frac) + speeds[:, lo + 1] * frac              # (n, T)
+
+    pos = np.cumsum(speed_t, axis=1)
+    pos = (pos - pos[:, :1]) / (pos[:, -1:] - pos[:, :1]) * (T - 1)              # (n, T) in [0, T-1]
+
+    i0 = np.minimum(pos.astype(int), T - 2)
+    w  = (pos - i0)[:, :, None].astype(np.float32)
+    x0 = np.take_along_axis(x, i0[:, :, None], axis=1)
+    x1 = np.take_along_axis(x, i0[:, :, None] + 1, axis=1)
+    return x0 * (1 - w) + x1 * w
+
+
+def stationary(x, rng, rel_sigma):
+    """Replaces the window with its mean (gravity orientation) plus small noise,
+    scaled to the window's gravity magnitude so g and m/s² recordings both work."""
+    mean = x.mean(axis=1, keepdims=True)
+    g    = np.linalg.norm(mean, axis=2, keepdims=True)
+    return jitter(np.broadcast_to(mean, x.shape), rng, rel_sigma * g)
+
+
+# ── Class generators: (n, T, 3) real windows → (n, T, 3) synthetic windows ────
 
 def make_rest(real, rng):
     """Class 0 — Rest: near-stationary, gravity dominates vertical."""
-    aug = real.copy()
-    aug[0] = rng.normal(-0.98, 0.02)
-    aug[1] = abs(rng.normal(0.008, 0.003))
-    aug[2] = rng.normal(0.0,  0.02)
-    aug[3] = abs(rng.normal(0.008, 0.003))
-    aug[4] = rng.normal(0.0,  0.02)
-    aug[5] = abs(rng.normal(0.008, 0.003))
-    return aug
+    return stationary(real, rng, 0.02)
 
 
 def make_seated(real, rng):
     """Class 1 — Seated Exercise: vertical suppressed, slight ML/AP arm movement."""
-    aug = real.copy()
-    aug[0] = rng.normal(-0.95, 0.03)
-    aug[1] = abs(real[1]) * 0.3
-    aug[2] += rng.normal(0, 0.08)
-    aug[3] += abs(rng.normal(0, 0.06))
-    aug[4] += rng.normal(0, 0.08)
-    aug[5] += abs(rng.normal(0, 0.06))
-    return aug
+    mean = real.mean(axis=1, keepdims=True)
+    aug  = real - mean
+    aug[:, :, 0] *= 0.3
+    aug  = mean + aug
+    aug  = scale(aug, rng, 0.2, axes=(1, 2))
+    aug  = time_warp(aug, rng, 0.2)
+    g    = np.linalg.norm(mean, axis=2, keepdims=True)
+    return jitter(aug, rng, 0.01 * g)
 
 
 def make_balance(real, rng):
     """Class 3 — Balance Practice: moderate ML/AP sway, stable vertical."""
-    aug = real.copy()
-    aug[0] += rng.normal(0, 0.03)
-    aug[1]  = abs(real[1]) * rng.uniform(0.8, 1.2)
-    aug[2] += rng.normal(0, 0.12)
-    aug[3] += abs(rng.normal(0, 0.08))
-    aug[4] += rng.normal(0, 0.10)
-    aug[5] += abs(rng.normal(0, 0.08))
-    return aug
+    aug = scale(real, rng, 0.15, axes=(1, 2))
+    aug = time_warp(aug, rng, 0.15)
+    g   = np.linalg.norm(real.mean(axis=1, keepdims=True), axis=2, keepdims=True)
+    return jitter(aug, rng, np.array([0.005, 0.02, 0.02], dtype=np.float32) * g)
 
 
 def make_medication_check(real, rng):
-    """Class 6 — Medication Check: fully stationary, all axes near-zero."""
-    aug = real.copy()
-    aug[0] = rng.normal(-0.99, 0.01)
-    aug[1] = abs(rng.normal(0.005, 0.002))
-    aug[2] = rng.normal(0.0,  0.01)
-    aug[3] = abs(rng.normal(0.005, 0.002))
-    aug[4] = rng.normal(0.0,  0.01)
-    aug[5] = abs(rng.normal(0.005, 0.002))
-    return aug
+    """Class 6 — Medication Check: fully stationary, minimal noise."""
+    return stationary(real, rng, 0.01)
 
 
 CLASS_GENERATORS = {
@@ -62,45 +99,90 @@ CLASS_GENERATORS = {
 }
 
 
-def augment(df, target, rng):
-    real_X = np.stack(
-        df["imu_features"]
-        .apply(lambda x: np.array(ast.literal_eval(x), dtype=np.float32))
-        .values
-    )
+def plan(meta, target):
+    """{class: number of synthetic rows needed to reach `target`}."""
+    counts = meta["target_activity"].value_counts()
+    return {cls: max(0, target - int(counts.get(cls, 0))) for cls in CLASS_GENERATORS}
 
-    synthetic_rows = []
+
+def iter_synthetic(real_X, meta, target, rng, chunk_size=CHUNK_SIZE):
+    """Yields (X_chunk, meta_chunk) of synthetic rows, at most chunk_size at a time.
+    Deterministic for a given rng seed and chunk_size."""
+    fog   = meta["fog_severity"].to_numpy(dtype=float)
+    hour  = meta["time_of_day"].to_numpy(dtype=float)
+    mag   = meta["movement_mag"].to_numpy(dtype=float)
+    needs = plan(meta, target)
 
     for cls, gen_fn in CLASS_GENERATORS.items():
-        existing = (df["target_activity"] == cls).sum()
-        n_needed = max(0, target - existing)
+        existing = int((meta["target_activity"] == cls).sum())
+        n_needed = needs[cls]
 
         if n_needed == 0:
             print(f"  class {cls}: {existing} real rows already — skipping")
             continue
 
-        for _ in range(n_needed):
-            idx      = rng.integers(0, len(real_X))
-            features = real_X[idx]
-            row      = df.iloc[idx]
-            aug_feat = gen_fn(features.copy(), rng)
-
-            synthetic_rows.append({
-                "imu_features"   : str(aug_feat.tolist()),
-                "fog_severity"   : float(np.clip(row.fog_severity + rng.normal(0, 0.02), 0, 1)),
-                "time_of_day"    : float(row.time_of_day),
-                "movement_mag"   : float(np.clip(row.movement_mag + rng.normal(0, 0.01), 0, None)),
+        for start in range(0, n_needed, chunk_size):
+            n   = min(chunk_size, n_needed - start)
+            idx = np.sort(rng.integers(0, len(real_X), size=n))   # sorted → sequential reads from a memmap
+            aug = gen_fn(np.asarray(real_X[idx], dtype=np.float32), rng).astype(np.float32, copy=False)
+
+            yield aug, pd.DataFrame({
+                "fog_severity"   : np.clip(fog[idx] + rng.normal(0, 0.02, size=n), 0, 1),
+                "time_of_day"    : hour[idx],
+                "movement_mag"   : np.clip(mag[idx] + rng.normal(0, 0.01, size=n), 0, None),
                 "source_file"    : "synthetic",
                 "window_start"   : -1,
                 "target_activity": cls,
-            })
+                "label_rule"     : SYNTHETIC_RULE,
+            }, columns=meta.columns)
 
         print(f"  class {cls}: {existing} real + {n_needed} synthetic = {existing + n_needed}")
 
-    synth_df = pd.DataFrame(synthetic_rows, columns=df.columns)
-    result   = pd.concat([df, synth_df], ignore_index=True)
-    result   = result.sample(frac=1, random_state=42).reset_index(drop=True)
-    return result
+
+def _seeds(seed):
+    gen_ss, shuffle_ss = np.random.SeedSequence(seed).spawn(2)
+    return np.random.default_rng(gen_ss), np.random.default_rng(shuffle_ss)
+
+
+def augment(real_X, meta, target, seed, chunk_size=CHUNK_SIZE):
+    """In-memory augmentation: returns (X, meta) with real and synthetic rows shuffled together."""
+    rng, shuffle_rng = _seeds(seed)
+    chunks = list(iter_synthetic(real_X, meta, target, rng, chunk_size))
+
+    X_out    = np.concatenate([np.asarray(real_X, dtype=np.float32)] + [x for x, _ in chunks])
+    meta_out = pd.concat([meta] + [m for _, m in chunks], ignore_index=True)
+
+    order = shuffle_rng.permutation(len(meta_out))
+    return X_out[order], meta_out.iloc[order].reset_index(drop=True)
+
+
+def augment_to_store(real_X, meta, target, seed, out_dir, chunk_size=CHUNK_SIZE):
+    """Streaming augmentation into a window store. The output .npy is
+    pre-allocated and every chunk is written straight to its shuffled position,
+    so peak memory is one chunk of windows plus the scalar metadata.
+    Produces the same rows, in the same order, as augment()."""
+    rng, shuffle_rng = _seeds(seed)
+    total = len(meta) + sum(plan(meta, target).values())
+    order = shuffle_rng.permutation(total)            # output row p ← source row order[p]
+    dest  = np.empty(total, dtype=np.int64)
+    dest[order] = np.arange(total)                    # source row i → output row dest[i]
+
+    out = create_windows(out_dir, total, seq_len=real_X.shape[1])
+    for start in range(0, len(real_X), chunk_size):
+        stop = min(start + chunk_size, len(real_X))
+        out[dest[start:stop]] = real_X[start:stop]
+
+    metas, written = [meta], len(meta)
+    for x, m in iter_synthetic(real_X, meta, target, rng, chunk_size):
+        out[dest[written:written + len(x)]] = x
+        metas.append(m)
+        written += len(x)
+    out.flush()
+    del out
+
+    meta_out = pd.concat(metas, ignore_index=True).iloc[order].reset_index(drop=True)
+    save_meta(out_dir, meta_out)
+    return meta_out
 
 
 def class_report(label, y):
@@ -114,29 +196,44 @@ def class_report(label, y):
 
 def main():
     parser = argparse.ArgumentParser(description="Augment underrepresented FOG activity classes.")
-    parser.add_argument("--input",  default="train_windows.csv",           help="Input CSV (default: train_windows.csv)")
-    parser.add_argument("--output", default="train_windows_augmented.csv", help="Output CSV (default: train_windows_augmented.csv)")
+    parser.add_argument("--input",  default="train_windows",           help="Input store dir or .csv (default: train_windows)")
+    parser.add_argument("--output", default="train_windows_augmented", help="Output store dir or .csv (default: train_windows_augmented)")
     parser.add_argument("--target", type=int, default=1500,                help="Target rows per augmented class (default: 1500)")
     parser.add_argument("--seed",   type=int, default=42,                  help="Random seed (default: 42)")
+    parser.add_argument("--chunk-size", type=int, default=CHUNK_SIZE,      help=f"Synthetic windows per batch (default: {CHUNK_SIZE})")
+    parser.add_argument("--force",  action="store_true",                   help="Rebuild the output even if it is up to date")
     args = parser.parse_args()
 
-    rng = np.random.default_rng(args.seed)
+    # Same input dataset, settings and script → same output; skip the rebuild
+    inputs = {"input": dataset_fingerprint(args.input), "target": args.target, "seed": args.seed,
+              "chunk_size": args.chunk_size, "csv": is_csv(args.output), "script": file_sha256(os.path.abspath(__file__))}
+    stamp  = {"fingerprint": fingerprint(inputs), "input": args.input, "target": args.target, "seed": args.seed,
+              "labels": (read_stamp(args.input) or {}).get("labels")}
+    previous = read_stamp(args.output)
+    if not args.force and previous is not None and previous["fingerprint"] == stamp["fingerprint"]:
+        print(f"{args.output} is up to date with {args.input}, nothing to do")
+        return
 
     print(f"Loading {args.input} ...")
-    df = pd.read_csv(args.input)
-    print(f"Loaded {len(df):,} rows.")
+    X, meta = read_dataset(args.input)
+    print(f"Loaded {len(meta):,} rows.")
 
-    class_report("BEFORE augmentation", df["target_activity"])
+    class_report("BEFORE augmentation", meta["target_activity"])
 
     print(f"\nAugmenting to {args.target} rows per class ...")
-    df_out = augment(df, args.target, rng)
-
-    class_report("AFTER augmentation", df_out["target_activity"])
-
     Path(args.output).parent.mkdir(parents=True, exist_ok=True)
-    df_out.to_csv(args.output, index=False)
+    clear_stamp(args.output)
+    if is_csv(args.output):
+        # Legacy CSV output has to be built in memory
+        X_out, meta_out = augment(X, meta, args.target, args.seed, args.chunk_size)
+        write_dataset(args.output, X_out, meta_out)
+    else:
+        meta_out = augment_to_store(X, meta, args.target, args.seed, args.output, args.chunk_size)
+    write_stamp(args.output, stamp)
+
+    class_report("AFTER augmentation", meta_out["target_activity"])
     print(f"\nSaved → {args.output}")
 
 
 if __name__ == "__main__":
-    main()
\ No newline at end of file
+    main()
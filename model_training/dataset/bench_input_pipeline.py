@@ -0,0 +1,67 @@
+"""
+Examples/sec of the streaming tf.data pipeline (model.make_streaming_dataset).
+
+Iterates the training split of a sharded store for a few epochs without a
+model attached, so the numbers are the input pipeline's ceiling. With a cache
+directory, epoch 1 reads the shards and later epochs replay the cache. The
+in-memory from_tensor_slices path is timed for comparison when the data fits.
+
+Usage (from model_training/dataset):
+  python bench_input_pipeline.py --data train_windows_sharded [--epochs 3] [--batch-size 256] [--no-cache]
+"""
+import argparse
+import shutil
+import tempfile
+import time
+
+import numpy as np
+from sklearn.preprocessing import LabelEncoder
+
+from model import make_dataset, make_streaming_dataset, stratified_split
+from window_store import load_index, shard_path
+
+
+def examples_per_sec(ds, epochs):
+    rates = []
+    for _ in range(epochs):
+        n, start = 0, time.perf_counter()
+        for _, y in ds:
+            n += int(y.shape[0])
+        rates.append(n / (time.perf_counter() - start))
+    return rates
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the streaming input pipeline.")
+    parser.add_argument("--data",       required=True, help="Sharded dataset dir (window_store.py shard)")
+    parser.add_argument("--epochs",     type=int, default=3)
+    parser.add_argument("--batch-size", type=int, default=256)
+    parser.add_argument("--no-cache",   action="store_true", help="Disable the tf.data file cache")
+    parser.add_argument("--skip-in-memory", action="store_true", help="Don't time the from_tensor_slices path")
+    args = parser.parse_args()
+
+    index     = load_index(args.data)
+    y_encoded = LabelEncoder().fit_transform(index["target_activity"].to_numpy())
+    is_train  = ~stratified_split(y_encoded, 0.2)
+
+    cache_dir = None if args.no_cache else tempfile.mkdtemp(prefix="fog_tfdata_bench_")
+    try:
+        ds = make_streaming_dataset(
+            args.data, index, y_encoded, is_train, args.batch_size, shuffle=True,
+            cache_path=None if cache_dir is None else f"{cache_dir}/train",
+        )
+        for epoch, rate in enumerate(examples_per_sec(ds, args.epochs), 1):
+            print(f"streaming  epoch {epoch}: {rate:>10,.0f} examples/s")
+    finally:
+        if cache_dir:
+            shutil.rmtree(cache_dir)
+
+    if not args.skip_in_memory:
+        X = np.concatenate([np.load(shard_path(args.data, s)) for s in sorted(index["shard"].unique())])
+        ds = make_dataset(X[is_train], y_encoded[is_train], args.batch_size, shuffle=True)
+        for epoch, rate in enumerate(examples_per_sec(ds, args.epochs), 1):
+            print(f"in-memory  epoch {epoch}: {rate:>10,.0f} examples/s")
+
+
+if __name__ == "__main__":
+    main()
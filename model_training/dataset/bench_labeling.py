@@ -0,0 +1,68 @@
+"""
+Weak-supervision labeling: row-wise DataFrame.apply(fog_to_activity) vs the
+vectorized rule engine in labeling.py.
+
+Synthesizes --rows windows of metadata with values spread around every rule
+threshold, times both paths and checks they assign identical labels.
+
+Usage (from model_training/dataset):
+  python bench_labeling.py [--rows 2000000] [--apply-rows 2000000]
+"""
+import argparse
+import time
+
+import numpy as np
+import pandas as pd
+
+from clean_dataset import fog_to_activity
+from labeling import DEFAULT_RULESET, load_ruleset
+
+
+def synthetic(rows: int, seed: int = 0) -> pd.DataFrame:
+    rng = np.random.default_rng(seed)
+    # Rounded so rows land exactly on the thresholds (0.1, 0.3, hour 21, ...) too
+    return pd.DataFrame({
+        "fog_severity": np.where(rng.random(rows) < 0.7, 0.0, np.round(rng.random(rows) * 0.6, 2)),
+        "time_of_day" : np.round(rng.random(rows) * 24, 1),
+        "movement_mag": np.round(rng.random(rows) * 1.5, 2),
+    })
+
+
+def timed(label: str, fn, rows: int):
+    start = time.perf_counter()
+    out = fn()
+    elapsed = time.perf_counter() - start
+    print(f"  {label:<28} {elapsed:8.3f} s   {rows / elapsed:>14,.0f} rows/s")
+    return out, elapsed
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark row-wise vs vectorized labeling.")
+    parser.add_argument("--rows",       type=int, default=2_000_000, help="Rows to label (default: 2,000,000)")
+    parser.add_argument("--apply-rows", type=int, default=None,      help="Rows for the apply path (default: --rows)")
+    parser.add_argument("--labels",     default=DEFAULT_RULESET,     help=f"Rule set (default: {DEFAULT_RULESET})")
+    args = parser.parse_args()
+
+    df      = synthetic(args.rows)
+    ruleset = load_ruleset(args.labels)
+    n_apply = min(args.apply_rows or args.rows, args.rows)
+    print(f"{args.rows:,} rows, rule set {ruleset.version}")
+
+    (labels, rules), vec_s = timed("rule engine (np.select)", lambda: ruleset.label(df), args.rows)
+    sub = df.iloc[:n_apply]
+    ref, apply_s = timed(f"DataFrame.apply ({n_apply:,})", lambda: sub.apply(
+        lambda row: fog_to_activity(row["fog_severity"], row["movement_mag"], row["time_of_day"]), axis=1,
+    ).to_numpy(), n_apply)
+
+    mismatches = int((ref != labels[:n_apply]).sum())
+    print(f"\n  speedup: {(apply_s / n_apply) / (vec_s / args.rows):,.0f}x per row   |   "
+          f"mismatches vs fog_to_activity: {mismatches}")
+    print("\n  rules fired:")
+    for rule, cnt in pd.Series(rules).value_counts(sort=False).items():
+        print(f"    {rule:<12} {cnt:>10,}")
+    if mismatches:
+        raise SystemExit(1)
+
+
+if __name__ == "__main__":
+    main()
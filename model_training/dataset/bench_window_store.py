@@ -0,0 +1,77 @@
+"""
+Load-time and size comparison: legacy CSV vs the columnar window store.
+
+Uses --input if given (CSV or store), otherwise synthesizes --rows random
+windows. Writes both layouts to a temp dir and times how each script used to
+read them (ast.literal_eval / json.loads per row) against the store.
+
+Usage (from model_training/dataset):
+  python bench_window_store.py [--input train_windows.csv] [--rows 20000]
+"""
+import argparse
+import ast
+import json
+import os
+import shutil
+import tempfile
+import time
+
+import numpy as np
+import pandas as pd
+
+from window_store import IMU_FILE, META_FILE, load_windows, read_dataset, write_dataset
+
+
+def synthetic(rows: int, seed: int = 0) -> tuple[np.ndarray, pd.DataFrame]:
+    rng  = np.random.default_rng(seed)
+    X    = rng.normal(0, 1, size=(rows, 100, 3))
+    meta = pd.DataFrame({
+        "fog_severity"   : rng.random(rows),
+        "time_of_day"    : rng.random(rows) * 24,
+        "movement_mag"   : rng.random(rows),
+        "source_file"    : [f"{i % 800:010x}.csv" for i in range(rows)],
+        "window_start"   : np.arange(rows) * 500,
+        "target_activity": rng.choice([0, 1, 2, 3, 4, 6], size=rows),
+    })
+    return X, meta
+
+
+def timed(label: str, fn):
+    start = time.perf_counter()
+    out = fn()
+    print(f"  {label:<40} {time.perf_counter() - start:8.3f} s")
+    return out
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark CSV vs columnar window store loading.")
+    parser.add_argument("--input", default=None, help="Existing dataset (CSV or store dir)")
+    parser.add_argument("--rows",  type=int, default=20000, help="Synthetic rows if no --input (default: 20000)")
+    args = parser.parse_args()
+
+    X, meta = read_dataset(args.input, mmap=False) if args.input else synthetic(args.rows)
+    tmpdir    = tempfile.mkdtemp()
+    csv_path  = os.path.join(tmpdir, "windows.csv")
+    store_dir = os.path.join(tmpdir, "windows")
+
+    try:
+        write_dataset(csv_path, X, meta)
+        write_dataset(store_dir, X, meta)
+        csv_mb   = os.path.getsize(csv_path) / 1e6
+        store_mb = sum(os.path.getsize(os.path.join(store_dir, f)) for f in (IMU_FILE, META_FILE)) / 1e6
+        print(f"{len(meta):,} windows   CSV {csv_mb:.1f} MB   store {store_mb:.1f} MB\n")
+
+        print("Load:")
+        timed("CSV + ast.literal_eval (augment)", lambda: np.stack(
+            pd.read_csv(csv_path)["imu_features"].apply(lambda x: np.array(ast.literal_eval(x), dtype=np.float32)).values))
+        timed("CSV + json.loads (model.py)", lambda: np.stack(
+            pd.read_csv(csv_path)["imu_features"].apply(lambda x: np.array(json.loads(x), dtype=np.float32)).values))
+        timed("store, memory-mapped (open only)", lambda: load_windows(store_dir, mmap=True))
+        timed("store, memory-mapped + scan every window", lambda: float(load_windows(store_dir)[0].sum()))
+        timed("store, read into RAM", lambda: load_windows(store_dir, mmap=False))
+    finally:
+        shutil.rmtree(tmpdir)
+
+
+if __name__ == "__main__":
+    main()
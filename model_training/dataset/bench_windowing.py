@@ -0,0 +1,89 @@
+"""Old vs new wall time of load_fog_series on the bundled recordings.
+
+The old per-window loop (df.iloc + compute_imu_features/compute_fog_severity
+per stride, one file at a time) is kept here as the reference. Both outputs
+are compared with check_exact=True before timings are reported.
+
+Usage (from model_training/dataset):
+  python bench_windowing.py [--folder train/tdcsfog] [--limit 100] [--workers 8]
+"""
+import argparse
+import contextlib
+import io
+import os
+import shutil
+import tempfile
+import time
+
+import pandas as pd
+
+from clean_dataset import (
+    REQUIRED_COLS, SAMPLE_RATE_HZ, STRIDE, WINDOW_SIZE,
+    compute_fog_severity, compute_imu_features, estimate_time_of_day_hour, load_fog_series,
+)
+
+
+def load_fog_series_legacy(folder: str, window_size: int = WINDOW_SIZE, stride: int = STRIDE,
+                           sample_rate_hz: int = SAMPLE_RATE_HZ) -> pd.DataFrame:
+    """The original row-by-row implementation."""
+    all_windows = []
+    for file in [f for f in os.listdir(folder) if f.lower().endswith(".csv")]:
+        df = pd.read_csv(os.path.join(folder, file))
+        if REQUIRED_COLS - set(df.columns) or len(df) < window_size:
+            continue
+        for i in range(0, len(df) - window_size + 1, stride):
+            window = df.iloc[i : i + window_size]
+            imu_feats, movement_mag = compute_imu_features(window)
+            all_windows.append({
+                "imu_features" : imu_feats,
+                "fog_severity" : compute_fog_severity(window),
+                "time_of_day"  : estimate_time_of_day_hour(i, sample_rate_hz=sample_rate_hz),
+                "movement_mag" : movement_mag,
+                "source_file"  : file,
+                "window_start" : i,
+            })
+    return pd.DataFrame(all_windows)
+
+
+def timed(fn, *args, **kwargs):
+    start = time.perf_counter()
+    with contextlib.redirect_stdout(io.StringIO()):
+        out = fn(*args, **kwargs)
+    return out, time.perf_counter() - start
+
+
+def main():
+    here = os.path.dirname(os.path.abspath(__file__))
+    parser = argparse.ArgumentParser(description="Benchmark old vs vectorized windowing.")
+    parser.add_argument("--folder",  default=os.path.join(here, "train", "tdcsfog"), help="Folder of recording CSVs")
+    parser.add_argument("--limit",   type=int, default=None, help="Only use the first N files")
+    parser.add_argument("--workers", type=int, default=None, help="Process pool size (default: all cores)")
+    args = parser.parse_args()
+
+    folder = args.folder
+    tmpdir = None
+    if args.limit:
+        tmpdir = tempfile.mkdtemp()
+        for f in sorted(os.listdir(folder))[: args.limit]:
+            os.symlink(os.path.join(os.path.abspath(folder), f), os.path.join(tmpdir, f))
+        folder = tmpdir
+
+    try:
+        old, t_old = timed(load_fog_series_legacy, folder)
+        new_serial, t_serial = timed(load_fog_series, folder, workers=1)
+        new, t_new = timed(load_fog_series, folder, workers=args.workers)
+    finally:
+        if tmpdir:
+            shutil.rmtree(tmpdir)
+
+    for name, frame in (("serial", new_serial), ("parallel", new)):
+        pd.testing.assert_frame_equal(old, frame, check_exact=True)
+        print(f"[OK] {name} output identical to legacy ({len(frame):,} windows)")
+
+    print(f"\nlegacy loop           : {t_old:8.2f} s")
+    print(f"vectorized, 1 process : {t_serial:8.2f} s   ({t_old / t_serial:5.1f}x)")
+    print(f"vectorized, pool      : {t_new:8.2f} s   ({t_old / t_new:5.1f}x)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,117 @@
+"""
+Content-addressed cache of per-recording window shards, so rebuilding the
+dataset only re-windows recordings that changed.
+
+  .build_cache/
+    digests.json                 path → [size, mtime_ns, sha256]; a file is only
+                                 re-hashed when its size or mtime changes
+    shards/<key>.npz             window_recording() columns for one recording,
+                                 or the reason it was skipped
+
+A shard key is the SHA-256 of the recording's content digest plus the
+windowing parameters (window size, stride, sample rate, DOWNSAMPLE_STEP) and
+CACHE_VERSION — bump that when window_recording() changes behaviour. Renaming
+or moving a recording therefore costs a hash but no re-windowing.
+
+Builds also leave a stamp next to their output (window_store.write_stamp)
+describing exactly what went into it; clean_dataset.py and
+Augment_fog_classes.py skip the write when the stamp they would produce is
+already there.
+"""
+import hashlib
+import json
+import os
+
+import numpy as np
+
+from window_store import INDEX_FILE, IMU_FILE, META_FILE, is_csv, read_stamp
+
+CACHE_VERSION     = 1
+DEFAULT_CACHE_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), ".build_cache")
+DIGESTS_FILE      = "digests.json"
+SHARD_DIR         = "shards"
+
+
+def fingerprint(obj) -> str:
+    """SHA-256 of a JSON-serializable object, independent of dict key order."""
+    return hashlib.sha256(json.dumps(obj, sort_keys=True, default=str).encode()).hexdigest()
+
+
+def file_sha256(path: str) -> str:
+    h = hashlib.sha256()
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(1 << 20), b""):
+            h.update(block)
+    return h.hexdigest()
+
+
+def dataset_fingerprint(path: str) -> str:
+    """Identity of a dataset used as a build input: its stamp's fingerprint when it
+    has one, otherwise the size and mtime of its files."""
+    stamp = read_stamp(path)
+    if stamp is not None:
+        return stamp["fingerprint"]
+    files = [path] if is_csv(path) else [os.path.join(path, f) for f in (IMU_FILE, META_FILE, INDEX_FILE)]
+    return fingerprint([(f, os.stat(f).st_size, os.stat(f).st_mtime_ns) for f in files if os.path.exists(f)])
+
+
+class BuildCache:
+    def __init__(self, root: str = DEFAULT_CACHE_DIR):
+        self.root = root
+        os.makedirs(os.path.join(root, SHARD_DIR), exist_ok=True)
+        self._digests_path = os.path.join(root, DIGESTS_FILE)
+        try:
+            with open(self._digests_path) as f:
+                self._digests = json.load(f)
+        except (FileNotFoundError, json.JSONDecodeError):
+            self._digests = {}
+        self._dirty = False
+
+    def digest(self, path: str) -> str:
+        """Content SHA-256 of `path`, reusing the stored one while size and mtime are unchanged."""
+        path = os.path.abspath(path)
+        st = os.stat(path)
+        known = self._digests.get(path)
+        if known and known[0] == st.st_size and known[1] == st.st_mtime_ns:
+            return known[2]
+        digest = file_sha256(path)
+        self._digests[path] = [st.st_size, st.st_mtime_ns, digest]
+        self._dirty = True
+        return digest
+
+    def shard_key(self, digest: str, params: dict) -> str:
+        return fingerprint({"version": CACHE_VERSION, "source": digest, "params": params})
+
+    def _shard_path(self, key: str) -> str:
+        return os.path.join(self.root, SHARD_DIR, f"{key}.npz")
+
+    def load(self, key: str):
+        """(columns, None) for a cached recording, (None, reason) for a cached skip, or None on a miss."""
+        try:
+            with np.load(self._shard_path(key), allow_pickle=False) as data:
+                if "skipped" in data:
+                    return None, str(data["skipped"])
+                return {name: data[name] for name in data.files}, None
+        except (FileNotFoundError, ValueError, OSError):
+            return None
+
+    def save(self, key: str, cols: dict | None = None, skipped: str | None = None):
+        """Stores a recording's columns, or the reason it produced no windows. Written atomically."""
+        path = self._shard_path(key)
+        tmp  = path + ".tmp"
+        with open(tmp, "wb") as f:
+            if cols is None:
+                np.savez(f, skipped=np.array(skipped or ""))
+            else:
+                np.savez(f, **cols)
+        os.replace(tmp, path)
+
+    def flush(self):
+        """Persists new content digests."""
+        if not self._dirty:
+            return
+        tmp = self._digests_path + ".tmp"
+        with open(tmp, "w") as f:
+            json.dump(self._digests, f)
+        os.replace(tmp, self._digests_path)
+        self._dirty = False
@@ -1,12 +1,21 @@
+import argparse
 import os
+from concurrent.futures import ProcessPoolExecutor
+
 import pandas as pd
 import numpy as np
 
+from build_cache import DEFAULT_CACHE_DIR, BuildCache, file_sha256, fingerprint
+from labeling import DEFAULT_RULESET, RuleSet, apply_labels, load_ruleset
+from window_store import clear_stamp, is_csv, read_stamp, write_dataset, write_stamp
+
 WINDOW_SIZE      = 1000   # samples per window  (10s @ 100Hz)
 STRIDE           = 500    # 50% overlap
 SAMPLE_RATE_HZ   = 100
 DOWNSAMPLE_STEP  = 10     # keep every Nth sample → 1000 // 10 = 100 timesteps
 
+FRAME_COLUMNS = ["imu_features", "fog_severity", "time_of_day", "movement_mag", "source_file", "window_start"]
+
 def get_defog_train_folder() -> str:
     """Returns the absolute path to:
       .../model_training/tlvmc-parkinsons-freezing-gait-prediction/train/defog
@@ -70,7 +79,10 @@ def estimate_time_of_day_hour(sample_index: int, sample_rate_hz: int = SAMPLE_RA
 
 def fog_to_activity(fog_state: float, movement: float, hour: float) -> int:
     """
-    FOG patterns → optimal intervention class.
+    FOG patterns → optimal intervention class, for a single window.
+
+    Row-wise reference for rule set v1 in labeling.py, which is what datasets
+    are labeled with (bench_labeling.py checks the two agree).
 
     Returns activity class:
       0: Rest / relaxation
@@ -93,22 +105,101 @@ def fog_to_activity(fog_state: float, movement: float, hour: float) -> int:
     else:
         return 4
 
-def load_fog_series(
-    folder: str | None = None,
-    window_size: int   = WINDOW_SIZE,
-    stride: int        = STRIDE,
+EVENT_COLS    = ["StartHesitation", "Turn", "Walking"]
+ACC_COLS      = ["AccV", "AccML", "AccAP"]
+REQUIRED_COLS = set(ACC_COLS) | set(EVENT_COLS)
+
+
+def window_recording(
+    df: pd.DataFrame,
+    window_size: int    = WINDOW_SIZE,
+    stride: int         = STRIDE,
     sample_rate_hz: int = SAMPLE_RATE_HZ,
-) -> pd.DataFrame:
+) -> dict:
     """
-    Loads all CSVs in the defog train folder, windows them, and returns a DataFrame:
-      - imu_features  : nested list of shape (100, 3) — raw downsampled accelerometer sequence
-      - fog_severity  : float  — weak FOG proxy for the window
-      - time_of_day   : float  — hour-of-day proxy
-      - movement_mag  : float  — mean vector magnitude
-      - source_file   : str
-      - window_start  : int
-    target_activity is added in main() via weak-supervision rules.
+    Vectorized equivalent of running compute_imu_features / compute_fog_severity /
+    estimate_time_of_day_hour on every df.iloc[i : i + window_size] for i in
+    range(0, len(df) - window_size + 1, stride).
+
+    All windows are strided views (sliding_window_view) over the recording, so
+    nothing is copied per window. Window means are taken over those views rather
+    than via cumulative sums so the floating-point results are bit-identical to
+    the per-window path.
+
+    Returns columns as arrays:
+      - imu_features : float64 (n_windows, window_size // DOWNSAMPLE_STEP, 3)
+      - fog_severity, time_of_day, movement_mag : float64 (n_windows,)
+      - window_start : int64 (n_windows,)
     """
+    starts = np.arange(0, len(df) - window_size + 1, stride, dtype=np.int64)
+
+    acc_v  = df["AccV"].to_numpy(dtype=float)
+    acc_ml = df["AccML"].to_numpy(dtype=float)
+    acc_ap = df["AccAP"].to_numpy(dtype=float)
+    acc    = np.stack([acc_v, acc_ml, acc_ap], axis=1)                    # (n, 3)
+
+    # (100, 3) downsampled sequence per window: rows i, i+10, ..., i+990
+    offsets     = np.arange(0, window_size, DOWNSAMPLE_STEP)
+    imu_feats   = acc[starts[:, None] + offsets[None, :]]                 # (n_windows, 100, 3)
+
+    def window_means(values: np.ndarray) -> np.ndarray:
+        return np.lib.stride_tricks.sliding_window_view(values, window_size)[::stride].mean(axis=1)
+
+    mag          = np.sqrt(acc_v**2 + acc_ml**2 + acc_ap**2)              # (n,)
+    movement_mag = window_means(mag)
+
+    fog_severity = (
+        window_means(df["StartHesitation"].to_numpy(dtype=float))
+        + window_means(df["Turn"].to_numpy(dtype=float))
+        + window_means(df["Walking"].to_numpy(dtype=float))
+    )
+
+    seconds     = starts / float(sample_rate_hz)
+    time_of_day = (seconds / 3600.0) % 24.0
+
+    return {
+        "imu_features" : imu_feats,
+        "fog_severity" : fog_severity,
+        "time_of_day"  : time_of_day,
+        "movement_mag" : movement_mag,
+        "window_start" : starts,
+    }
+
+
+def _window_file(args: tuple) -> tuple[str, dict | None, str]:
+    """Process-pool worker: reads and windows one CSV. Returns (file, columns or None, log line)."""
+    file_path, window_size, stride, sample_rate_hz = args
+    file = os.path.basename(file_path)
+
+    try:
+        # Only parse the columns windowing needs (Time/Valid/Task are ignored anyway)
+        df = pd.read_csv(file_path, usecols=lambda c: c in REQUIRED_COLS)
+    except Exception as e:
+        return file, None, f"[WARN] Failed to read {file}: {e}"
+
+    missing = REQUIRED_COLS - set(df.columns)
+    if missing:
+        return file, None, f"[WARN] Skipping {file} (missing columns: {sorted(missing)})"
+
+    if len(df) < window_size:
+        return file, None, f"[WARN] Skipping {file} (too short: {len(df)} rows < {window_size})"
+
+    cols = window_recording(df, window_size, stride, sample_rate_hz)
+    return file, cols, f"  {file}: {len(cols['window_start'])} windows"
+
+
+def _map_files(jobs: list[tuple], workers: int | None):
+    """Yields _window_file results in job order, across a process pool when workers > 1."""
+    workers = workers or os.cpu_count() or 1
+    if workers == 1 or len(jobs) <= 1:
+        yield from map(_window_file, jobs)
+        return
+    with ProcessPoolExecutor(max_workers=min(workers, len(jobs))) as pool:
+        yield from pool.map(_window_file, jobs, chunksize=max(1, len(jobs) // (workers * 4)))
+
+
+def _list_recordings(folder: str | None) -> tuple[str, list[str]]:
+    """Absolute folder (default: defog train folder) and the recording CSVs in it."""
     if folder is None:
         folder = get_defog_train_folder()
 
@@ -117,80 +208,174 @@ def load_fog_series(
     if not os.path.exists(folder):
         raise FileNotFoundError(f"Folder not found:\n  {folder}")
 
-    required_cols = {"AccV", "AccML", "AccAP", "StartHesitation", "Turn", "Walking"}
-
-    all_windows: list[dict] = []
-
     files = [f for f in os.listdir(folder) if f.lower().endswith(".csv")]
     if not files:
         raise FileNotFoundError(f"No .csv files found in:\n  {folder}")
+    return folder, files
+
+
+def _window_params(window_size: int, stride: int, sample_rate_hz: int) -> dict:
+    """Everything besides the recording itself that window_recording's output depends on."""
+    return {"window_size": window_size, "stride": stride, "sample_rate_hz": sample_rate_hz,
+            "downsample_step": DOWNSAMPLE_STEP}
+
+
+def _load_columns(
+    folder: str | None,
+    window_size: int,
+    stride: int,
+    sample_rate_hz: int,
+    workers: int | None,
+    cache: BuildCache | None = None,
+) -> dict:
+    """Windows every CSV in `folder` and returns the FRAME_COLUMNS as concatenated arrays.
+    With a cache, recordings whose content and window parameters are unchanged are
+    read from their cached shard instead of being re-windowed."""
+    folder, files = _list_recordings(folder)
 
     n_timesteps = window_size // DOWNSAMPLE_STEP
     print(f"[INFO] Loading {len(files)} CSV files from:\n  {folder}")
     print(f"[INFO] Window: {window_size} samples  |  Stride: {stride}  |  "
           f"Downsample: every {DOWNSAMPLE_STEP}th → {n_timesteps} timesteps per window")
 
+    results: dict[str, dict | None] = {}
+    keys: dict[str, str] = {}
+    if cache is not None:
+        params = _window_params(window_size, stride, sample_rate_hz)
+        for f in files:
+            keys[f] = cache.shard_key(cache.digest(os.path.join(folder, f)), params)
+            hit = cache.load(keys[f])
+            if hit is not None:
+                results[f], skipped = hit
+                if skipped:
+                    print(skipped)
+        cache.flush()
+        print(f"[INFO] {len(results)} recordings from cache ({cache.root}), {len(files) - len(results)} to window")
+
+    jobs = [(os.path.join(folder, f), window_size, stride, sample_rate_hz) for f in files if f not in results]
+
+    for file, cols, message in _map_files(jobs, workers):
+        print(message)
+        results[file] = cols
+        if cache is not None:
+            cache.save(keys[file], cols, skipped=message)
+
+    parts: list[dict] = []
     for file in files:
-        file_path = os.path.join(folder, file)
-
-        try:
-            df = pd.read_csv(file_path)
-        except Exception as e:
-            print(f"[WARN] Failed to read {file}: {e}")
-            continue
-
-        missing = required_cols - set(df.columns)
-        if missing:
-            print(f"[WARN] Skipping {file} (missing columns: {sorted(missing)})")
-            continue
-
-        if len(df) < window_size:
-            print(f"[WARN] Skipping {file} (too short: {len(df)} rows < {window_size})")
-            continue
-
-        # Sliding window
-        n_windows = 0
-        for i in range(0, len(df) - window_size + 1, stride):
-            window = df.iloc[i : i + window_size]
-
-            imu_feats, movement_mag = compute_imu_features(window)
-            fog_severity            = compute_fog_severity(window)
-            hour                    = estimate_time_of_day_hour(i, sample_rate_hz=sample_rate_hz)
-
-            all_windows.append({
-                "imu_features" : imu_feats,
-                "fog_severity" : fog_severity,
-                "time_of_day"  : hour,
-                "movement_mag" : movement_mag,
-                "source_file"  : file,
-                "window_start" : i,
-            })
-            n_windows += 1
-
-        print(f"  {file}: {n_windows} windows")
-
-    out = pd.DataFrame(all_windows)
-    if out.empty:
+        cols = results[file]
+        if cols is not None:
+            cols["source_file"] = np.full(len(cols["window_start"]), file, dtype=object)
+            parts.append(cols)
+
+    if not parts:
         raise RuntimeError(
             "No windows were created. "
             "Check column names, file contents, and window_size/stride."
         )
 
-    print(f"\n[INFO] Total windows created: {len(out):,}")
+    # Concatenate column-wise once instead of building a DataFrame per file
+    merged = {col: np.concatenate([p[col] for p in parts]) for col in FRAME_COLUMNS}
+
+    print(f"\n[INFO] Total windows created: {len(merged['window_start']):,}")
     print(f"[INFO] imu_features shape per row: ({n_timesteps}, 3)")
-    return out
+    return merged
+
+
+def load_fog_series(
+    folder: str | None = None,
+    window_size: int   = WINDOW_SIZE,
+    stride: int        = STRIDE,
+    sample_rate_hz: int = SAMPLE_RATE_HZ,
+    workers: int | None = None,
+    cache: BuildCache | None = None,
+) -> pd.DataFrame:
+    """
+    Loads all CSVs in the defog train folder, windows them, and returns a DataFrame:
+      - imu_features  : nested list of shape (100, 3) — raw downsampled accelerometer sequence
+      - fog_severity  : float  — weak FOG proxy for the window
+      - time_of_day   : float  — hour-of-day proxy
+      - movement_mag  : float  — mean vector magnitude
+      - source_file   : str
+      - window_start  : int
+    target_activity is added in main() via weak-supervision rules.
+
+    Files are windowed in parallel across `workers` processes (default: all
+    cores; 1 = in-process). Row order is the same as reading them one by one.
+    With a BuildCache, only recordings that changed since the last build are
+    re-windowed.
+    """
+    merged = _load_columns(folder, window_size, stride, sample_rate_hz, workers, cache)
+    merged["imu_features"] = merged["imu_features"].tolist()
+    return pd.DataFrame(merged, columns=FRAME_COLUMNS)
+
+
+def load_fog_windows(
+    folder: str | None = None,
+    window_size: int   = WINDOW_SIZE,
+    stride: int        = STRIDE,
+    sample_rate_hz: int = SAMPLE_RATE_HZ,
+    workers: int | None = None,
+    dtype=np.float32,
+    cache: BuildCache | None = None,
+) -> tuple[np.ndarray, pd.DataFrame]:
+    """
+    Same windows as load_fog_series, but returns the sequences as one array
+    X (n_windows, 100, 3) plus a metadata frame without the imu_features
+    column — the layout window_store.py writes, with no nested lists built.
+    """
+    merged = _load_columns(folder, window_size, stride, sample_rate_hz, workers, cache)
+    X      = merged.pop("imu_features").astype(dtype, copy=False)
+    meta   = pd.DataFrame(merged, columns=FRAME_COLUMNS[1:])
+    return X, meta
+
+def _build_stamp(folder: str | None, cache: BuildCache, output: str, ruleset: RuleSet) -> dict:
+    """What a dataset built from `folder` into `output` depends on: every
+    recording's shard key, the output layout, the rule table and this script."""
+    folder, files = _list_recordings(folder)
+    params  = _window_params(WINDOW_SIZE, STRIDE, SAMPLE_RATE_HZ)
+    sources = {f: cache.shard_key(cache.digest(os.path.join(folder, f)), params) for f in files}
+    cache.flush()
+    inputs  = {"sources": sources, "csv": is_csv(output), "labels": ruleset.fingerprint(),
+               "script": file_sha256(os.path.abspath(__file__))}
+    return {"fingerprint": fingerprint(inputs), "folder": folder, "recordings": len(files),
+            "labels": ruleset.version, **params}
+
 
 def main():
-    train_df = load_fog_series()
-
-    # Weak-supervision labels
-    train_df["target_activity"] = train_df.apply(
-        lambda row: fog_to_activity(
-            row["fog_severity"], row["movement_mag"], row["time_of_day"]
-        ),
-        axis=1,
+    base_dir = os.path.dirname(os.path.abspath(__file__))
+    parser = argparse.ArgumentParser(description="Window FOG recordings into a training dataset.")
+    parser.add_argument("--folder",  default=None, help="Folder of recording CSVs (default: defog train folder)")
+    parser.add_argument("--output",  default=os.path.join(base_dir, "train_windows"),
+                        help="Output store directory, or a .csv path for the legacy layout (default: train_windows)")
+    parser.add_argument("--workers", type=int, default=None, help="Processes for windowing (default: all cores)")
+    parser.add_argument("--cache-dir", default=DEFAULT_CACHE_DIR, help="Per-recording window cache (default: .build_cache)")
+    parser.add_argument("--no-cache",  action="store_true", help="Re-window every recording and skip the up-to-date check")
+    parser.add_argument("--force",     action="store_true", help="Rebuild the output even if it is up to date")
+    parser.add_argument("--labels",    default=DEFAULT_RULESET,
+                        help=f"Labeling rule set version or JSON file (default: {DEFAULT_RULESET})")
+    args = parser.parse_args()
+
+    ruleset = load_ruleset(args.labels)
+    cache = None if args.no_cache else BuildCache(args.cache_dir)
+    stamp = None
+    if cache is not None:
+        stamp = _build_stamp(args.folder, cache, args.output, ruleset)
+        previous = read_stamp(args.output)
+        if not args.force and previous is not None and previous["fingerprint"] == stamp["fingerprint"]:
+            print(f"[INFO] {args.output} is up to date ({stamp['recordings']} recordings unchanged), nothing to do")
+            return
+
+    # Legacy CSV keeps the full float64 values it always had; the store is float32
+    X, train_df = load_fog_windows(
+        args.folder, workers=args.workers,
+        dtype=np.float64 if is_csv(args.output) else np.float32,
+        cache=cache,
     )
 
+    # Weak-supervision labels (target_activity + the label_rule that assigned it)
+    apply_labels(train_df, ruleset)
+    print(f"\n[INFO] Labeled with rule set {ruleset.version}")
+
     # Class distribution
     counts = train_df["target_activity"].value_counts().sort_index()
     print("\n[INFO] Class distribution:")
@@ -199,15 +384,17 @@ def main():
         print(f"  class {cls:>2}: {cnt:>6} rows  {bar}")
 
     print("\n[INFO] Sample imu_features entry:")
-    sample = train_df["imu_features"].iloc[0]
-    print(f"  type        : {type(sample)}")
+    sample = X[0]
+    print(f"  dtype       : {sample.dtype}")
     print(f"  len         : {len(sample)} timesteps")
-    print(f"  first entry : {sample[0]}  (3 values = AccV, AccML, AccAP)")
-
-    out_path = os.path.join(os.path.dirname(os.path.abspath(__file__)), "train_windows.csv")
-    train_df.to_csv(out_path, index=False)
-    print(f"\n[INFO] Saved → {out_path}")
-    print(f"[INFO] Next step: run augment.py, then model.py")
+    print(f"  first entry : {sample[0].tolist()}  (3 values = AccV, AccML, AccAP)")
+
+    clear_stamp(args.output)
+    write_dataset(args.output, X, train_df)
+    if stamp is not None:
+        write_stamp(args.output, stamp)
+    print(f"\n[INFO] Saved → {args.output}")
+    print(f"[INFO] Next step: run Augment_fog_classes.py, then model.py")
 
 
 if __name__ == "__main__":
@@ -0,0 +1,175 @@
+"""
+Weak-supervision labeling as versioned, declarative rule tables.
+
+A rule table is an ordered list of rules; the first rule whose conditions all
+hold assigns its activity, and the last rule must be unconditional (the
+fallback). Each condition is [column, op, value] over a window metadata
+column:
+
+  >  >=  <  <=  ==     compare with a number
+  in                   value is one of a list
+  hour_in              int(value) is one of a list (hour-of-day buckets)
+
+Tables are evaluated as NumPy masks over whole columns (np.select), never row
+by row, and return both the label and the id of the rule that fired — stored
+as the `label_rule` column so a class can be traced back to the rule behind it.
+
+Versions live in RULESETS; a new version is a new entry, never an edit to an
+existing one, so a dataset's build stamp ("labels") says exactly how it was
+labeled. A table can also be loaded from a JSON file of the same shape.
+Relabeling only touches the metadata, so windows are never recomputed:
+
+  python labeling.py show    [--labels v1]
+  python labeling.py relabel train_windows [--labels v1 | --labels my_rules.json]
+"""
+import argparse
+import json
+import os
+
+import numpy as np
+import pandas as pd
+
+from build_cache import dataset_fingerprint, fingerprint
+from window_store import INDEX_FILE, META_FILE, is_csv, is_sharded, read_stamp, save_meta, write_stamp
+
+RULESETS = {
+    "v1": {
+        "version": "v1",
+        "description": "Original clean_dataset.fog_to_activity thresholds",
+        "rules": [
+            {"id": "fog_active", "activity": 2, "when": [["fog_severity", ">", 0.3]]},           # Gait training NOW
+            {"id": "fog_recent", "activity": 3, "when": [["fog_severity", ">", 0.1]]},           # Balance practice
+            {"id": "sedentary",  "activity": 1, "when": [["movement_mag", "<", 0.1]]},           # Seated exercise
+            {"id": "meal_time",  "activity": 6, "when": [["time_of_day", "hour_in", [7, 12, 18]]]},  # Medication check
+            {"id": "evening",    "activity": 0, "when": [["time_of_day", ">", 21]]},             # Rest
+            {"id": "default",    "activity": 4, "when": []},                                     # Stretching
+        ],
+    },
+}
+DEFAULT_RULESET = "v1"
+SYNTHETIC_RULE  = "synthetic"   # label_rule of rows Augment_fog_classes.py generated for a class
+
+OPS = {
+    ">":       np.greater,
+    ">=":      np.greater_equal,
+    "<":       np.less,
+    "<=":      np.less_equal,
+    "==":      np.equal,
+    "in":      lambda x, v: np.isin(x, v),
+    "hour_in": lambda x, v: np.isin(np.trunc(x), v),
+}
+
+
+class RuleSet:
+    def __init__(self, spec: dict):
+        self.version = spec["version"]
+        self.spec    = spec
+        self.rules   = spec["rules"]
+        if not self.rules or self.rules[-1]["when"]:
+            raise ValueError(f"Rule set {self.version}: the last rule must have no conditions (the fallback)")
+        for rule in self.rules:
+            for column, op, _ in rule["when"]:
+                if op not in OPS:
+                    raise ValueError(f"Rule set {self.version}, rule {rule['id']}: unknown op {op!r}")
+        self.rule_ids   = [rule["id"] for rule in self.rules]
+        self.activities = np.array([rule["activity"] for rule in self.rules], dtype=np.int32)
+        self.columns    = sorted({c for rule in self.rules for c, _, _ in rule["when"]})
+
+    def label(self, columns) -> tuple[np.ndarray, pd.Categorical]:
+        """(labels int32, label_rule) for a DataFrame or dict of equal-length columns."""
+        values = {c: np.asarray(columns[c], dtype=float) for c in self.columns}
+        conds  = []
+        for rule in self.rules[:-1]:
+            mask = None
+            for column, op, value in rule["when"]:
+                m = OPS[op](values[column], value)
+                mask = m if mask is None else mask & m
+            conds.append(mask)
+        fallback = len(self.rules) - 1
+        if conds:
+            rule_index = np.select(conds, np.arange(len(conds)), default=fallback).astype(np.int16)
+        else:
+            # Fallback-only table: no condition columns, so take the row count from the input
+            n = len(columns) if isinstance(columns, pd.DataFrame) else len(next(iter(columns.values()), []))
+            rule_index = np.full(n, fallback, dtype=np.int16)
+        return self.activities[rule_index], pd.Categorical.from_codes(rule_index, categories=self.rule_ids)
+
+    def fingerprint(self) -> str:
+        return fingerprint(self.spec)
+
+
+def load_ruleset(name: str = DEFAULT_RULESET) -> RuleSet:
+    """A built-in version from RULESETS, or a path to a JSON rule table."""
+    if name in RULESETS:
+        return RuleSet(RULESETS[name])
+    if os.path.exists(name):
+        with open(name) as f:
+            return RuleSet(json.load(f))
+    raise ValueError(f"Unknown rule set {name!r} (built-in: {', '.join(RULESETS)}, or a JSON file)")
+
+
+def apply_labels(meta: pd.DataFrame, ruleset: RuleSet) -> pd.DataFrame:
+    """Sets target_activity and label_rule in place on rule-labeled rows; rows
+    generated for a class by Augment_fog_classes.py keep their label."""
+    synthetic = (meta["source_file"] == "synthetic").to_numpy() if "source_file" in meta else np.zeros(len(meta), bool)
+    labels, rules = ruleset.label(meta)
+    if not synthetic.any():
+        meta["target_activity"] = labels
+        meta["label_rule"] = rules
+        return meta
+    real = ~synthetic
+    meta.loc[real, "target_activity"] = labels[real]
+    rule_col = np.asarray(rules, dtype=object)
+    rule_col[synthetic] = SYNTHETIC_RULE
+    meta["label_rule"] = rule_col
+    return meta
+
+
+def relabel(path: str, ruleset: RuleSet) -> pd.DataFrame:
+    """Relabels a dataset (store dir, sharded dir or CSV) in place, metadata only."""
+    if is_csv(path):
+        meta = pd.read_csv(path)        # imu_features stays an unparsed string column
+        apply_labels(meta, ruleset).to_csv(path, index=False)
+    elif is_sharded(path):
+        meta = pd.read_parquet(os.path.join(path, INDEX_FILE))
+        apply_labels(meta, ruleset).to_parquet(os.path.join(path, INDEX_FILE), index=False)
+    else:
+        meta = pd.read_parquet(os.path.join(path, META_FILE))
+        save_meta(path, apply_labels(meta, ruleset))
+
+    # Downstream builds (Augment_fog_classes.py) key on the stamp, so it must change with the labels
+    stamp = read_stamp(path) or {}
+    stamp["fingerprint"] = fingerprint([dataset_fingerprint(path), "relabel", ruleset.fingerprint()])
+    stamp["labels"] = ruleset.version
+    write_stamp(path, stamp)
+    return meta
+
+
+def class_counts(label: str, meta: pd.DataFrame):
+    print(f"\n{label} ({len(meta):,} rows):")
+    counts = meta.groupby(["target_activity", "label_rule"], observed=True).size()
+    for (cls, rule), cnt in counts.items():
+        print(f"  class {cls:>2}  {rule:<12} {cnt:>8,}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Show rule tables or relabel a windowed dataset.")
+    sub = parser.add_subparsers(dest="cmd", required=True)
+    p_show = sub.add_parser("show", help="Print a rule table")
+    p_show.add_argument("--labels", default=DEFAULT_RULESET, help=f"Rule set version or JSON file (default: {DEFAULT_RULESET})")
+    p_rel = sub.add_parser("relabel", help="Relabel a dataset in place (metadata only)")
+    p_rel.add_argument("dataset", help="Store dir, sharded dir or .csv")
+    p_rel.add_argument("--labels", default=DEFAULT_RULESET, help=f"Rule set version or JSON file (default: {DEFAULT_RULESET})")
+    args = parser.parse_args()
+
+    ruleset = load_ruleset(args.labels)
+    if args.cmd == "show":
+        print(json.dumps(ruleset.spec, indent=1))
+        return
+    previous = (read_stamp(args.dataset) or {}).get("labels", "unknown")
+    meta = relabel(args.dataset, ruleset)
+    class_counts(f"Relabeled {args.dataset}: {previous} → {ruleset.version}", meta)
+
+
+if __name__ == "__main__":
+    main()
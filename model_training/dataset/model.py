@@ -1,3 +1,5 @@
+import os
+
 import numpy as np
 import tensorflow as tf
 from tensorflow import keras
@@ -27,24 +29,79 @@ def make_dataset(X, y, batch_size, shuffle=False):
     return ds.batch(batch_size).prefetch(tf.data.AUTOTUNE)
 
 
-def train_model(X, y, epochs=50, batch_size=256, lr=1e-3, val_split=0.2):
-    encoder = LabelEncoder()
-    y_encoded = encoder.fit_transform(y)
-    print(f"Label mapping: { {int(orig): enc for enc, orig in enumerate(encoder.classes_)} }")
-
-    X_train, X_val, y_train, y_val = train_test_split(
-        X, y_encoded, test_size=val_split, random_state=42, stratify=y_encoded
+def stratified_split(y, val_split=0.2, seed=42):
+    """Boolean mask of validation rows with ~val_split of every class, computed
+    from the label column alone (no need to hold X in memory)."""
+    rng    = np.random.default_rng(seed)
+    is_val = np.zeros(len(y), dtype=bool)
+    for cls in np.unique(y):
+        idx = np.flatnonzero(y == cls)
+        rng.shuffle(idx)
+        is_val[idx[: int(round(len(idx) * val_split))]] = True
+    return is_val
+
+
+def make_streaming_dataset(data_dir, index, y_encoded, mask, batch_size, shuffle=False,
+                           cache_path=None, shuffle_buffer=8192, seed=42):
+    """
+    tf.data pipeline over a sharded window store (window_store.write_shards).
+
+    Only the rows selected by `mask` are used. Shard order is shuffled every
+    epoch, shards are loaded lazily in parallel (memory-mapped, only the needed
+    rows are read) and their rows interleaved, then shuffled again through a
+    buffer. With cache_path, each shard's decoded rows are written to their own
+    file cache (cache_path_<shard>) during the first epoch and replayed from it
+    afterwards; the shard order is still reshuffled every epoch.
+    """
+    from window_store import shard_path
+
+    shards = index["shard"].to_numpy()[mask]
+    rows   = index["row"].to_numpy()[mask]
+    labels = y_encoded[mask].astype(np.int32)
+    by_shard = {int(s): (rows[shards == s], labels[shards == s]) for s in np.unique(shards)}
+    shard_ids = np.array(sorted(by_shard), dtype=np.int64)
+    seq_len = np.load(shard_path(data_dir, int(shard_ids[0])), mmap_mode="r").shape[1]
+
+    def load_shard(shard):
+        shard_rows, shard_labels = by_shard[int(shard)]
+        X = np.load(shard_path(data_dir, int(shard)), mmap_mode="r")
+        return np.asarray(X[shard_rows], dtype=np.float32), shard_labels
+
+    def load(shard):
+        X, y = tf.numpy_function(load_shard, [shard], (tf.float32, tf.int32))
+        X.set_shape([None, seq_len, 3])
+        y.set_shape([None])
+        return X, y
+
+    def shard_rows(shard):
+        ds = tf.data.Dataset.from_tensors(shard).map(load).unbatch()
+        if cache_path is not None:
+            # One cache per shard, below the shard shuffle, so epoch order still changes
+            ds = ds.cache(tf.strings.join([cache_path, tf.strings.as_string(shard)], separator="_"))
+        return ds
+
+    ds = tf.data.Dataset.from_tensor_slices(shard_ids)
+    if shuffle:
+        ds = ds.shuffle(len(shard_ids), seed=seed, reshuffle_each_iteration=True)
+    ds = ds.interleave(
+        shard_rows,
+        cycle_length=min(4, len(shard_ids)),
+        num_parallel_calls=tf.data.AUTOTUNE,
+        deterministic=not shuffle,
     )
+    if shuffle:
+        ds = ds.shuffle(buffer_size=shuffle_buffer, seed=seed, reshuffle_each_iteration=True)
+    return ds.batch(batch_size).prefetch(tf.data.AUTOTUNE)
+
 
+def class_weights(y_encoded):
     class_counts = np.bincount(y_encoded)
     total = len(y_encoded)
-    class_weight = {i: float(total / (len(class_counts) * c)) for i, c in enumerate(class_counts)}
-    print(f"Class weights: {class_weight}")
+    return {i: float(total / (len(class_counts) * c)) for i, c in enumerate(class_counts)}
 
-    train_ds = make_dataset(X_train, y_train, batch_size, shuffle=True)
-    val_ds   = make_dataset(X_val,   y_val,   batch_size, shuffle=False)
 
-    model = build_model(seq_len=X.shape[1])
+def fit_model(train_ds, val_ds, seq_len, class_weight, epochs=50, lr=1e-3):
+    model = build_model(seq_len=seq_len)
     model.compile(
         optimizer=keras.optimizers.Adam(lr),
         loss="sparse_categorical_crossentropy",
@@ -76,6 +133,59 @@ def train_model(X, y, epochs=50, batch_size=256, lr=1e-3, val_split=0.2):
     )
 
     print("\nTraining complete. Best model saved to fog_6class_lstm.keras")
+    return model, history
+
+
+def train_model(X, y, epochs=50, batch_size=256, lr=1e-3, val_split=0.2):
+    encoder = LabelEncoder()
+    y_encoded = encoder.fit_transform(y)
+    print(f"Label mapping: { {int(orig): enc for enc, orig in enumerate(encoder.classes_)} }")
+
+    X_train, X_val, y_train, y_val = train_test_split(
+        X, y_encoded, test_size=val_split, random_state=42, stratify=y_encoded
+    )
+
+    class_weight = class_weights(y_encoded)
+    print(f"Class weights: {class_weight}")
+
+    train_ds = make_dataset(X_train, y_train, batch_size, shuffle=True)
+    val_ds   = make_dataset(X_val,   y_val,   batch_size, shuffle=False)
+
+    model, history = fit_model(train_ds, val_ds, X.shape[1], class_weight, epochs, lr)
+    return model, encoder, history
+
+
+def train_model_streaming(data_dir, epochs=50, batch_size=256, lr=1e-3, val_split=0.2, cache_dir=None):
+    """Like train_model, but streams a sharded store instead of loading it into RAM.
+    The split and class weights come from the index; cache_dir (if given) holds
+    the per-run tf.data file caches."""
+    import tempfile
+    from window_store import load_index
+
+    index = load_index(data_dir)
+    encoder = LabelEncoder()
+    y_encoded = encoder.fit_transform(index["target_activity"].to_numpy())
+    print(f"Label mapping: { {int(orig): enc for enc, orig in enumerate(encoder.classes_)} }")
+
+    is_val = stratified_split(y_encoded, val_split, seed=42)
+    print(f"Train windows: {(~is_val).sum():,}  |  Val windows: {is_val.sum():,}  |  Shards: {index['shard'].nunique()}")
+
+    class_weight = class_weights(y_encoded)
+    print(f"Class weights: {class_weight}")
+
+    # Fresh cache files per run so a rebuilt dataset never replays a stale cache
+    run_cache = tempfile.mkdtemp(prefix="fog_tfdata_", dir=cache_dir) if cache_dir is not None else None
+    train_ds = make_streaming_dataset(
+        data_dir, index, y_encoded, ~is_val, batch_size, shuffle=True,
+        cache_path=os.path.join(run_cache, "train") if run_cache else None,
+    )
+    val_ds = make_streaming_dataset(
+        data_dir, index, y_encoded, is_val, batch_size, shuffle=False,
+        cache_path=os.path.join(run_cache, "val") if run_cache else None,
+    )
+
+    seq_len = train_ds.element_spec[0].shape[1]
+    model, history = fit_model(train_ds, val_ds, seq_len, class_weight, epochs, lr)
     return model, encoder, history
 
 def predict(model, encoder, X):
@@ -84,23 +194,32 @@ def predict(model, encoder, X):
     return encoder.inverse_transform(predicted_indices)
 
 if __name__ == "__main__":
-    import json
-    import pandas as pd
-    print("Loading data...")
-
-    df = pd.read_csv(".\\train_windows_augmented.csv")
-
-    X = np.stack(
-        df["imu_features"].apply(lambda x: np.array(json.loads(x), dtype=np.float32)).values
-    )
-    y = df["target_activity"].values.astype(np.int32)
-    print("X shape:", X.shape)
-    print("y shape:", y.shape)
-    model, encoder, history = train_model(
-        X, y,
-        epochs=50,
-        batch_size=256,
-        lr=1e-3,
-        val_split=0.2
-    )
+    import argparse
+    from window_store import is_sharded, read_dataset
+
+    parser = argparse.ArgumentParser(description="Train the 6-class FOG activity LSTM.")
+    parser.add_argument("--data", default="train_windows_augmented",
+                        help="Store dir, sharded dir (streamed) or .csv (default: train_windows_augmented)")
+    parser.add_argument("--cache-dir", default=None,
+                        help="Streaming only: where to keep the tf.data cache after the first epoch")
+    args = parser.parse_args()
+
+    if is_sharded(args.data):
+        print(f"Streaming sharded dataset from {args.data} ...")
+        model, encoder, history = train_model_streaming(
+            args.data, epochs=50, batch_size=256, lr=1e-3, val_split=0.2, cache_dir=args.cache_dir
+        )
+    else:
+        print("Loading data...")
+        X, meta = read_dataset(args.data, mmap=False)
+        y = meta["target_activity"].values.astype(np.int32)
+        print("X shape:", X.shape)
+        print("y shape:", y.shape)
+        model, encoder, history = train_model(
+            X, y,
+            epochs=50,
+            batch_size=256,
+            lr=1e-3,
+            val_split=0.2
+        )
     print("Model training complete!")
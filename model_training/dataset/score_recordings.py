@@ -0,0 +1,276 @@
+"""Offline batch scoring of whole recordings with the trained LSTM.
+
+Windows every CSV exactly like clean_dataset.py (window_recording), runs the
+windows through the inference engine in large batches and writes one row per
+window — source file, window start, the clean_dataset features, the rule label
+(labeling.py, --labels), the predicted activity and all class probabilities —
+to a Parquet file.
+
+Recordings are scored in parallel, one model instance per worker process. Each
+worker task takes a group of recordings and pools their windows into --batch
+sized model calls (a recording averages only a handful of windows). Each
+finished file is written atomically to <output>/parts/ and recorded in
+<output>/manifest.json when its group completes, so an interrupted run picks up
+where it stopped: files whose part exists and whose source size and mtime (ns)
+are unchanged are skipped. The
+parts are merged into <output>/predictions.parquet at the end. A run with a
+different model or windowing settings refuses to reuse the parts (--overwrite
+starts over).
+
+Windows are cut by sample count, as in clean_dataset.py. tdcsfog recordings
+are sampled at 128 Hz and in m/s² (defog: 100 Hz, g); pass --acc-scale 0.10197
+to convert them to g.
+
+Usage (from model_training/dataset):
+  python score_recordings.py train/defog train/tdcsfog --model ../fog_6class_lstm.keras --output scores
+  python score_recordings.py train/tdcsfog --backend numpy --model fog_6class_lstm.npz --acc-scale 0.10197 \\
+      --output scores_tdcs --workers 8 --batch 2048
+"""
+import argparse
+import json
+import multiprocessing
+import os
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+import pandas as pd
+
+from build_cache import file_sha256
+from clean_dataset import ACC_COLS, EVENT_COLS, SAMPLE_RATE_HZ, STRIDE, WINDOW_SIZE, window_recording
+from labeling import DEFAULT_RULESET, load_ruleset
+
+INFERENCE_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "..", "inference")
+ACTIVITY_IDS = np.array([0, 1, 2, 3, 4, 6], dtype=np.int32)    # model output index → activity id
+MANIFEST_VERSION = 1
+
+_ENGINE = None    # one per worker process
+_RULES  = None
+
+
+def _init_worker(backend: str, model_path: str, labels: str):
+    global _ENGINE, _RULES
+    sys.path.insert(0, INFERENCE_DIR)
+    from engine import InferenceEngine
+
+    _ENGINE = InferenceEngine.load(backend, model_path)
+    _RULES  = load_ruleset(labels)
+
+
+def _part_name(path: str) -> str:
+    parent = os.path.basename(os.path.dirname(os.path.abspath(path)))
+    return f"{parent}__{os.path.splitext(os.path.basename(path))[0]}.parquet"
+
+
+def _source_stamp(path: str) -> dict:
+    st = os.stat(path)
+    return {"size": st.st_size, "mtime_ns": st.st_mtime_ns}
+
+
+def _load_windows(path: str, window_size: int, stride: int, sample_rate_hz: int, acc_scale: float):
+    """(window columns, has_events) for one recording, or (None, reason) if it is skipped."""
+    df = pd.read_csv(path, usecols=lambda c: c in set(ACC_COLS) | set(EVENT_COLS))
+    missing = set(ACC_COLS) - set(df.columns)
+    if missing:
+        return None, f"missing columns {sorted(missing)}"
+    if len(df) < window_size:
+        return None, f"too short ({len(df)} rows < {window_size})"
+    if acc_scale != 1.0:
+        df[ACC_COLS] = df[ACC_COLS] * acc_scale
+    has_events = all(c in df.columns for c in EVENT_COLS)
+    for c in EVENT_COLS:
+        if c not in df.columns:
+            df[c] = np.nan       # unlabeled recording: fog_severity / rule label are undefined
+    return window_recording(df, window_size, stride, sample_rate_hz), has_events
+
+
+def _write_part(path: str, part_path: str, cols: dict, has_events: bool, probs: np.ndarray) -> dict:
+    pred = probs.argmax(axis=1)
+    out = pd.DataFrame({
+        "source_file": os.path.basename(path),
+        "window_start": cols["window_start"],
+        "fog_severity": cols["fog_severity"],
+        "time_of_day": cols["time_of_day"],
+        "movement_mag": cols["movement_mag"],
+        "rule_activity": pd.array(_RULES.label(cols)[0] if has_events else [None] * len(pred), dtype="Int32"),
+        "pred_activity": ACTIVITY_IDS[pred],
+        "confidence": probs[np.arange(len(pred)), pred],
+        **{f"prob_{a}": probs[:, i] for i, a in enumerate(ACTIVITY_IDS)},
+    })
+    tmp = part_path + ".tmp"
+    out.to_parquet(tmp, index=False)
+    os.replace(tmp, part_path)
+    return {"path": path, "windows": len(out),
+            "rule_agreement": float((out["rule_activity"] == out["pred_activity"]).mean()) if has_events else None}
+
+
+def score_files(job: tuple) -> list:
+    """Worker: windows and scores a group of recordings, writing one part file per
+    recording. Windows are pooled across files so every model call but the last
+    gets a full batch. Returns one summary per recording, in order."""
+    files, batch, window_size, stride, sample_rate_hz, acc_scale = job
+    results = {}
+    pending = []     # (path, part_path, cols, has_events) whose windows are not all scored yet
+    queued  = []     # feature arrays not yet sent to the model
+    scored  = []     # probabilities for the windows of `pending`, in order
+
+    def run(final: bool):
+        nonlocal queued
+        X = np.concatenate(queued)
+        n = len(X) if final else len(X) // batch * batch
+        scored.extend(_ENGINE.predict(X[i:i + batch]) for i in range(0, n, batch))
+        queued = [X[n:]] if n < len(X) else []
+        probs = np.concatenate(scored) if scored else np.empty((0, len(ACTIVITY_IDS)), np.float32)
+        used = 0
+        while pending and len(pending[0][2]["window_start"]) <= len(probs) - used:
+            path, part_path, cols, has_events = pending.pop(0)
+            k = len(cols["window_start"])
+            results[path] = _write_part(path, part_path, cols, has_events, probs[used:used + k])
+            used += k
+        scored[:] = [probs[used:]] if used < len(probs) else []
+
+    start = time.perf_counter()
+    for path, part_path in files:
+        cols, has_events = _load_windows(path, window_size, stride, sample_rate_hz, acc_scale)
+        if cols is None:
+            results[path] = {"path": path, "skipped": has_events}
+            continue
+        pending.append((path, part_path, cols, has_events))
+        queued.append(cols["imu_features"].astype(np.float32))
+        if sum(len(x) for x in queued) >= batch:
+            run(final=False)
+    if queued:
+        run(final=True)
+    seconds = time.perf_counter() - start
+    return [dict(results[path], seconds=seconds) for path, _ in files]
+
+
+def _collect(inputs: list) -> list:
+    files = []
+    for item in inputs:
+        if os.path.isdir(item):
+            files += sorted(os.path.join(item, f) for f in os.listdir(item) if f.lower().endswith(".csv"))
+        else:
+            files.append(item)
+    return files
+
+
+def _load_manifest(path: str, config: dict, overwrite: bool) -> dict:
+    if os.path.exists(path) and not overwrite:
+        with open(path) as f:
+            manifest = json.load(f)
+        if manifest.get("config") != config:
+            raise SystemExit(f"{path} was written with different settings:\n  {manifest.get('config')}\n"
+                             f"now:\n  {config}\nUse --overwrite to start over or a new --output.")
+        return manifest
+    return {"version": MANIFEST_VERSION, "config": config, "files": {}}
+
+
+def _save_manifest(path: str, manifest: dict):
+    tmp = path + ".tmp"
+    with open(tmp, "w") as f:
+        json.dump(manifest, f, indent=1)
+    os.replace(tmp, path)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Score whole FOG recordings with the activity LSTM.")
+    parser.add_argument("inputs", nargs="+", help="Recording CSVs or folders of them")
+    parser.add_argument("--model",    required=True, help="Model artifact matching --backend (.keras/.tflite/.onnx/.npz)")
+    parser.add_argument("--backend",  default="tf", help="Inference engine backend (default: tf)")
+    parser.add_argument("--output",   default="scores", help="Output directory (default: scores)")
+    parser.add_argument("--batch",    type=int, default=1024, help="Windows per model call (default: 1024)")
+    parser.add_argument("--workers",  type=int, default=None, help="Worker processes (default: all cores)")
+    parser.add_argument("--files-per-task", type=int, default=0,
+                        help="Recordings per worker task, pooled into batches (default: about 4 tasks per worker)")
+    parser.add_argument("--window-size", type=int, default=WINDOW_SIZE)
+    parser.add_argument("--stride",      type=int, default=STRIDE)
+    parser.add_argument("--sample-rate", type=int, default=SAMPLE_RATE_HZ, help="For time_of_day (default: 100)")
+    parser.add_argument("--acc-scale",   type=float, default=1.0, help="Multiply AccV/AccML/AccAP by this (default: 1)")
+    parser.add_argument("--labels",      default=DEFAULT_RULESET, help=f"Rule set for rule_activity (default: {DEFAULT_RULESET})")
+    parser.add_argument("--overwrite",   action="store_true", help="Discard earlier parts instead of resuming")
+    args = parser.parse_args()
+
+    files = _collect(args.inputs)
+    if not files:
+        raise SystemExit("No .csv recordings found")
+    parts_dir = os.path.join(args.output, "parts")
+    os.makedirs(parts_dir, exist_ok=True)
+    manifest_path = os.path.join(args.output, "manifest.json")
+    config = {"model_sha256": file_sha256(args.model), "backend": args.backend, "window_size": args.window_size,
+              "stride": args.stride, "sample_rate": args.sample_rate, "acc_scale": args.acc_scale,
+              "labels": load_ruleset(args.labels).fingerprint()}
+    manifest = _load_manifest(manifest_path, config, args.overwrite)
+    if args.overwrite:
+        for f in os.listdir(parts_dir):
+            os.remove(os.path.join(parts_dir, f))
+
+    names = [_part_name(p) for p in files]
+    if len(set(names)) != len(names):
+        raise SystemExit("Two inputs map to the same part name (same folder and file name)")
+    done = {name for name, p in zip(names, files)
+            if manifest["files"].get(name) == _source_stamp(p) and os.path.exists(os.path.join(parts_dir, name))}
+    todo = [(p, name) for p, name in zip(files, names) if name not in done]
+    print(f"[INFO] {len(files)} recordings, {len(done)} already scored, {len(todo)} to go  |  "
+          f"backend {args.backend}, batch {args.batch}")
+
+    workers = max(1, min(args.workers or os.cpu_count() or 1, len(todo) or 1))
+    # Several recordings per task so windows can be pooled into full batches; a few
+    # tasks per worker so one slow group does not leave the others idle
+    per_task = args.files_per_task or max(1, -(-len(todo) // (workers * 4)))
+    groups = [todo[i:i + per_task] for i in range(0, len(todo), per_task)]
+    jobs = [([(p, os.path.join(parts_dir, name)) for p, name in group], args.batch, args.window_size,
+             args.stride, args.sample_rate, args.acc_scale) for group in groups]
+    start = time.perf_counter()
+    windows = 0
+    if jobs:
+        if workers == 1:
+            _init_worker(args.backend, args.model, args.labels)
+            results = map(score_files, jobs)
+            pool = None
+        else:
+            # spawn: TensorFlow does not survive fork, and each worker loads its own model
+            pool = ProcessPoolExecutor(max_workers=workers, mp_context=multiprocessing.get_context("spawn"),
+                                       initializer=_init_worker, initargs=(args.backend, args.model, args.labels))
+            results = pool.map(score_files, jobs)
+        try:
+            i = 0
+            for group, group_results in zip(groups, results):
+                group_windows = 0
+                for (path, name), res in zip(group, group_results):
+                    i += 1
+                    if "skipped" in res:
+                        print(f"  [{i}/{len(todo)}] {os.path.basename(path)}: skipped, {res['skipped']}")
+                        continue
+                    group_windows += res["windows"]
+                    manifest["files"][name] = _source_stamp(path)
+                    agree = f", rule agreement {res['rule_agreement']:.1%}" if res["rule_agreement"] is not None else ""
+                    print(f"  [{i}/{len(todo)}] {os.path.basename(path)}: {res['windows']} windows{agree}")
+                _save_manifest(manifest_path, manifest)
+                windows += group_windows
+                elapsed = time.perf_counter() - start
+                print(f"  group of {len(group)}: {group_windows} windows in {group_results[0]['seconds']:.2f} s  |  "
+                      f"total {windows / elapsed:,.0f} windows/s")
+        finally:
+            if pool is not None:
+                pool.shutdown(cancel_futures=True)
+        elapsed = time.perf_counter() - start
+        print(f"\n[INFO] Scored {windows:,} windows from {len(todo)} recordings in {elapsed:.1f} s "
+              f"({windows / elapsed:,.0f} windows/s, {workers} workers, {per_task} files per task)")
+
+    present = [os.path.join(parts_dir, n) for n in names if os.path.exists(os.path.join(parts_dir, n))]
+    if not present:
+        raise SystemExit("Nothing was scored")
+    merged = pd.concat([pd.read_parquet(p) for p in present], ignore_index=True)
+    out_path = os.path.join(args.output, "predictions.parquet")
+    merged.to_parquet(out_path, index=False)
+    labeled = merged["rule_activity"].notna()
+    print(f"[INFO] {len(merged):,} windows → {out_path}")
+    if labeled.any():
+        agree = (merged.loc[labeled, "rule_activity"] == merged.loc[labeled, "pred_activity"]).mean()
+        print(f"[INFO] Agreement with the rule labels: {agree:.1%} over {labeled.sum():,} labeled windows")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,191 @@
+"""
+Columnar on-disk format for windowed IMU datasets.
+
+A dataset is a directory:
+
+  train_windows/
+    imu_features.npy   float32 (N, 100, 3), opened memory-mapped
+    meta.parquet       one row per window: fog_severity, time_of_day, movement_mag,
+                       source_file, window_start[, target_activity]
+
+Compared to train_windows.csv (imu_features stored as a Python-repr string and
+re-parsed row by row with ast.literal_eval / json.loads), loading is a header
+read plus a Parquet scan, and the sequences are never parsed at all.
+
+Every script accepts either form: paths ending in .csv use the legacy CSV
+layout, anything else is treated as a store directory.
+
+Builds (clean_dataset.py, Augment_fog_classes.py) record what went into a
+dataset in build.json inside the directory, or <name>.csv.build.json next to a
+CSV, so an unchanged rebuild can be skipped (see build_cache.py).
+
+For streaming training (model.py), a dataset can also be split into shards:
+
+  train_windows_sharded/
+    index.parquet      meta columns + shard, row  (lightweight, read eagerly)
+    shard-00000.npy    float32 (<= shard_size, 100, 3), read lazily
+    ...
+
+CLI:
+  python window_store.py convert train_windows.csv train_windows
+  python window_store.py shard   train_windows_augmented train_windows_sharded [--shard-size 8192]
+"""
+import argparse
+import json
+import os
+
+import numpy as np
+import pandas as pd
+
+IMU_FILE      = "imu_features.npy"
+META_FILE     = "meta.parquet"
+INDEX_FILE    = "index.parquet"
+BUILD_FILE    = "build.json"
+SHARD_PATTERN = "shard-{:05d}.npy"
+SHARD_SIZE    = 8192
+
+
+def is_csv(path: str) -> bool:
+    return path.lower().endswith(".csv")
+
+
+def save_windows(path: str, X: np.ndarray, meta: pd.DataFrame):
+    """Writes X (N, T, 3) and its per-window metadata as a store directory."""
+    if len(X) != len(meta):
+        raise ValueError(f"X has {len(X)} windows but meta has {len(meta)} rows")
+    os.makedirs(path, exist_ok=True)
+    np.save(os.path.join(path, IMU_FILE), np.ascontiguousarray(X, dtype=np.float32))
+    save_meta(path, meta)
+
+
+def create_windows(path: str, n_windows: int, seq_len: int = 100) -> np.memmap:
+    """Pre-allocates imu_features.npy as a writable memory map so large datasets
+    can be filled chunk by chunk. Call save_meta() once all rows are written."""
+    os.makedirs(path, exist_ok=True)
+    return np.lib.format.open_memmap(
+        os.path.join(path, IMU_FILE), mode="w+", dtype=np.float32, shape=(n_windows, seq_len, 3)
+    )
+
+
+def save_meta(path: str, meta: pd.DataFrame):
+    meta.reset_index(drop=True).to_parquet(os.path.join(path, META_FILE), index=False)
+
+
+def load_windows(path: str, mmap: bool = True) -> tuple[np.ndarray, pd.DataFrame]:
+    """Returns (X, meta). With mmap=True, X is a read-only memory map."""
+    X    = np.load(os.path.join(path, IMU_FILE), mmap_mode="r" if mmap else None)
+    meta = pd.read_parquet(os.path.join(path, META_FILE))
+    if len(X) != len(meta):
+        raise ValueError(f"{path}: {IMU_FILE} has {len(X)} windows but {META_FILE} has {len(meta)} rows")
+    return X, meta
+
+
+def parse_imu_column(values) -> np.ndarray:
+    """Legacy CSV imu_features strings ("[[v, ml, ap], ...]") → float32 (N, T, 3)."""
+    return np.stack([np.asarray(json.loads(v), dtype=np.float32) for v in values])
+
+
+def read_dataset(path: str, mmap: bool = True) -> tuple[np.ndarray, pd.DataFrame]:
+    """Reads a store directory or a legacy CSV into (X, meta)."""
+    if not is_csv(path):
+        return load_windows(path, mmap=mmap)
+    df = pd.read_csv(path)
+    X  = parse_imu_column(df["imu_features"].values)
+    return X, df.drop(columns=["imu_features"])
+
+
+def write_dataset(path: str, X: np.ndarray, meta: pd.DataFrame):
+    """Writes (X, meta) as a store directory, or as a legacy CSV if path ends in .csv."""
+    if not is_csv(path):
+        save_windows(path, X, meta)
+        return
+    df = meta.reset_index(drop=True).copy()
+    df.insert(0, "imu_features", [str(x) for x in np.asarray(X).tolist()])
+    df.to_csv(path, index=False)
+
+
+def stamp_path(path: str) -> str:
+    return path + "." + BUILD_FILE if is_csv(path) else os.path.join(path, BUILD_FILE)
+
+
+def read_stamp(path: str) -> dict | None:
+    """The build stamp of a dataset, or None if it has none or the data is missing."""
+    data = path if is_csv(path) else os.path.join(path, META_FILE)
+    try:
+        if not os.path.exists(data):
+            return None
+        with open(stamp_path(path)) as f:
+            return json.load(f)
+    except (FileNotFoundError, json.JSONDecodeError):
+        return None
+
+
+def write_stamp(path: str, stamp: dict):
+    """Records how a dataset was built. Call after the data itself is written."""
+    with open(stamp_path(path), "w") as f:
+        json.dump(stamp, f, indent=1, sort_keys=True)
+
+
+def clear_stamp(path: str):
+    """Removes a dataset's stamp before it is rewritten, so an interrupted write never looks up to date."""
+    try:
+        os.remove(stamp_path(path))
+    except FileNotFoundError:
+        pass
+
+
+def is_sharded(path: str) -> bool:
+    return os.path.exists(os.path.join(path, INDEX_FILE))
+
+
+def shard_path(path: str, shard: int) -> str:
+    return os.path.join(path, SHARD_PATTERN.format(shard))
+
+
+def write_shards(path: str, X: np.ndarray, meta: pd.DataFrame, shard_size: int = SHARD_SIZE) -> int:
+    """Splits (X, meta) into shard files plus an index; X may be a memory map,
+    only one shard is held in memory at a time. Returns the number of shards."""
+    if len(X) != len(meta):
+        raise ValueError(f"X has {len(X)} windows but meta has {len(meta)} rows")
+    os.makedirs(path, exist_ok=True)
+    n = len(meta)
+    for shard, start in enumerate(range(0, n, shard_size)):
+        np.save(shard_path(path, shard), np.ascontiguousarray(X[start:start + shard_size], dtype=np.float32))
+
+    index = meta.reset_index(drop=True).copy()
+    index["shard"] = np.arange(n) // shard_size
+    index["row"]   = np.arange(n) % shard_size
+    index.to_parquet(os.path.join(path, INDEX_FILE), index=False)
+    return -(-n // shard_size)
+
+
+def load_index(path: str) -> pd.DataFrame:
+    return pd.read_parquet(os.path.join(path, INDEX_FILE))
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Convert or shard windowed datasets.")
+    sub = parser.add_subparsers(dest="cmd", required=True)
+    p_conv = sub.add_parser("convert", help="Legacy CSV → store directory")
+    p_conv.add_argument("csv",    help="Input CSV (e.g. train_windows.csv)")
+    p_conv.add_argument("output", help="Output store directory (e.g. train_windows)")
+    p_shard = sub.add_parser("shard", help="Store dir or CSV → sharded directory for streaming training")
+    p_shard.add_argument("input",  help="Input store dir or .csv")
+    p_shard.add_argument("output", help="Output sharded directory")
+    p_shard.add_argument("--shard-size", type=int, default=SHARD_SIZE, help=f"Windows per shard (default: {SHARD_SIZE})")
+    args = parser.parse_args()
+
+    if args.cmd == "convert":
+        print(f"Loading {args.csv} ...")
+        X, meta = read_dataset(args.csv)
+        save_windows(args.output, X, meta)
+        size_mb = sum(os.path.getsize(os.path.join(args.output, f)) for f in (IMU_FILE, META_FILE)) / 1e6
+        print(f"Saved → {args.output}  ({len(meta):,} windows, X {tuple(X.shape)}, {size_mb:.1f} MB)")
+    else:
+        X, meta   = read_dataset(args.input)
+        n_shards  = write_shards(args.output, X, meta, args.shard_size)
+        print(f"Saved → {args.output}  ({len(meta):,} windows in {n_shards} shards of ≤{args.shard_size})")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,3 @@
+"""Chat pieces shared by the inference service and the backend: the prefix-cached
+llama-cpp wrapper and worker queue (llm) and the prompt context builder
+(context_builder). Install with `pip install ./shared`."""
@@ -0,0 +1,127 @@
+"""Compact, token-budgeted context block for chat prompts.
+
+/chat used to paste the latest inference event and the last 5 events as Python
+reprs: full probability vectors, top-k lists and nine stats arrays each, several
+hundred tokens the model had to prefill on every message while using almost
+none of it. build_context() instead summarizes the window history into a few
+fixed-format lines (current activity, label trend, confidence, movement deltas)
+and then adds as many prior conversation turns as fit in the budget, newest
+first. Output depends only on its inputs, so identical history gives an
+identical prompt.
+
+Predictions are (label, confidence, movement_mag) tuples, oldest first; turns
+are (role, content) tuples, oldest first. `movement` is an optional
+rolling.SessionStats snapshot covering longer horizons than the window history.
+
+Used by the inference service's /chat and by the backend's /v1/chat
+(backend/routes/chat.py), which builds it from the session's PredictionLog rows.
+"""
+from typing import Callable, List, Optional, Sequence, Tuple
+
+Prediction = Tuple[str, float, float]
+Turn = Tuple[str, str]
+
+MAX_TURN_CHARS = 400     # longer turns are cut to this before budgeting
+
+
+def approx_tokens(text: str) -> int:
+    """~4 characters per token; used when no tokenizer is available."""
+    return (len(text) + 3) // 4
+
+
+def _trend(labels: Sequence[str]) -> str:
+    """Run-length encoded label sequence: "Rest x2 -> Gait Training x3"."""
+    runs: List[List] = []
+    for label in labels:
+        if runs and runs[-1][0] == label:
+            runs[-1][1] += 1
+        else:
+            runs.append([label, 1])
+    return " -> ".join(f"{label} x{n}" if n > 1 else label for label, n in runs)
+
+
+def summarize_predictions(preds: Sequence[Prediction]) -> List[str]:
+    """Summary lines for the window history, most important first."""
+    if not preds:
+        return ["Sensor context: no recent activity windows."]
+    label, conf, mag = preds[-1]
+    confs = [p[1] for p in preds]
+    mags = [p[2] for p in preds]
+    lines = [f"Sensor context (last {len(preds)} windows):",
+             f"- current: {label} (confidence {conf:.2f}), movement {mag:.3f}"]
+    if len(preds) > 1:
+        lines += [
+            f"- change vs previous window: movement {mag - mags[-2]:+.3f}, confidence {conf - confs[-2]:+.2f}",
+            f"- trend: {_trend([p[0] for p in preds])}",
+            f"- confidence: mean {sum(confs) / len(confs):.2f}, min {min(confs):.2f}",
+            f"- movement: mean {sum(mags) / len(mags):.3f}, range {min(mags):.3f}-{max(mags):.3f}, "
+            f"net change {mags[-1] - mags[0]:+.3f}",
+        ]
+    return lines
+
+
+def summarize_movement(movement: Optional[dict]) -> List[str]:
+    """Lines for the rolling movement statistics, shortest horizon first."""
+    if not movement:
+        return []
+    spans = list(movement["horizons"].items()) + [("today", movement["today"])]
+    lines = []
+    for name, h in spans:
+        if h["windows"]:
+            lines.append(f"- {name if name == 'today' else 'last ' + name}: movement mean {h['mean']:.3f} "
+                         f"(sd {h['std']:.3f}), range {h['min']:.3f}-{h['max']:.3f}, {h['windows']} windows")
+    if not lines:
+        return []
+    trend = movement["trend"]
+    direction = "rising" if trend > 0.005 else "falling" if trend < -0.005 else "steady"
+    return ["Movement over time:"] + lines + [f"- trend: {direction} ({trend:+.3f}, short vs long average)"]
+
+
+def build_context(
+    preds: Sequence[Prediction],
+    turns: Sequence[Turn] = (),
+    budget_tokens: int = 160,
+    count_tokens: Optional[Callable[[str], int]] = None,
+    movement: Optional[dict] = None,
+) -> str:
+    """Summary lines and prior turns that together fit in budget_tokens.
+    Summary lines (window history, then rolling movement) are kept in order
+    until the budget runs out; turns are then added newest first and emitted
+    in chronological order."""
+    count = count_tokens or approx_tokens
+    used = 0
+    summary: List[str] = []
+    for line in summarize_predictions(preds) + summarize_movement(movement):
+        cost = count(line + "\n")
+        if used + cost > budget_tokens:
+            break
+        summary.append(line)
+        used += cost
+
+    kept: List[str] = []
+    header = "Earlier in this conversation:"
+    if turns:
+        used += count(header + "\n")
+    for role, content in reversed(turns):
+        content = " ".join(content.split())
+        if len(content) > MAX_TURN_CHARS:
+            content = content[:MAX_TURN_CHARS] + "..."
+        line = f"{role}: {content}"
+        cost = count(line + "\n")
+        if used + cost > budget_tokens:
+            break
+        kept.append(line)
+        used += cost
+
+    if kept:
+        summary += [header] + kept[::-1]
+    return "\n".join(summary)
+
+
+def event_prediction(event: dict) -> Prediction:
+    """Inference-service context event → (label, confidence, movement_mag)."""
+    return (
+        event["pred_label"],
+        float(event["probs"][event["pred_index"]]),
+        float(event["stats"]["movement_mag_mean"]),
+    )
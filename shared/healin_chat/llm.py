@@ -0,0 +1,252 @@
+"""Prompt-prefix KV caching and token streaming on top of llama-cpp.
+
+Every /chat prompt starts with the same long system block. Rather than
+prefilling it from scratch on each request, PrefixCachedLLM evaluates it once,
+snapshots the KV cache with Llama.save_state(), and restores that snapshot
+before each request. The prompt is passed as tokens (prefix tokens + suffix
+tokens) so llama-cpp's longest-prefix match sees the cached prefix exactly and
+only evaluates the per-request suffix.
+
+Used by the inference service's /chat (inference/app.py) and the backend's
+/v1/chat (backend/routes/chat.py).
+"""
+import asyncio
+import queue
+import threading
+import time
+from typing import TYPE_CHECKING, AsyncIterator, Callable, Iterator, List
+
+if TYPE_CHECKING:   # llama_cpp is imported by whoever constructs the Llama
+    from llama_cpp import Llama
+
+
+class PrefixCachedLLM:
+    def __init__(self, llm: "Llama", prefix: str):
+        self.llm = llm
+        self.prefix = prefix
+        # One Llama context can only run one generation at a time
+        self._lock = threading.Lock()
+        self.prefix_tokens: List[int] = llm.tokenize(prefix.encode("utf-8"), add_bos=True, special=True)
+        with self._lock:
+            llm.reset()
+            llm.eval(self.prefix_tokens)
+            self._state = llm.save_state()
+
+    def _prompt(self, suffix: str) -> List[int]:
+        return self.prefix_tokens + self.llm.tokenize(suffix.encode("utf-8"), add_bos=False, special=True)
+
+    def warmup(self) -> float:
+        """One short generation so sampling buffers are allocated before the first
+        request; returns its duration in ms."""
+        start = time.perf_counter()
+        self.complete("Hello", max_tokens=1)
+        return (time.perf_counter() - start) * 1e3
+
+    def count_tokens(self, suffix: str) -> int:
+        """Total prompt tokens for prefix + suffix."""
+        return len(self._prompt(suffix))
+
+    def complete(self, suffix: str, **kwargs) -> dict:
+        """Blocking completion of prefix + suffix; same return value as Llama.__call__."""
+        with self._lock:
+            self.llm.load_state(self._state)
+            return self.llm.create_completion(self._prompt(suffix), **kwargs)
+
+    def stream(self, suffix: str, **kwargs) -> Iterator[str]:
+        """Yields text pieces as they are generated. Holds the model for the
+        lifetime of the iterator, so always exhaust or close it."""
+        with self._lock:
+            self.llm.load_state(self._state)
+            for chunk in self.llm.create_completion(self._prompt(suffix), stream=True, **kwargs):
+                text = chunk["choices"][0]["text"]
+                if text:
+                    yield text
+
+
+# ── Executor ──────────────────────────────────────────────────────────────────
+# Chat requests go through a bounded queue served by `workers` threads, each
+# owning its own model instance (llama-cpp releases the GIL while evaluating).
+# Handlers stay async and never block the event loop, so /infer latency is not
+# tied to chat load; a full queue is rejected immediately instead of piling up.
+# Callers wait at most until their job's deadline; a job whose caller timed out
+# or disconnected is skipped if still queued and stopped at the next token if
+# running. llama-cpp gives no hook inside prompt evaluation, but with the system
+# prefix cached that is only the per-request suffix.
+
+class QueueFull(Exception):
+    """More than max_queue chat requests are waiting (→ 429)."""
+
+
+class LLMUnavailable(Exception):
+    """No model loaded or the executor is shutting down (→ 503)."""
+
+
+class LLMTimeout(Exception):
+    """The request did not finish within its timeout (→ 504)."""
+
+
+_DONE = object()
+
+
+class LLMJob:
+    def __init__(self, suffix: str, kwargs: dict, timeout_s: float, loop: asyncio.AbstractEventLoop):
+        self.suffix = suffix
+        self.kwargs = kwargs
+        self.deadline = time.monotonic() + timeout_s
+        self.cancelled = threading.Event()
+        self._loop = loop
+        self._out: asyncio.Queue = asyncio.Queue()
+
+    def cancel(self):
+        """Stops generation at the next token (or skips the job if still queued)."""
+        self.cancelled.set()
+
+    def _emit(self, item):
+        try:
+            self._loop.call_soon_threadsafe(self._out.put_nowait, item)
+        except RuntimeError:    # event loop already closed
+            self.cancel()
+
+    async def texts(self) -> AsyncIterator[str]:
+        """Generated text pieces; raises LLMTimeout / worker errors. Cancels the job if abandoned.
+        The wait is bounded by the job's deadline whether it is still queued, in prefill
+        or generating, so a slow job ahead never holds the caller past its timeout."""
+        try:
+            while True:
+                remaining = self.deadline - time.monotonic()
+                if remaining <= 0:
+                    raise LLMTimeout("Chat request timed out")
+                try:
+                    item = await asyncio.wait_for(self._out.get(), remaining)
+                except asyncio.TimeoutError:
+                    raise LLMTimeout("Chat request timed out") from None
+                if item is _DONE:
+                    return
+                if isinstance(item, BaseException):
+                    raise item
+                yield item
+        finally:
+            self.cancel()
+
+    @property
+    def abandoned(self) -> bool:
+        """Cancelled, or past its deadline (the caller has already been answered with a timeout)."""
+        return self.cancelled.is_set() or time.monotonic() > self.deadline
+
+
+class LLMExecutor:
+    def __init__(self, factory: Callable[[], PrefixCachedLLM], workers: int = 1, max_queue: int = 8):
+        self.workers = workers
+        self.max_queue = max_queue
+        self._queue: queue.Queue = queue.Queue(maxsize=max_queue)
+        self._stopped = False
+        # Load every instance up front so a bad model path fails at startup
+        instances = [factory() for _ in range(workers)]
+        self._tokenizer = instances[0]
+        self._busy = [False] * workers
+        self._current: List = [None] * workers     # job each worker is running, for stop()
+        self.dropped = 0                           # queued jobs skipped because their caller was gone
+        self._threads = [
+            threading.Thread(target=self._run, args=(i, llm), name=f"llm-worker-{i}", daemon=True)
+            for i, llm in enumerate(instances)
+        ]
+        for t in self._threads:
+            t.start()
+
+    def submit(self, suffix: str, timeout_s: float, **kwargs) -> LLMJob:
+        """Queues a generation; must be called from the event loop. Raises QueueFull / LLMUnavailable."""
+        if self._stopped:
+            raise LLMUnavailable("Chat model is shutting down")
+        job = LLMJob(suffix, kwargs, timeout_s, asyncio.get_running_loop())
+        try:
+            self._queue.put_nowait(job)
+        except queue.Full:
+            # Slots held by jobs whose callers disconnected or timed out don't count
+            if not self._purge():
+                raise QueueFull(f"{self.max_queue} chat requests already queued") from None
+            try:
+                self._queue.put_nowait(job)
+            except queue.Full:
+                raise QueueFull(f"{self.max_queue} chat requests already queued") from None
+        return job
+
+    def _purge(self) -> int:
+        """Removes abandoned jobs from the queue; returns how many."""
+        with self._queue.mutex:
+            pending = self._queue.queue
+            live = [job for job in pending if job is None or not job.abandoned]
+            dropped = len(pending) - len(live)
+            if dropped:
+                pending.clear()
+                pending.extend(live)
+                self._queue.not_full.notify(dropped)
+        self.dropped += dropped
+        return dropped
+
+    async def complete(self, suffix: str, timeout_s: float, **kwargs) -> str:
+        job = self.submit(suffix, timeout_s, **kwargs)
+        return "".join([text async for text in job.texts()])
+
+    def count_tokens(self, suffix: str) -> int:
+        """Prompt tokens (prefix + suffix); tokenizing only reads the vocabulary, so no worker is needed."""
+        return self._tokenizer.count_tokens(suffix)
+
+    def text_tokens(self, text: str) -> int:
+        return len(self._tokenizer.llm.tokenize(text.encode("utf-8"), add_bos=False, special=True))
+
+    def stats(self) -> dict:
+        return {"workers": self.workers, "active": sum(self._busy), "queued": self._queue.qsize(),
+                "max_queue": self.max_queue, "dropped": self.dropped}
+
+    def stop(self, join_s: float = 5.0):
+        """Fails queued jobs, cancels running ones and lets the workers exit. Never
+        blocks on the queue; waits at most join_s for running generations to stop."""
+        self._stopped = True
+        with self._queue.mutex:
+            queued = [job for job in self._queue.queue if job is not None]
+            self._queue.queue.clear()
+            self._queue.not_full.notify_all()
+        for job in queued + [job for job in self._current if job is not None]:
+            job._emit(LLMUnavailable("Chat model is shutting down"))
+            job.cancel()
+        for _ in self._threads:
+            try:
+                self._queue.put_nowait(None)
+            except queue.Full:      # workers also poll _stopped
+                break
+        deadline = time.monotonic() + join_s
+        for t in self._threads:
+            t.join(timeout=max(0.0, deadline - time.monotonic()))
+
+    def _run(self, worker: int, llm: PrefixCachedLLM):
+        while not self._stopped:
+            try:
+                job = self._queue.get(timeout=0.5)
+            except queue.Empty:
+                continue
+            if job is None:
+                return
+            if job.abandoned:
+                self.dropped += 1
+                continue
+            self._busy[worker] = True
+            self._current[worker] = job
+            try:
+                if time.monotonic() > job.deadline:
+                    raise LLMTimeout("Timed out waiting for a chat worker")
+                pieces = llm.stream(job.suffix, **job.kwargs)
+                try:
+                    for text in pieces:
+                        if job.cancelled.is_set():
+                            break
+                        if time.monotonic() > job.deadline:
+                            raise LLMTimeout("Chat generation timed out")
+                        job._emit(text)
+                finally:
+                    pieces.close()
+                job._emit(_DONE)
+            except Exception as e:
+                job._emit(e)
+            finally:
+                self._busy[worker] = False
+                self._current[worker] = None